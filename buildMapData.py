@@ -1,19 +1,25 @@
-import codecs
 import os
 from functools import cached_property
 from pickle import dump, load
 from time import perf_counter
-from typing import Any, Union
+from typing import Dict, Union
 
-import yaml
 from alive_progress import alive_bar
 
 import logic.get_dotlan_maps as dotlan
 import models.map as mapData
-from logic.common import ProgressBar, try_parse
+from logic.common import ProgressBar
+from logic.get_anoikis_data import GetAnokisData, index_anokis_data
 from logic.planetaryResources import *
+from logic.sde_yaml import load_yaml_entries
 from models.common import *
+from models.map_snapshot import DEFAULT_SNAPSHOT_FILE_PATH, MapSnapshot
+from models.planet_type_counts import DEFAULT_PLANET_TYPE_COUNTS_FILE_PATH, PlanetTypeCounts
+from models.production_tree import ProductionTree
+from models.stargate_graph import DEFAULT_GRAPH_FILE_PATH, StargateGraph
+from models.third_party.anoikis import AnokisSystem
 from models.third_party.dotlan import *
+from models.wormhole_graph import WormholeGraph
 
 data_files = {
     "data/regions.en-us.yaml": mapData.Region,
@@ -26,24 +32,25 @@ data_files = {
 }
 
 
-def LoadYaml(file_name: str) -> Any:
-    with codecs.open(file_name, "r", encoding="utf-8", errors="ignore") as fdata:
-        return yaml.safe_load(fdata)
-
-
 def CreateMaps(data, obj, client) -> dict:
-    if isinstance(data, list):
-        for item in list:
-            obj(properties=item, client=client)
-    else:
-        for value in data.values():
-            obj(properties=value, client=client)
+    if isinstance(data, dict):
+        data = data.values()
+    for item in data:
+        obj(properties=item, client=client)
 
 
 class AllData:
     def __init__(
-        self, skip_build: bool = False, skip_dotlan_rebuild: bool = None, skip_dotlan_scrape: bool = None
+        self,
+        skip_build: bool = False,
+        skip_dotlan_rebuild: bool = None,
+        skip_dotlan_scrape: bool = None,
+        lazy: bool = False,
     ) -> None:
+        """
+        :param lazy(bool, default: False): When loading from the snapshot, only create each map object when it is first
+            accessed (see MapSnapshot.Populate). Keeps memory down for runs that only touch part of the map.
+        """
         if skip_dotlan_rebuild is None:
             skip_dotlan_rebuild = skip_build
 
@@ -59,7 +66,9 @@ class AllData:
             "Constellations",
             "Regions",
         ]
-        if skip_build:
+        if skip_build and os.path.exists(DEFAULT_SNAPSHOT_FILE_PATH):
+            self.PopulateFromSnapshot(lazy=lazy)
+        elif skip_build:
             self.PopulateFromPickles()
         else:
             BuildMapData(self.MapClient)
@@ -84,26 +93,25 @@ class AllData:
         self.Regions = self.MapClient.ALL_REGIONS
 
     def GetCommodity(self, value: Union[str, int]) -> mapData.Commodity:
-        return next(item for item in self.Commodities if item.Name == value or item.Id == try_parse(int, value))
+        return self.MapClient.Get("COMMODITIES", value)
 
     def GetPlanetType(self, value: Union[str, int]) -> mapData.PlanetType:
-        return next(item for item in self.PlanetTypes if item.Name == value or item.Id == try_parse(int, value))
+        return self.MapClient.Get("PLANET_TYPES", value)
 
     def GetPlanet(self, value: Union[str, int]) -> mapData.Planet:
-        return next(item for item in self.Planets if item.Name == value or item.Id == try_parse(int, value))
+        return self.MapClient.Get("PLANETS", value)
 
     def GetStargate(self, value: Union[str, int]) -> mapData.Stargate:
-        return next(item for item in self.Stargates if item.Name == value or item.Id == try_parse(int, value))
+        return self.MapClient.Get("STARGATES", value)
 
     def GetSystem(self, value: Union[str, int]) -> mapData.System:
-
-        return next(item for item in self.Systems if item.Name == value or item.Id == try_parse(int, value))
+        return self.MapClient.Get("SYSTEMS", value)
 
     def GetConstellation(self, value: Union[str, int]) -> mapData.Constellation:
-        return next(item for item in self.Constellations if item.Name == value or item.Id == try_parse(int, value))
+        return self.MapClient.Get("CONSTELLATIONS", value)
 
     def GetRegion(self, value: Union[str, int]) -> mapData.Region:
-        return next(item for item in self.Regions if item.Name == value or item.Id == try_parse(int, value))
+        return self.MapClient.Get("REGIONS", value)
 
     @cached_property
     def TotalEdenSystems(self) -> int:
@@ -111,12 +119,55 @@ class AllData:
             [sys.Id for sys in self.Systems if sys.Position.Universe == Universe.EDEN and len(sys.LinkedSystem_Ids) > 0]
         )
 
+    @cached_property
+    def Graph(self) -> StargateGraph:
+        """
+        The stargate network as integer CSR arrays, for searches that do not need the map objects. Loaded from the one
+        PickleAll saved if it was built from the same systems and stargates, otherwise built from the map.
+        """
+        if os.path.exists(DEFAULT_GRAPH_FILE_PATH):
+            graph = StargateGraph.Load()
+            if graph.Matches(self.MapClient):
+                return graph
+        return StargateGraph.FromMapClient(self.MapClient)
+
+    @property
+    def PlanetTypeCounts(self) -> PlanetTypeCounts:
+        """How many planets of each type every system has, and the type of every planet"""
+        return self.MapClient.PLANET_TYPE_COUNTS
+
+    @property
+    def ProductionTree(self) -> ProductionTree:
+        """What raw resources, intermediates and planet types go into every commodity"""
+        return self.MapClient.PRODUCTION_TREE
+
+    @property
+    def Anoikis(self) -> Dict[int, AnokisSystem]:
+        """
+        The anoik.is details of every J-space system, by System.Id. Loaded and joined onto the map the first time they are
+        used, after which System.Anoikis is set for each system.
+        """
+        if self.MapClient.ANOIKIS is None:
+            self.MapClient.ANOIKIS = index_anokis_data(self.MapClient, GetAnokisData(pickle_data=False))
+        return self.MapClient.ANOIKIS
+
+    @cached_property
+    def WormholeGraph(self) -> WormholeGraph:
+        """J-space linked by static wormholes, as integer arrays and class bitmasks, for reachability searches"""
+        return WormholeGraph.FromData(self.MapClient, self.Anoikis)
+
     def PickleAll(self):
         print("Picking Data")
         for attribute in self.PickleAttributes:
             with open(f"data/pickled_{attribute.lower()}", "wb") as pickleFile:
                 print(f"Pickling {attribute} data")
-                dump(getattr(self, attribute), pickleFile)
+                dump(list(getattr(self, attribute)), pickleFile)
+        print("Saving Stargate Graph")
+        self.Graph.Save()
+        print("Saving Planet Type Counts")
+        self.PlanetTypeCounts.Save()
+        print("Saving Map Snapshot")
+        MapSnapshot.FromMapClient(self.MapClient).Save()
         print("Data Pickled")
 
     def PopulateFromPickles(self):
@@ -129,8 +180,27 @@ class AllData:
                     item.client = self.MapClient
                 setattr(self.MapClient, f"ALL_{attribute.upper()}", un_pickled_data)
 
+        self.MapClient.Reindex()
+        self._loadPlanetTypeCounts()
+        self.MapClient.PRODUCTION_TREE = ProductionTree.FromMapClient(self.MapClient)
+        print("Map Data Loaded")
+
+    def PopulateFromSnapshot(self, file_path: str = DEFAULT_SNAPSHOT_FILE_PATH, lazy: bool = False):
+        """Loads the map data from the columnar snapshot written by PickleAll, which is much faster than the pickles"""
+        print("Loading Map Data Snapshot")
+        MapSnapshot.Load(file_path).Populate(self.MapClient, lazy=lazy)
+        self._loadPlanetTypeCounts()
+        self.MapClient.PRODUCTION_TREE = ProductionTree.FromMapClient(self.MapClient)
         print("Map Data Loaded")
 
+    def _loadPlanetTypeCounts(self):
+        if os.path.exists(DEFAULT_PLANET_TYPE_COUNTS_FILE_PATH):
+            planet_type_counts = PlanetTypeCounts.Load()
+            if planet_type_counts.Matches(self.MapClient):
+                self.MapClient.PLANET_TYPE_COUNTS = planet_type_counts
+        if self.MapClient.PLANET_TYPE_COUNTS is None:
+            self.MapClient.PLANET_TYPE_COUNTS = PlanetTypeCounts.FromMapClient(self.MapClient)
+
 
 def BuildMapData(client: mapData.MapClient, include_pi_data: bool = False):
 
@@ -141,8 +211,7 @@ def BuildMapData(client: mapData.MapClient, include_pi_data: bool = False):
     with alive_bar(tasks, title_length=40) as bar:
         for key, value in data_files.items():
             bar.title(f"Processing {key}")
-            yamlFile = LoadYaml(key)
-            CreateMaps(yamlFile, value, client)
+            CreateMaps(load_yaml_entries(key), value, client)
 
             bar()
 
@@ -152,6 +221,9 @@ def BuildMapData(client: mapData.MapClient, include_pi_data: bool = False):
 
             bar()
 
+    client.PLANET_TYPE_COUNTS = PlanetTypeCounts.FromMapClient(client)
+    client.PRODUCTION_TREE = ProductionTree.FromMapClient(client)
+
 
 if __name__ == "__main__":
     data = AllData()
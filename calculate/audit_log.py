@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, IO, Iterable, List, Optional
+
+from models.common import AuditLevel
+
+# Event: (the level it is recorded at, its message, if its first four args are the system it is about - name, id, jumps
+# from the origin and the System.Id the search came from)
+AUDIT_EVENTS = {
+    "RUN_STARTED": (AuditLevel.FULL, "==== New Run started ====", False),
+    "EXPECTED_VALUES": (AuditLevel.FULL, " *** Expected Match Values: {0}", False),
+    "RUN_COMPLETE": (AuditLevel.FULL, "==== Run Complete: Raw Weight:{0} | Recorded Weight by {1}: {2} ====", False),
+    "RUN_INCOMPLETE": (AuditLevel.FULL, "==== Run Complete: Not able to find complete match. Weight: -1 ====", False),
+    "CHECKING": (AuditLevel.FULL, "Beginning Check of System", True),
+    "CHECKED_CLOSER": (AuditLevel.FULL, "has already been checked closer. Returning False.", True),
+    "WEIGHED": (AuditLevel.FULL, "Weight Values (J, Dv, Dns, sec) {0}", True),
+    "MATCHED": (AuditLevel.FULL, "Current Matched Values {0}", True),
+    "COMPLETES_PATH": (AuditLevel.FULL, "***** Completes a path! Returning TRUE!!!! *****", True),
+    "PART_OF_PATH": (AuditLevel.FULL, "***** Part of a complete path *****", True),
+    "CHAIN_ENDS": (
+        AuditLevel.FULL,
+        "Is Final System in Chain, still not all required values found. Returning False.",
+        True,
+    ),
+    "CHECKING_CHILDREN": (AuditLevel.FULL, "Now checking linked children.", True),
+    "CHILD_DELETED": (AuditLevel.FULL, "No children of this chain meet all targets. Deleting child #{0}", True),
+    "NEW_TOP": (AuditLevel.TOP_ONLY, "[TOP_SYSTEM] New top system with Weight {0} (removed previous systems)", False),
+    "MATCHES_TOP": (
+        AuditLevel.TOP_ONLY,
+        "[TOP_SYSTEM] Matches current top weight ({0}) (added details to existing)",
+        False,
+    ),
+    "KEPT_TOP": (AuditLevel.TOP_ONLY, "[TOP_SYSTEM] Kept in the top {0} systems with Weight {1}", False),
+}
+
+
+@dataclass
+class AuditLog:
+    """
+    Where a WeightCalculator records what each Run() did. Events are kept as
+    (Origin_Id, Origin_Name, AuditLevel value, event, args) tuples and only formatted into messages when read, see
+    AUDIT_EVENTS for what each one means.
+
+    Gathering an event's args is left to the caller, so check Top/Full before calling Record() - with the level at OFF
+    nothing is built at all.
+
+    :param Level(AuditLevel, default: FULL): Which events are recorded. TOP_ONLY only records origins that become,
+        match or are kept among the top weights, FULL records every step of every search.
+    :param FilePath(str, default: None): If given, events are streamed to this file as JSON lines rather than kept in
+        Events. The file is started over by the first event after creating or Clear()ing the log.
+
+    :attributes Events(Dict[int, List[tuple]]): The recorded events, by origin System.Id. Empty when streaming to FilePath.
+    :attributes Top(bool): If TOP_ONLY events are recorded.
+    :attributes Full(bool): If FULL events are recorded.
+    :attributes Mirrors(List[AuditLog]): Other logs that are also given every FULL event this one records, for calculators
+        that share another's search (see search_map.RunBatch).
+    """
+
+    Level: AuditLevel = field(default=AuditLevel.FULL)
+    FilePath: Optional[str] = field(default=None)
+    Events: Dict[int, List[tuple]] = field(init=False, default_factory=dict)
+    Top: bool = field(init=False)
+    Full: bool = field(init=False)
+    Mirrors: List[AuditLog] = field(init=False, default_factory=list)
+    _file: Optional[IO] = field(init=False, default=None, repr=False)
+
+    def __post_init__(self):
+        self.Top = self.Level.value >= AuditLevel.TOP_ONLY.value
+        self.Full = self.Level.value >= AuditLevel.FULL.value
+
+    def Record(self, origin_system: Any, event: str, *args):
+        """Records an event about the Run() for origin_system, if it is at or below Level"""
+        level = AUDIT_EVENTS[event][0]
+        if level.value > self.Level.value:
+            return
+
+        entry = (origin_system.Id, origin_system.Name, level.value, event, args)
+        self._write(entry)
+        if level is AuditLevel.FULL:
+            for mirror in self.Mirrors:
+                mirror.Extend((entry,))
+
+    def Extend(self, events: Iterable[tuple]):
+        """Records events taken from another log, such as one in a worker process, skipping any above Level"""
+        for entry in events:
+            if entry[2] <= self.Level.value:
+                self._write(entry)
+
+    def Lines(self, origin_system_id: int) -> List[str]:
+        """The messages for the events kept in memory for an origin system"""
+        return [self.Format(entry) for entry in self.Events.get(origin_system_id, [])]
+
+    def AllLines(self) -> Dict[int, List[str]]:
+        """The messages for every event kept in memory, by origin System.Id"""
+        return {origin_system_id: self.Lines(origin_system_id) for origin_system_id in self.Events}
+
+    @staticmethod
+    def Format(entry: tuple) -> str:
+        origin_id, origin_name, _, event, args = entry
+        _, message, about_system = AUDIT_EVENTS[event]
+        args = [_plain(arg) for arg in args]
+
+        prefix = f"[{origin_name}#{origin_id}]"
+        if about_system:
+            name, system_id, jumps, previous_system_id, *args = args
+            came_from = "" if previous_system_id is None else f" From {previous_system_id}"
+            prefix += f"Weighting [{name}#{system_id}@Jump-{jumps}{came_from}] "
+
+        return prefix + message.format(*args)
+
+    @staticmethod
+    def Read(file_path: str) -> Dict[int, List[tuple]]:
+        """The events streamed to file_path, by origin System.Id, in the same form as Events"""
+        events = {}
+        with open(file_path, "r") as file:
+            for line in file:
+                origin_id, origin_name, level, event, args = json.loads(line)
+                events.setdefault(origin_id, []).append((origin_id, origin_name, level, event, tuple(args)))
+
+        return events
+
+    def Clear(self):
+        """Forgets every event recorded so far"""
+        self.Events = {}
+        self.Close()
+
+    def Close(self):
+        """Finishes writing to FilePath, if streaming"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, entry: tuple):
+        if self.FilePath is None:
+            events = self.Events.get(entry[0], None)
+            if events is None:
+                events = self.Events[entry[0]] = []
+            events.append(entry)
+            return
+
+        if self._file is None:
+            self._file = open(self.FilePath, "w")
+        self._file.write(json.dumps(entry, default=_plain) + "\n")
+
+    def __getstate__(self):
+        # an open file can't be sent to another process, so a pickled log keeps what is in memory but not the file
+        state = self.__dict__.copy()
+        state["_file"] = None
+        return state
+
+
+def _plain(value: Any) -> Any:
+    """Sets as sorted lists and numpy values as python ones, for the messages and json"""
+    if isinstance(value, (set, frozenset)):
+        items = [_plain(item) for item in value]
+        try:
+            return sorted(items)
+        except TypeError:
+            return sorted(items, key=repr)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, tuple):
+        return tuple(_plain(item) for item in value)
+
+    return value
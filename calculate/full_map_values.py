@@ -1,23 +1,182 @@
+from __future__ import annotations
+
+import hashlib
+import os
 from dataclasses import dataclass, field
 from functools import cached_property
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 import numpy
 
 from buildMapData import AllData
+from logic.array_store import load_arrays, save_arrays
+from models.map import MapClient
+from models.planet_type_counts import PlanetTypeCounts
+
+DEFAULT_MAP_STATS_FILE_PATH = "data/map_stats.npz"
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+@dataclass
+class MapStats:
+    """
+    Statistics of the planets across the map, worked out from the PlanetTypeCounts matrix. Small enough to be saved and
+    loaded back whole, so only worked out again when the map data changes (see Checksum).
+
+    Columns are in PlanetTypeCounts.PlanetType_Ids order.
+
+    :param Checksum(str): sha256 of the PlanetTypeCounts these were worked out from.
+    :param PlanetType_Ids(numpy.ndarray[int64]): The PlanetType.Id for each column.
+    :param TotalByType(numpy.ndarray[int64]): The number of planets of each type across every system.
+    :param Percentiles(numpy.ndarray[int64]): The percentiles in the *Percentiles arrays. PERCENTILES when worked out.
+    :param PlanetsPerSystemPercentiles(numpy.ndarray[float]): Each percentile of the planets per system.
+    :param TypeCountPercentiles(numpy.ndarray[float]): percentiles x planet types - each percentile of the planets of a
+        type per system.
+    :param PlanetsPerSystem(numpy.ndarray[float]): The average and median planets per system.
+    :param AverageTypeShare(numpy.ndarray[float]): The average share of a system's planets of each type. Systems without
+        planets are left out.
+    :param MedianTypeShare(numpy.ndarray[float]): The median share of a system's planets of each type. Systems without
+        planets are left out.
+    :param Region_Ids(numpy.ndarray[int64]): The Region.Id for each row of CountsByRegion.
+    :param CountsByRegion(numpy.ndarray[int64]): regions x planet types - the number of planets of each type in a region.
+    :param Constellation_Ids(numpy.ndarray[int64]): The Constellation.Id for each row of CountsByConstellation.
+    :param CountsByConstellation(numpy.ndarray[int64]): constellations x planet types - the number of planets of each
+        type in a constellation.
+    """
+
+    Checksum: str
+    PlanetType_Ids: numpy.ndarray
+    TotalByType: numpy.ndarray
+    Percentiles: numpy.ndarray
+    PlanetsPerSystemPercentiles: numpy.ndarray
+    TypeCountPercentiles: numpy.ndarray
+    PlanetsPerSystem: numpy.ndarray
+    AverageTypeShare: numpy.ndarray
+    MedianTypeShare: numpy.ndarray
+    Region_Ids: numpy.ndarray
+    CountsByRegion: numpy.ndarray
+    Constellation_Ids: numpy.ndarray
+    CountsByConstellation: numpy.ndarray
+
+    @classmethod
+    def FromPlanetTypeCounts(cls, planet_type_counts: PlanetTypeCounts, client: MapClient) -> MapStats:
+        """:param client(MapClient): For the constellation and region of each system"""
+        counts = numpy.asarray(planet_type_counts.Counts, dtype=numpy.int64)
+        total_planets = counts.sum(axis=1)
+        has_planets = total_planets > 0
+        type_share = counts[has_planets] / total_planets[has_planets, numpy.newaxis]
+        percentiles = numpy.asarray(PERCENTILES, dtype=numpy.int64)
+
+        # each system's constellation, and each constellation's region, by Id
+        constellation_by_system = dict(
+            zip(client.Column("SYSTEMS", "Id"), client.Column("SYSTEMS", "Constellation_Id"))
+        )
+        region_by_constellation = dict(
+            zip(client.Column("CONSTELLATIONS", "Id"), client.Column("CONSTELLATIONS", "Region_Id"))
+        )
+        system_constellations = numpy.asarray(
+            [constellation_by_system.get(system_id, 0) for system_id in planet_type_counts.System_Ids.tolist()],
+            dtype=numpy.int64,
+        )
+        system_regions = numpy.asarray(
+            [region_by_constellation.get(constellation_id, 0) for constellation_id in system_constellations.tolist()],
+            dtype=numpy.int64,
+        )
+        constellation_ids, counts_by_constellation = _sumBy(system_constellations, counts)
+        region_ids, counts_by_region = _sumBy(system_regions, counts)
+
+        return cls(
+            Checksum=_checksum(planet_type_counts),
+            PlanetType_Ids=numpy.asarray(planet_type_counts.PlanetType_Ids, dtype=numpy.int64),
+            TotalByType=counts.sum(axis=0),
+            Percentiles=percentiles,
+            PlanetsPerSystemPercentiles=numpy.percentile(total_planets, percentiles),
+            TypeCountPercentiles=numpy.percentile(counts, percentiles, axis=0),
+            PlanetsPerSystem=numpy.asarray([numpy.average(total_planets), numpy.median(total_planets)]),
+            AverageTypeShare=numpy.average(type_share, axis=0),
+            MedianTypeShare=numpy.median(type_share, axis=0),
+            Region_Ids=region_ids,
+            CountsByRegion=counts_by_region,
+            Constellation_Ids=constellation_ids,
+            CountsByConstellation=counts_by_constellation,
+        )
+
+    @classmethod
+    def Load(cls, file_path: str = DEFAULT_MAP_STATS_FILE_PATH) -> MapStats:
+        arrays = load_arrays(file_path, mmap=False)
+        return cls(
+            Checksum=str(arrays["checksum"]),
+            PlanetType_Ids=arrays["planet_type_ids"],
+            TotalByType=arrays["total_by_type"],
+            Percentiles=arrays["percentiles"],
+            PlanetsPerSystemPercentiles=arrays["planets_per_system_percentiles"],
+            TypeCountPercentiles=arrays["type_count_percentiles"],
+            PlanetsPerSystem=arrays["planets_per_system"],
+            AverageTypeShare=arrays["average_type_share"],
+            MedianTypeShare=arrays["median_type_share"],
+            Region_Ids=arrays["region_ids"],
+            CountsByRegion=arrays["counts_by_region"],
+            Constellation_Ids=arrays["constellation_ids"],
+            CountsByConstellation=arrays["counts_by_constellation"],
+        )
+
+    def Save(self, file_path: str = DEFAULT_MAP_STATS_FILE_PATH):
+        save_arrays(
+            file_path,
+            checksum=numpy.asarray(self.Checksum),
+            planet_type_ids=self.PlanetType_Ids,
+            total_by_type=self.TotalByType,
+            percentiles=self.Percentiles,
+            planets_per_system_percentiles=self.PlanetsPerSystemPercentiles,
+            type_count_percentiles=self.TypeCountPercentiles,
+            planets_per_system=self.PlanetsPerSystem,
+            average_type_share=self.AverageTypeShare,
+            median_type_share=self.MedianTypeShare,
+            region_ids=self.Region_Ids,
+            counts_by_region=self.CountsByRegion,
+            constellation_ids=self.Constellation_Ids,
+            counts_by_constellation=self.CountsByConstellation,
+        )
+
+    def Matches(self, planet_type_counts: PlanetTypeCounts) -> bool:
+        """If these were worked out from the same planet type counts"""
+        return self.Checksum == _checksum(planet_type_counts)
 
 
 @dataclass
 class CalculatedMapData:
+    """
+    Statistics about the planets across the whole map.
+
+    :param all_data(AllData, default: None): The map data to work from. Loaded (lazily) if not given.
+    :param stats_file_path(str, default: DEFAULT_MAP_STATS_FILE_PATH): Where the worked out MapStats are saved, and
+        loaded back from as long as the map data has not changed. None to always work them out.
+    """
+
     all_data: AllData = field(kw_only=True, default=None)
+    stats_file_path: str = field(kw_only=True, default=DEFAULT_MAP_STATS_FILE_PATH)
 
     def __post_init__(self):
-        self.all_data = AllData(skip_build=True)
-        self.all_data.PopulateFromPickles()
+        if self.all_data is None:
+            self.all_data = AllData(skip_build=True, lazy=True)
+
+    @cached_property
+    def Stats(self) -> MapStats:
+        planet_type_counts = self.all_data.PlanetTypeCounts
+        if self.stats_file_path is not None and os.path.exists(self.stats_file_path):
+            stats = MapStats.Load(self.stats_file_path)
+            if stats.Matches(planet_type_counts):
+                return stats
+
+        stats = MapStats.FromPlanetTypeCounts(planet_type_counts, self.all_data.MapClient)
+        if self.stats_file_path is not None:
+            stats.Save(self.stats_file_path)
+        return stats
 
     @cached_property
     def TotalPlanets(self) -> int:
-        return len(self.all_data.Planets)
+        return int(self.Stats.TotalByType.sum())
 
     @cached_property
     def TotalSystems(self) -> int:
@@ -26,48 +185,92 @@ class CalculatedMapData:
     @cached_property
     def PlanetIdsByTypeIds(self) -> Dict[int, List[int]]:
         return {
-            planet_type.Id: [planet.Id for planet in self.all_data.Planets if planet.Type_Id == planet_type.Id]
-            for planet_type in self.all_data.Planet_Types
+            planet_type_id: planet_ids.tolist()
+            for planet_type_id, planet_ids in self.all_data.PlanetTypeCounts.PlanetIdsByType().items()
         }
 
     @cached_property
     def PlanetTypeAmounts(self) -> Dict[int, int]:
-        return {key: len(value) for key, value in self.PlanetIdsByTypeIds.items()}
+        return self._byType(self.Stats.TotalByType)
 
     @cached_property
     def PlanetTypesPercentage(self) -> Dict[int, float]:
-        return {key: value / self.TotalPlanets for key, value in self.PlanetTypeAmounts.items()}
+        return self._byType(self.Stats.TotalByType / self.TotalPlanets)
 
     @cached_property
     def AveragePlanetsPerSystem(self) -> float:
-        return numpy.average([len(sys.Planet_Ids) for sys in self.all_data.Systems])
+        return float(self.Stats.PlanetsPerSystem[0])
 
     @cached_property
     def MeanPlanetsPerSystem(self) -> float:
-        return numpy.mean([len(sys.Planet_Ids) for sys in self.all_data.Systems])
+        return self.AveragePlanetsPerSystem
 
     @cached_property
-    def AveragePlanetTypeBySystem(self) -> Dict[int, float]:
+    def MedianPlanetsPerSystem(self) -> float:
+        return float(self.Stats.PlanetsPerSystem[1])
+
+    @cached_property
+    def PlanetsPerSystemPercentiles(self) -> Dict[int, float]:
+        """percentile: planets per system"""
+        return dict(zip(self.Stats.Percentiles.tolist(), self.Stats.PlanetsPerSystemPercentiles.tolist()))
+
+    @cached_property
+    def PlanetTypeCountPercentiles(self) -> Dict[int, Dict[int, float]]:
+        """PlanetType.Id: {percentile: planets of that type per system}"""
         return {
-            planet_type.Id: numpy.average(
-                [
-                    len([planet.Type_Id for planet in sys.GetPlanets() if planet.Type_Id == planet_type.Id])
-                    / len(sys.Planet_Ids)
-                    for sys in self.all_data.Systems
-                ]
-            )
-            for planet_type in self.all_data.Planet_Types
+            type_id: dict(zip(self.Stats.Percentiles.tolist(), column))
+            for type_id, column in zip(self.Stats.PlanetType_Ids.tolist(), self.Stats.TypeCountPercentiles.T.tolist())
         }
 
+    @cached_property
+    def PlanetTypeShareBySystem(self) -> numpy.ndarray:
+        """systems x planet types - the share of each system's planets of each type. Systems without planets are left out"""
+        planet_type_counts = self.all_data.PlanetTypeCounts
+        has_planets = planet_type_counts.TotalPlanets > 0
+        return planet_type_counts.Counts[has_planets] / planet_type_counts.TotalPlanets[has_planets, numpy.newaxis]
+
+    @cached_property
+    def AveragePlanetTypeBySystem(self) -> Dict[int, float]:
+        return self._byType(self.Stats.AverageTypeShare)
+
     @cached_property
     def MeanPlanetTypeBySystem(self) -> Dict[int, float]:
+        return self.AveragePlanetTypeBySystem
+
+    @cached_property
+    def MedianPlanetTypeBySystem(self) -> Dict[int, float]:
+        return self._byType(self.Stats.MedianTypeShare)
+
+    @cached_property
+    def PlanetTypeAmountsByRegion(self) -> Dict[int, Dict[int, int]]:
+        """Region.Id: {PlanetType.Id: number of planets}"""
+        return {
+            region_id: self._byType(row)
+            for region_id, row in zip(self.Stats.Region_Ids.tolist(), self.Stats.CountsByRegion)
+        }
+
+    @cached_property
+    def PlanetTypeAmountsByConstellation(self) -> Dict[int, Dict[int, int]]:
+        """Constellation.Id: {PlanetType.Id: number of planets}"""
         return {
-            planet_type.Id: numpy.mean(
-                [
-                    len([planet.Type_Id for planet in sys.GetPlanets() if planet.Type_Id == planet_type.Id])
-                    / len(sys.Planet_Ids)
-                    for sys in self.all_data.Systems
-                ]
-            )
-            for planet_type in self.all_data.Planet_Types
+            constellation_id: self._byType(row)
+            for constellation_id, row in zip(self.Stats.Constellation_Ids.tolist(), self.Stats.CountsByConstellation)
         }
+
+    def _byType(self, values: numpy.ndarray) -> Dict[int, float]:
+        return dict(zip(self.Stats.PlanetType_Ids.tolist(), numpy.asarray(values).tolist()))
+
+
+def _sumBy(keys: numpy.ndarray, counts: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """The sum of the rows of counts for each unique key, as (unique keys, unique keys x columns)"""
+    unique_keys, inverse = numpy.unique(keys, return_inverse=True)
+    sums = numpy.zeros((len(unique_keys), counts.shape[1]), dtype=counts.dtype)
+    numpy.add.at(sums, inverse, counts)
+    return unique_keys, sums
+
+
+def _checksum(planet_type_counts: PlanetTypeCounts) -> str:
+    digest = hashlib.sha256()
+    for array in (planet_type_counts.System_Ids, planet_type_counts.PlanetType_Ids, planet_type_counts.Counts):
+        digest.update(numpy.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
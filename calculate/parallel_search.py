@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import as_completed, ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Tuple
+
+from calculate.audit_log import AuditLog
+from calculate.search_map import RunBatch, WeightCalculator
+from logic.common import ProgressBar
+from models.common import AuditLevel, iWeightResult, WeightMethod
+from models.map import MapClient, System
+
+SHARDS_PER_WORKER = 4  # more shards than workers, so a slow shard does not leave the rest of the pool idle
+
+# The calculators each worker process runs its shards with, by key. Set once per process by _initializeWorker.
+_worker_calculators: Dict[Any, WeightCalculator] = None
+
+
+@dataclass(frozen=True)
+class CompactSystem:
+    """
+    Read only stand-in for System in worker processes. Carries only what the search and weight factors read, so the
+    workers do not need the pickled object graph.
+    """
+
+    Id: int
+    Name: str
+    PlanetTypeCounts: Dict[int, int]
+    Security_Status: float
+
+    @classmethod
+    def FromSystem(cls, system: System) -> CompactSystem:
+        return cls(
+            Id=system.Id,
+            Name=system.Name,
+            PlanetTypeCounts=system.PlanetTypeCounts,
+            Security_Status=system.Security_Status,
+        )
+
+    @classmethod
+    def AllFromMapClient(cls, client: MapClient) -> Dict[int, CompactSystem]:
+        """One for every system in the client, by System.Id. Read from the arrays when the client has them."""
+        if client.PLANET_TYPE_COUNTS is None:
+            return {system.Id: cls.FromSystem(system) for system in client.ALL_SYSTEMS}
+
+        return {
+            system_id: cls(
+                Id=system_id,
+                Name=name,
+                PlanetTypeCounts=client.PLANET_TYPE_COUNTS.CountsFor(system_id),
+                Security_Status=security_status,
+            )
+            for system_id, name, security_status in zip(
+                client.Column("SYSTEMS", "Id"),
+                client.Column("SYSTEMS", "Name"),
+                client.Column("SYSTEMS", "Security_Status"),
+            )
+        }
+
+
+@dataclass
+class CompactResult(iWeightResult):
+    """Just the numbers of a weight result, to send back from the workers"""
+
+    System_Id: int = field(init=False)
+    JumpsFromOrigin: int = field(init=False)
+    Weight: Any = field(init=False)
+    IndividualWeights: Any = field(init=False)
+
+    def Populate(self, current_system, origin_system, jumps_from_source: int, weight: tuple) -> CompactResult:
+        self.System_Id = current_system.Id
+        self.JumpsFromOrigin = jumps_from_source
+        self.Weight = weight[0]
+        self.IndividualWeights = weight[1]
+        self.SortValue = self.Weight
+
+        return self
+
+    def AsTuple(self) -> Tuple[int, int, Any, Any]:
+        return (self.System_Id, self.JumpsFromOrigin, self.Weight, self.IndividualWeights)
+
+
+def RunAllParallel(
+    calculator: WeightCalculator,
+    origin_systems: List[System],
+    method: WeightMethod = WeightMethod.AVERAGE,
+    workers: int = None,
+    progress_bar: ProgressBar = None,
+) -> Dict[int, Tuple[int, Dict[int, Any]]]:
+    """
+    WeightCalculator.RunAll, with the origin systems split into shards across a pool of worker processes.
+
+    Each worker gets its own copy of the calculator along with the StargateGraph arrays and a CompactSystem for every
+    system, rather than the map objects. Workers send back plain numbers, which are turned into calculator.WeightResults
+    here, and calculator.TopWeight/TopDetails/Audit are then recorded in the order of origin_systems, so the outcome
+    does not depend on which shard finishes first.
+
+    :param calculator(WeightCalculator): The configured calculator. Must have a Graph.
+    :param origin_systems(List[System]): The systems to search MaxJumps away from.
+    :param method(WeightMethod, Default:AVERAGE): How the weight is returned
+    :param workers(int, Default: None): How many worker processes. None uses every core.
+    :param progress_bar(ProgressBar, Default:None): If given, advanced once per origin system as shards complete.
+
+    :return Dict[int, Tuple[weight, results]]: The return of Run() for each origin, by origin System.Id
+    """
+    return RunBatchParallel({None: calculator}, origin_systems, method, workers, progress_bar)[None]
+
+
+def RunBatchParallel(
+    calculators: Dict[Any, WeightCalculator],
+    origin_systems: List[System],
+    method: WeightMethod = WeightMethod.AVERAGE,
+    workers: int = None,
+    progress_bar: ProgressBar = None,
+) -> Dict[Any, Dict[int, Tuple[int, Dict[int, Any]]]]:
+    """
+    search_map.RunBatch, with the origin systems split into shards across a pool of worker processes (as RunAllParallel).
+    Each worker walks the Neighborhood of each of its origins once and runs every calculator against it.
+
+    :param calculators(Dict[Any, WeightCalculator]): The configured calculators, by any key. Each must have a Graph.
+    :param origin_systems(List[System]): The systems to search MaxJumps away from.
+    :param method(WeightMethod, Default:AVERAGE): How the weight is returned
+    :param workers(int, Default: None): How many worker processes. None uses every core.
+    :param progress_bar(ProgressBar, Default:None): If given, advanced once per origin system for each calculator as
+        shards complete.
+
+    :return Dict[Any, Dict[int, Tuple[weight, results]]]: The return of RunAll() for each calculator, by the same keys.
+    """
+    if any(calculator.Graph is None for calculator in calculators.values()):
+        raise ValueError("Running in parallel needs WeightCalculators with a StargateGraph")
+
+    workers = os.cpu_count() if workers is None else workers
+    client = origin_systems[0].client if len(origin_systems) > 0 else None
+    systems = CompactSystem.AllFromMapClient(client) if client else {}
+
+    # workers keep their audit events in memory and send them back, to be recorded (or streamed) by calculator.Audit
+    worker_calculators = {
+        key: replace(
+            calculator, WeightResults=CompactResult, Systems=systems, Audit=AuditLog(Level=calculator.Audit.Level)
+        )
+        for key, calculator in calculators.items()
+    }
+
+    origin_ids = [system.Id for system in origin_systems]
+    shard_size = max(1, -(-len(origin_ids) // (workers * SHARDS_PER_WORKER)))
+    shards = [origin_ids[start : start + shard_size] for start in range(0, len(origin_ids), shard_size)]
+
+    compact_results = {key: {} for key in calculators}
+    audit_logs = {key: {} for key in calculators}
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_initializeWorker, initargs=(worker_calculators,)
+    ) as executor:
+        futures = [executor.submit(_runShard, shard, method) for shard in shards]
+        for future in as_completed(futures):
+            for key, (shard_results, shard_logs) in future.result().items():
+                compact_results[key].update(shard_results)
+                audit_logs[key].update(shard_logs)
+                if progress_bar is not None:
+                    progress_bar.Update(f"Weighed {len(compact_results[key])} of {len(origin_ids)} systems")
+                    for _ in shard_results:
+                        progress_bar.Advance()
+
+    return {
+        key: _rebuildResults(calculator, origin_systems, compact_results[key], audit_logs[key])
+        for key, calculator in calculators.items()
+    }
+
+
+def _rebuildResults(
+    calculator: WeightCalculator,
+    origin_systems: List[System],
+    compact_results: Dict[int, Tuple[int, list]],
+    audit_logs: Dict[int, List[tuple]],
+) -> Dict[int, Tuple[int, Dict[int, Any]]]:
+    client = origin_systems[0].client if len(origin_systems) > 0 else None
+    all_results = {}
+    for origin_system in origin_systems:
+        weight, results = compact_results[origin_system.Id]
+        all_results[origin_system.Id] = (
+            weight,
+            {
+                system_id: calculator.WeightResults(calculator.WeightFactors).Populate(
+                    client.Get("SYSTEMS", system_id), origin_system, jumps, (system_weight, individual_weights)
+                )
+                for system_id, jumps, system_weight, individual_weights in results
+            },
+        )
+        if origin_system.Id in audit_logs:
+            calculator.Audit.Extend(audit_logs[origin_system.Id])
+
+    calculator.MergeRuns(origin_systems, all_results)
+
+    return all_results
+
+
+def _initializeWorker(calculators: Dict[Any, WeightCalculator]):
+    global _worker_calculators
+    _worker_calculators = calculators
+
+
+def _runShard(
+    origin_ids: List[int], method: WeightMethod
+) -> Dict[Any, Tuple[Dict[int, Tuple[int, list]], Dict[int, List[tuple]]]]:
+    for calculator in _worker_calculators.values():
+        calculator.ClearAll()
+    systems = next(iter(_worker_calculators.values())).Systems
+    origins = [systems[origin_id] for origin_id in origin_ids]
+
+    shard = {}
+    for key, all_results in RunBatch(_worker_calculators, origins, method=method).items():
+        shard_results = {
+            origin_id: (weight, [result.AsTuple() for result in results.values()])
+            for origin_id, (weight, results) in all_results.items()
+        }
+        # only the search events, as the top systems within a shard mean nothing. They are recorded again by MergeRuns.
+        shard_logs = {
+            origin_id: [event for event in events if event[2] == AuditLevel.FULL.value]
+            for origin_id, events in _worker_calculators[key].Audit.Events.items()
+            if origin_id in shard_results
+        }
+        shard[key] = (shard_results, shard_logs)
+
+    return shard
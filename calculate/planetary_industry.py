@@ -1,13 +1,12 @@
 from __future__ import annotations
 
-from collections import Counter
 from dataclasses import dataclass, field
-from typing import List, Set, Tuple, Union
+from typing import Dict, Iterable, List, Sequence, Set, Tuple, Union
 
 import numpy
 
 import models.map as mapData
-from models.common import DECIMAL_FORMAT, iWeightFactor, iWeightResult, SecurityStatus
+from models.common import DECIMAL_FORMAT, iWeightFactor, iWeightResult, SecurityStatus, WeightMethod
 
 
 @dataclass
@@ -34,7 +33,12 @@ class PlanetaryIndustryResult(iWeightResult):
 
         return self
 
-    def getSymbol(self, symbol: str, html: bool = False) -> str:
+    def AsTuple(self) -> Tuple[int, int, float, Tuple[float, float, float, float]]:
+        """The numbers of this result, as (System.Id, JumpsFromOrigin, Weight, IndividualWeights). See DescribeResults"""
+        return (self.System.Id, self.JumpsFromOrigin, self.Weight, self.IndividualWeights)
+
+    @staticmethod
+    def getSymbol(symbol: str, html: bool = False) -> str:
         symbolLibrary = {
             "TitlePrefix": ("<b>", ">>>>>__________ "),
             "TitleSuffix": ("</b>", " __________<<<<<"),
@@ -47,38 +51,67 @@ class PlanetaryIndustryResult(iWeightResult):
 
         return symbolLibrary[symbol][0] if html else symbolLibrary[symbol][1]
 
-    def spacing(self, words: str, total_spacing: int) -> str:
+    @staticmethod
+    def spacing(words: str, total_spacing: int) -> str:
         return f"{words}{''.join([' ' for _ in range(total_spacing-len(words))])}"
 
     def Html(self, html: bool = True, simple: bool = False) -> str:
+        planet_counts = None
+        if not simple:
+            planet_counts = {
+                self.System.client.Get("PLANET_TYPES", type_id).Name: count
+                for type_id, count in self.System.PlanetTypeCounts.items()
+                if type_id in self.WeightFactors.PlanetTypesDesired
+            }
+
+        return self.Describe(
+            self.System.Name,
+            self.JumpsFromOrigin,
+            self.Weight,
+            self.IndividualWeights,
+            planet_counts=planet_counts,
+            html=html,
+            simple=simple,
+        )
+
+    @classmethod
+    def Describe(
+        cls,
+        system_name: str,
+        jumps_from_origin: int,
+        weight: float,
+        individual_weights: Tuple[float, float, float, float],
+        planet_counts: Dict[str, int] = None,
+        html: bool = True,
+        simple: bool = False,
+    ) -> str:
+        """
+        The text of Html() from just the numbers of a result.
+
+        :param planet_counts(Dict[str, int], default: None): PlanetType.Name: count, for the desired planet types in the
+            system. Not needed if simple.
+        """
         level_one_spacing = 30
         simple_spacing = 5
-        planets = [
-            planet
-            for planet in self.System.GetPlanets(cache=True)
-            if planet.Type_Id in self.WeightFactors.PlanetTypesDesired
-        ]
-        planet_counts = Counter([planet.GetType().Name for planet in planets])
-        planet_types_sub_str = " | ".join(sorted([f"{key} x{value}" for key, value in planet_counts.items()]))
-
         if simple:
-            system_name_str = f"{self.getSymbol('TitlePrefix',html=html)} {self.System.Name} (Jmp: {self.JumpsFromOrigin}) {self.getSymbol('TitleSuffix',html=html)}"
+            system_name_str = f"{cls.getSymbol('TitlePrefix',html=html)} {system_name} (Jmp: {jumps_from_origin}) {cls.getSymbol('TitleSuffix',html=html)}"
             weight_values_str = f" ".join(
                 [
-                    f"{self.getSymbol('Italic',html=html)}Weights: (T: {self.Weight}){self.getSymbol('EndItalic',html=html)}{self.getSymbol('NewLine',html=html)} "
-                    f"{self.spacing('Jmp:', simple_spacing)}{DECIMAL_FORMAT.format(self.IndividualWeights[0])}",
-                    f"{self.spacing('Div:', simple_spacing)}{DECIMAL_FORMAT.format(self.IndividualWeights[1])}",
-                    f"{self.spacing('Sec:', simple_spacing)}{DECIMAL_FORMAT.format(self.IndividualWeights[3])}",
-                    f"{self.spacing('Dns:', simple_spacing)}{DECIMAL_FORMAT.format(self.IndividualWeights[2])}",
+                    f"{cls.getSymbol('Italic',html=html)}Weights: (T: {weight}){cls.getSymbol('EndItalic',html=html)}{cls.getSymbol('NewLine',html=html)} "
+                    f"{cls.spacing('Jmp:', simple_spacing)}{DECIMAL_FORMAT.format(individual_weights[0])}",
+                    f"{cls.spacing('Div:', simple_spacing)}{DECIMAL_FORMAT.format(individual_weights[1])}",
+                    f"{cls.spacing('Sec:', simple_spacing)}{DECIMAL_FORMAT.format(individual_weights[3])}",
+                    f"{cls.spacing('Dns:', simple_spacing)}{DECIMAL_FORMAT.format(individual_weights[2])}",
                 ]
             )
 
             return system_name_str + weight_values_str
 
-        system_name_str = f"{self.getSymbol('TitlePrefix',html=html)}{self.System.Name} (Jumps: {self.JumpsFromOrigin}){self.getSymbol('TitleSuffix',html=html)}"
-        system_weight_str = f"{self.getSymbol('LevelOne',html=html)}{self.spacing('Weight:', level_one_spacing)}{self.getSymbol('EndItalic',html=html)}{self.Weight}"
-        weight_values_str = f"{self.getSymbol('LevelTwo',html=html)}Individual Weights:      Jumps: {self.getSymbol('EndItalic',html=html)}{DECIMAL_FORMAT.format(self.IndividualWeights[0])}, Diversity: {DECIMAL_FORMAT.format(self.IndividualWeights[1])}, Density: {DECIMAL_FORMAT.format(self.IndividualWeights[2])}, Security: {DECIMAL_FORMAT.format(self.IndividualWeights[3])}"
-        planet_types_str = f"{self.getSymbol('LevelOne',html=html)}{self.spacing('Planet Types Available:', level_one_spacing)}{self.getSymbol('EndItalic',html=html)}{planet_types_sub_str}"
+        planet_types_sub_str = " | ".join(sorted([f"{key} x{value}" for key, value in planet_counts.items()]))
+        system_name_str = f"{cls.getSymbol('TitlePrefix',html=html)}{system_name} (Jumps: {jumps_from_origin}){cls.getSymbol('TitleSuffix',html=html)}"
+        system_weight_str = f"{cls.getSymbol('LevelOne',html=html)}{cls.spacing('Weight:', level_one_spacing)}{cls.getSymbol('EndItalic',html=html)}{weight}"
+        weight_values_str = f"{cls.getSymbol('LevelTwo',html=html)}Individual Weights:      Jumps: {cls.getSymbol('EndItalic',html=html)}{DECIMAL_FORMAT.format(individual_weights[0])}, Diversity: {DECIMAL_FORMAT.format(individual_weights[1])}, Density: {DECIMAL_FORMAT.format(individual_weights[2])}, Security: {DECIMAL_FORMAT.format(individual_weights[3])}"
+        planet_types_str = f"{cls.getSymbol('LevelOne',html=html)}{cls.spacing('Planet Types Available:', level_one_spacing)}{cls.getSymbol('EndItalic',html=html)}{planet_types_sub_str}"
 
         return system_name_str + system_weight_str + weight_values_str + planet_types_str
 
@@ -86,6 +119,205 @@ class PlanetaryIndustryResult(iWeightResult):
         return self.Html(html=False)
 
 
+@dataclass
+class PlanetaryIndustryComponents:
+    """
+    What PlanetaryIndustryWeightFactor weights are made of, before its weights are applied, for every system that
+    contributed to every origin of a full map run. Which systems contribute only depends on the PlanetTypesDesired and
+    MaxJumps, so any other weights can be tried with Rescore() without searching the map again.
+
+    The systems of the origin at index i are at [Offsets[i]:Offsets[i + 1]] of the per system arrays.
+
+    :param PlanetTypesDesired(frozenset): The PlanetTypesDesired the origins were searched with.
+    :param MaxJumps(int): The MaxJumps the origins were searched with.
+    :param Origin_Ids(numpy.ndarray[int64]): The System.Id of each origin, in the order they were run.
+    :param Offsets(numpy.ndarray[int64]): Start of each origin's systems. Has one more entry than origins. Origins that
+        could not find everything have none.
+    :param Complete(numpy.ndarray[bool]): If each origin found everything.
+    :param System_Ids(numpy.ndarray[int64]): Each contributing system.
+    :param Jumps(numpy.ndarray[int64]): Its jumps from the origin.
+    :param Diversity(numpy.ndarray[int64]): How many of the desired planet types it has.
+    :param DensitySums(numpy.ndarray[int64]): The sum of the squared count of each desired planet type it has.
+    :param TotalPlanets(numpy.ndarray[int64]): How many planets it has, of any type.
+    :param Security(numpy.ndarray[float]): Its Security_Status.
+    """
+
+    PlanetTypesDesired: frozenset
+    MaxJumps: int
+    Origin_Ids: numpy.ndarray
+    Offsets: numpy.ndarray
+    Complete: numpy.ndarray
+    System_Ids: numpy.ndarray
+    Jumps: numpy.ndarray
+    Diversity: numpy.ndarray
+    DensitySums: numpy.ndarray
+    TotalPlanets: numpy.ndarray
+    Security: numpy.ndarray
+
+    @classmethod
+    def FromResults(
+        cls,
+        client: mapData.MapClient,
+        weight_factors: PlanetaryIndustryWeightFactor,
+        all_results: Dict[int, Tuple[float, Dict[int, iWeightResult]]],
+    ) -> PlanetaryIndustryComponents:
+        """
+        :param client(MapClient): For the planets and security of the contributing systems.
+        :param weight_factors(PlanetaryIndustryWeightFactor): The weight factors the origins were searched with.
+        :param all_results(Dict[int, Tuple[weight, results]]): The return of WeightCalculator.RunAll (or RunAllParallel)
+        """
+        desired = frozenset(weight_factors.PlanetTypesDesired)
+
+        system_ids = []
+        jumps = []
+        counts = [0]
+        complete = []
+        for weight, results in all_results.values():
+            complete.append(len(results) > 0)
+            for system_id, result in results.items():
+                system_ids.append(system_id)
+                jumps.append(result.JumpsFromOrigin)
+            counts.append(len(results))
+
+        # each system's stats are worked out once, however many origins it contributed to
+        unique_ids, inverse = numpy.unique(numpy.asarray(system_ids, dtype=numpy.int64), return_inverse=True)
+        stats = numpy.zeros((len(unique_ids), 3), dtype=numpy.int64)
+        security = numpy.zeros(len(unique_ids))
+        for index, system_id in enumerate(unique_ids.tolist()):
+            system = client.Get("SYSTEMS", system_id)
+            planet_counts = system.PlanetTypeCounts
+            stats[index, 0] = sum(1 for type_id, count in planet_counts.items() if type_id in desired and count > 0)
+            stats[index, 1] = sum(count**2 for type_id, count in planet_counts.items() if type_id in desired)
+            stats[index, 2] = sum(planet_counts.values())
+            security[index] = system.Security_Status
+
+        return cls(
+            PlanetTypesDesired=desired,
+            MaxJumps=weight_factors.MaxJumps,
+            Origin_Ids=numpy.fromiter(all_results.keys(), dtype=numpy.int64, count=len(all_results)),
+            Offsets=numpy.cumsum(numpy.asarray(counts, dtype=numpy.int64)),
+            Complete=numpy.asarray(complete, dtype=bool),
+            System_Ids=unique_ids[inverse],
+            Jumps=numpy.asarray(jumps, dtype=numpy.int64),
+            Diversity=stats[inverse, 0],
+            DensitySums=stats[inverse, 1],
+            TotalPlanets=stats[inverse, 2],
+            Security=security[inverse],
+        )
+
+    def SystemWeights(self, weight_factors: PlanetaryIndustryWeightFactor) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Every contributing system's weight with other weight factors. The same values DetermineSystemWeight gives.
+
+        returns: Total Weight(systems), (Jump_Value, Diversity_Value, Density_Value, Security_Value)(systems x 4)
+        """
+        if frozenset(weight_factors.PlanetTypesDesired) != self.PlanetTypesDesired or (
+            weight_factors.MaxJumps != self.MaxJumps
+        ):
+            raise ValueError("Changing the PlanetTypesDesired or MaxJumps changes which systems contribute. Run again.")
+
+        components = numpy.zeros((len(self.System_Ids), 4))
+        components[:, 0] = weight_factors._calculateJumpValue(self.Jumps)
+        components[:, 1] = self.Diversity * weight_factors.TypeDiversityWeight
+        if weight_factors.UseAverageDensity:
+            average = numpy.divide(
+                self.DensitySums,
+                self.TotalPlanets,
+                out=numpy.full(len(self.DensitySums), numpy.nan),
+                where=self.TotalPlanets > 0,
+            )
+            components[:, 2] = numpy.floor((average * 100)) / 1000 * weight_factors.TypeDensityWeight
+        else:
+            components[:, 2] = self.DensitySums * weight_factors.TypeDensityWeight
+        components[:, 3] = weight_factors._calculateSecurityStatusWeight(self.Security)
+
+        # added up in the same order as AddJumpWeight
+        totals = components[:, 0] + components[:, 1] + components[:, 2] + components[:, 3]
+
+        return totals, components
+
+    def Rescore(
+        self, weight_factors: PlanetaryIndustryWeightFactor, method: WeightMethod = WeightMethod.AVERAGE
+    ) -> Dict[int, float]:
+        """
+        The weight of every origin with other weight factors, as WeightCalculator.Run would give it. Origins that could
+        not find everything stay at -1.
+
+        NOTE: Run adds up the weights in the order the systems were searched, which is not kept, so the last digit of a
+        weight can very rarely differ from a new Run.
+
+        :param weight_factors(PlanetaryIndustryWeightFactor): The new weights. PlanetTypesDesired and MaxJumps must be the
+            same as the origins were searched with.
+        :param method(WeightMethod, Default:AVERAGE): How the weight is returned, AVERAGE or TOTAL.
+        """
+        totals, _ = self.SystemWeights(weight_factors)
+
+        weights = numpy.full(len(self.Origin_Ids), -1.0)
+        if self.Complete.any():
+            # every complete origin has at least its own system, so none of these sums are empty
+            sums = numpy.add.reduceat(totals, self.Offsets[:-1][self.Complete])
+            match method:
+                case WeightMethod.AVERAGE:
+                    sums = sums / numpy.diff(self.Offsets)[self.Complete]
+                case WeightMethod.TOTAL:
+                    pass
+                case _:
+                    raise ValueError(f"Can only rescore by AVERAGE or TOTAL, not {method.name}")
+            weights[self.Complete] = numpy.floor(sums * 10) / 100
+
+        return dict(zip(self.Origin_Ids.tolist(), weights.tolist()))
+
+
+def DescribeResults(
+    client: mapData.MapClient,
+    planet_type_ids_desired: Iterable[int],
+    all_rows: Iterable[Sequence[Tuple[int, int, float, Tuple[float, float, float, float]]]],
+    html: bool = True,
+    simple: bool = False,
+) -> List[str]:
+    """
+    PlanetaryIndustryResult.Html for many origins at once, from the numbers of their results, so the text only has to be
+    made when it is shown.
+
+    :param client(MapClient): For the names of the systems and planet types.
+    :param planet_type_ids_desired(Iterable[int]): The PlanetTypesDesired of the weight factors.
+    :param all_rows(Iterable[Sequence[tuple]]): For each origin, the AsTuple() of each of its results (or the Systems of
+        an OriginSummary).
+
+    returns: The text for each origin, with the text of each of its results joined by a new line.
+    """
+    desired = set(planet_type_ids_desired)
+    planet_type_names = {} if simple else {type_id: client.Get("PLANET_TYPES", type_id).Name for type_id in desired}
+    new_line = PlanetaryIndustryResult.getSymbol("NewLine", html=html)
+
+    descriptions = []
+    for rows in all_rows:
+        parts = []
+        for system_id, jumps, weight, individual_weights in rows:
+            system = client.Get("SYSTEMS", system_id)
+            planet_counts = None
+            if not simple:
+                planet_counts = {
+                    planet_type_names[type_id]: count
+                    for type_id, count in system.PlanetTypeCounts.items()
+                    if type_id in desired
+                }
+            parts.append(
+                PlanetaryIndustryResult.Describe(
+                    system.Name,
+                    jumps,
+                    weight,
+                    individual_weights,
+                    planet_counts=planet_counts,
+                    html=html,
+                    simple=simple,
+                )
+            )
+        descriptions.append(new_line.join(parts))
+
+    return descriptions
+
+
 @dataclass
 class PlanetaryIndustryWeightFactor(iWeightFactor):
     """ "
@@ -133,11 +365,72 @@ class PlanetaryIndustryWeightFactor(iWeightFactor):
 
         returns: Total Weight, (Jump_Value, Diversity_Value, Density_Value, Security_Value), set(PlanetTypeIDsFound)
         """
+        return self.AddJumpWeight(self.DetermineStaticSystemWeight(system), jumps_from_source)
+
+    def DetermineStaticSystemWeight(self, system: mapData.System) -> Tuple[Tuple[int, int, int], Set[int]]:
+        """
+        The parts of the system weight that do not depend on the jumps from the source.
+        A single row call to DetermineAllSystemWeights.
+
+        returns: (Diversity_Value, Density_Value, Security_Value), set(PlanetTypeIDsFound)
+        """
+        planet_counts = system.PlanetTypeCounts
+        type_ids = numpy.fromiter(planet_counts.keys(), dtype=numpy.int64, count=len(planet_counts))
+        type_counts = numpy.fromiter(planet_counts.values(), dtype=numpy.int64, count=len(planet_counts))
+        _, components, found = self.DetermineAllSystemWeights(
+            type_counts[numpy.newaxis, :], type_ids, numpy.asarray([system.Security_Status])
+        )
+
+        return (
+            (int(components[0, 1]), components[0, 2], components[0, 3]),
+            set(type_ids[found[0]].tolist()),
+        )
+
+    def DetermineAllSystemWeights(
+        self,
+        type_counts: numpy.ndarray,
+        type_ids: Sequence[int],
+        security: numpy.ndarray,
+        jumps_from_source: Union[int, numpy.ndarray] = None,
+    ) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """
+        Weighs many systems at once. Gives the same values as DetermineSystemWeight, one row per system.
+
+        :param type_counts(numpy.ndarray[int]): systems x planet types matrix of how many planets of each type a system has.
+            Every planet in the system should be counted, desired or not, as the average density is over all of them.
+        :param type_ids(Sequence[int]): The Planet Type Id of each column in type_counts.
+        :param security(numpy.ndarray[float]): The Security_Status of each system.
+        :param jumps_from_source(int|numpy.ndarray[int], default: None): The jumps from the source for each system, or one
+            value for all of them. If None, the jump value is left as 0.
+
+        returns: Total Weight(systems), (Jump_Value, Diversity_Value, Density_Value, Security_Value)(systems x 4),
+            PlanetTypeIDsFound(systems x planet types, bool - by column of type_counts)
+        """
+        type_counts = numpy.asarray(type_counts)
+        # planet types are columns, so there are only ever a handful to check
+        desired_types = set(self.PlanetTypesDesired)
+        desired = numpy.fromiter((type_id in desired_types for type_id in type_ids), dtype=bool, count=len(type_ids))
+        found = (type_counts > 0) & desired
+
+        components = numpy.zeros((type_counts.shape[0], 4))
+        if jumps_from_source is not None:
+            components[:, 0] = self._calculateJumpValue(numpy.asarray(jumps_from_source))
+        components[:, 1] = numpy.count_nonzero(found, axis=1) * self.TypeDiversityWeight
+        components[:, 2] = self._calculateDensityValues(type_counts, desired)
+        components[:, 3] = self._calculateSecurityStatusWeight(numpy.asarray(security, dtype=float))
+
+        return components.sum(axis=1), components, found
+
+    def AddJumpWeight(
+        self, static_weight: Tuple[Tuple[int, int, int], Set[int]], jumps_from_source: int
+    ) -> Tuple[int, Tuple[int, int, int, int], Set[int]]:
+        """
+        Adds the Jump Value to a DetermineStaticSystemWeight result.
+
+        returns: Total Weight, (Jump_Value, Diversity_Value, Density_Value, Security_Value), set(PlanetTypeIDsFound)
+        """
+        (diversity_value, density_value, security_value), planet_type_ids_found = static_weight
         jump_value = self._calculateJumpValue(jumps_from_source)
-        diversity_value = self._calculateDiversityValue(system.PlanetTypes_Ids)
-        density_value = self._calculateDensityValue(system.PlanetTypes_Ids)
-        security_value = self._calculateSecurityStatusWeight(system.Security_Status)
-        planet_type_ids_found = self._determine_what_was_found(system.PlanetTypes_Ids)
 
         return (
             jump_value + diversity_value + density_value + security_value,
@@ -145,40 +438,43 @@ class PlanetaryIndustryWeightFactor(iWeightFactor):
             planet_type_ids_found,
         )
 
-    def _calculateSecurityStatusWeight(self, system_security: float) -> float:
+    def _calculateSecurityStatusWeight(
+        self, system_security: Union[float, numpy.ndarray]
+    ) -> Union[float, numpy.ndarray]:
         adjusted_security = numpy.floor(system_security * 10)
 
         match self.SecurityPreference:
             case SecurityStatus.HIGH_SEC:
                 pass
             case SecurityStatus.LOW_SEC:
-                if adjusted_security < 5 and adjusted_security > 0:
-                    adjusted_security += 5
-                elif adjusted_security >= 5:
-                    adjusted_security -= 5
+                adjusted_security = numpy.where(
+                    (adjusted_security < 5) & (adjusted_security > 0),
+                    adjusted_security + 5,
+                    numpy.where(adjusted_security >= 5, adjusted_security - 5, adjusted_security),
+                )
             case SecurityStatus.NULL_SEC:
                 adjusted_security = -adjusted_security
 
         return adjusted_security / 10 * self.SecurityWeight
 
-    def _calculateDensityValue(self, planet_type_ids: List[int]) -> Union[int, float]:
-        density_data = [ptype for ptype in planet_type_ids if ptype in self.PlanetTypesDesired]
-        density_counts = [density_data.count(ptype) for ptype in planet_type_ids]
+    def _calculateDensityValues(self, type_counts: numpy.ndarray, desired: numpy.ndarray) -> numpy.ndarray:
+        # Every planet of a desired type counts how many planets share its type, so each desired type adds count squared.
+        # Planets of other types count 0, but are still part of the average.
+        density_sums = (type_counts[:, desired].astype(numpy.int64) ** 2).sum(axis=1)
 
         if self.UseAverageDensity:
+            total_planets = type_counts.sum(axis=1)
+            # systems without planets have no average, as numpy.average([]) would give
+            average = numpy.divide(
+                density_sums, total_planets, out=numpy.full(len(density_sums), numpy.nan), where=total_planets > 0
+            )
             # use floor(average*100)/1000 in order to round down to 2 decimal places.
-            density_value = numpy.floor((numpy.average(density_counts) * 100)) / 1000
+            density_value = numpy.floor((average * 100)) / 1000
 
         else:
-            density_value = numpy.sum(density_counts)
+            density_value = density_sums
 
         return density_value * self.TypeDensityWeight
 
-    def _calculateDiversityValue(self, planet_type_ids: List[int]) -> int:
-        return len({ptype for ptype in planet_type_ids if ptype in self.PlanetTypesDesired}) * self.TypeDiversityWeight
-
     def _calculateJumpValue(self, jumps_from_source: int) -> int:
         return (self.MaxJumps - jumps_from_source) * self.JumpWeight
-
-    def _determine_what_was_found(self, planet_type_ids: List[int]) -> Set[int]:
-        return set(self.PlanetTypesDesired).intersection(set(planet_type_ids))
@@ -1,9 +1,55 @@
+from __future__ import annotations
+
+import copy
 from dataclasses import dataclass, field
-from typing import Dict, Tuple
+from typing import Callable, Dict, Optional, Tuple
 
+from calculate.audit_log import AuditLog
 from calculate.planetary_industry import *
-from models.common import WeightMethod
+from calculate.top_origins import TopOrigins
+from logic.common import ProgressBar
+from models.common import SearchMethod, WeightMethod
 from models.map import *
+from models.planet_type_counts import PlanetTypeCounts
+from models.stargate_graph import StargateGraph
+
+
+@dataclass
+class Neighborhood:
+    """
+    The systems within MaxJumps of an origin system and how they link to each other, worked out once so that many
+    WeightCalculators (ie: one per commodity) can search around the same origin without walking the map again.
+
+    :param Origin_Id(int): The System.Id of the origin system.
+    :param MaxJumps(int): How far out from the origin the neighborhood reaches.
+    :param Jumps(Dict[int, int]): System.Id: the fewest jumps from the origin, for every system in the neighborhood.
+    :param Links(Dict[int, List[System]]): System.Id: linked systems, for every system fewer than MaxJumps jumps out. These
+        are the only systems a search out to MaxJumps ever asks for the links of.
+    """
+
+    Origin_Id: int
+    MaxJumps: int
+    Jumps: Dict[int, int]
+    Links: Dict[int, List[System]]
+
+    @classmethod
+    def Around(
+        cls, origin_system: System, max_jumps: int, get_linked_systems: Callable[[System], List[System]]
+    ) -> Neighborhood:
+        jumps = {origin_system.Id: 0}
+        links = {}
+        level = [origin_system]
+        for current_jumps in range(max_jumps):
+            next_level = []
+            for system in level:
+                links[system.Id] = get_linked_systems(system)
+                for linked_system in links[system.Id]:
+                    if linked_system.Id not in jumps:
+                        jumps[linked_system.Id] = current_jumps + 1
+                        next_level.append(linked_system)
+            level = next_level
+
+        return cls(Origin_Id=origin_system.Id, MaxJumps=max_jumps, Jumps=jumps, Links=links)
 
 
 @dataclass
@@ -14,17 +60,45 @@ class WeightCalculator:
     :param WeightFactors(iWeightFactor): The Weighting class that contains the factors to weigh against and any other necessary values to perform the evaluation.
     :param WeightResults(object): The Weighting Results class that contains a Populate method and the values for each individual system that is part of the overall weight.
     :param MustFindTargets(Set[Any]): A set of values that must be found. The iWeightFactor.DetermineSystemWeight should return a set of any values that matched this as its 3rd value.
+        Which values a system matches must not depend on its jumps from the origin, as they are only worked out once per
+        system for as long as MustFindTargets and WeightFactors stay the same.
     :param MustFindPenalty(Int): A value that will be applied to any chain that does not find all the targets in MustFindTargets.
     :param MaxJumps(int, 3): The maximum number of jumps to check around the OriginSystem (which is 0)
+    :param Search(SearchMethod, default: BREADTH_FIRST): How the systems around the origin are walked.
+        BREADTH_FIRST visits each system once, at its fewest jumps from the origin, and keeps every system on a shortest
+        path that finds all of MustFindTargets. It grows linearly with the number of stargates in range, and the order
+        they are listed in makes no difference. DEPTH_FIRST is the original recursive walk, which re-walks a system every
+        time it is reached by another path that is no longer than before and so grows exponentially with MaxJumps. Where
+        the map around the origin has no loops they give the same results, otherwise they can differ:
+        - DEPTH_FIRST also follows paths that are longer than the fewest jumps to a system, if it reaches the system
+          that way first, so it can complete a path (and weigh a system at more jumps) that BREADTH_FIRST never walks.
+        - DEPTH_FIRST drops a system when the last path through it does not find everything, even if an earlier one
+          did, while BREADTH_FIRST keeps any system on a shortest path that does.
+    :param Graph(StargateGraph, default: None): If given, linked systems are read from its arrays rather than from
+        System.GetLinkedSystems()
+    :param Systems(Dict[int, Any], default: None): If given along with Graph, linked System.Ids are resolved from here
+        instead of the MapClient. Lets the calculator run on lightweight stand-ins for System (see calculate.parallel_search)
+    :param TypeCounts(PlanetTypeCounts, default: None): If given, and the WeightFactors have PlanetTypesDesired, the values
+        every system matches are read from its matrix in one go whenever MustFindTargets or WeightFactors change, rather
+        than as each system is first weighed.
+    :param Audit(AuditLog, default: AuditLog()): Where what each Run() did is recorded. Set its Level to OFF to record
+        nothing, or its FilePath to stream the events to disk rather than keep them in memory.
+    :param TopCount(int, default: None): If given, only the TopCount highest weighted origins are kept (in TopOrigins),
+        with earlier origins winning ties, rather than every origin that ties for the top weight.
+    :param CompactTop(bool, default: False): With TopCount, keep an OriginSummary of each top origin rather than its
+        results objects.
     :param CACHE_EXPENSIVE_CALLS(bool, default: False):  If false, will perform expensive calculations in func calls like System.GetLinkedSystems() everytime, otherwise will cache the responses.
         NOTE: Its useful to leave this False while Debugging, so as not to overwhelm the debugger with looped/recursive Object<->Object relationships
 
     :attributes TopWeight(float): The highest weight discovered
     :attributes TopDetails(Dict[int, Dict[int, int]]) Dictionary of all the top weights - originSystemId:{systemId: weight}
-    :attributes AllAuditLogs(Dict[int, List[str]]) All auditing logs run by this calculator, by organized by OriginSystem_Id of each Run command.
+        With TopCount, the kept origins best first - originSystemId: results (or OriginSummary with CompactTop), worked
+        out from TopOrigins when read after it has changed
+    :attributes TopOrigins(TopOrigins): The kept origins, if TopCount is given.
 
     :method Run() - Run the calculations
-    :method GetAuditFor() - Get the Audit logs for a particular key in the AllAuditLogs
+    :method RunAll() - Run the calculations for many origin systems as one batch, sharing the per system weights
+    :method GetLogs() - Get the Audit logs kept in memory for a particular origin system
 
     """
 
@@ -34,10 +108,16 @@ class WeightCalculator:
     MustFindTargets: Set[Any] = field(kw_only=True, default_factory=set)
     MaxJumps: int = field(kw_only=True, default=3)
     CACHE_EXPENSIVE_CALLS: bool = field(kw_only=True, default=False)
+    Search: SearchMethod = field(kw_only=True, default=SearchMethod.BREADTH_FIRST)
+    Graph: StargateGraph = field(kw_only=True, default=None)
+    Systems: Dict[int, Any] = field(kw_only=True, default=None)
+    TypeCounts: PlanetTypeCounts = field(kw_only=True, default=None)
+    Audit: AuditLog = field(kw_only=True, default_factory=AuditLog)
+    TopCount: Optional[int] = field(kw_only=True, default=None)
+    CompactTop: bool = field(kw_only=True, default=False)
     # Attributes
     TopWeight: float = field(init=False, default=0)
-    TopDetails: Dict[int, Dict[int, int]] = field(init=False, default=dict)
-    AllAuditLogs: Dict[int, List[str]] = field(init=False, default_factory=dict)
+    TopOrigins: Optional[TopOrigins] = field(init=False, default=None)
 
     # Internal Use
     # Passing Origin System in through Run we can use the WeightResults.Populate() command to keep a record for each system
@@ -46,27 +126,81 @@ class WeightCalculator:
     # Similar to _origin_system, _results is for keeping track of a particular source node while using calculate in a loop
     _results: Dict[int, Any] = field(init=False, default_factory=dict)
 
+    # see TopDetails. With TopCount, _topDetailsStale is set when TopOrigins keeps a new origin.
+    _topDetails: Dict[int, Any] = field(init=False, default_factory=dict)
+    _topDetailsStale: bool = field(init=False, default=False)
+
     _systemIdsAlreadySearched: Dict[int, int] = field(init=False, default_factory=dict)
     """
         _systemIdsAlreadySearched is a dict of SystemId: JumpsFromSource. This allows finding an already searched system
             that is less jumps away from the origin than currently remembered.
     """
+    # SystemId: WeightFactors.DetermineStaticSystemWeight() result, shared between the origins of a RunAll() call.
+    # None outside of RunAll(), as the WeightFactors may be changed between separate Run() calls.
+    _staticWeights: Optional[Dict[int, Any]] = field(init=False, default=None)
+    # SystemId: matched values mask (see _maskOf). Kept between Run() calls until MustFindTargets or WeightFactors change,
+    # which is checked against _maskFactors, a copy of the WeightFactors the masks were found with.
+    _systemMasks: Dict[int, int] = field(init=False, default_factory=dict)
+    _maskFactors: Any = field(init=False, default=None)
+    # The Neighborhood of the current Run(), if one was given. Linked systems are read from it rather than the map.
+    _neighborhood: Optional[Neighborhood] = field(init=False, default=None)
+    # Matched values are carried through the searches as integer bitmasks. Each value that is matched gets its own bit,
+    # with MustFindTargets taking the lowest bits, so a path has found everything when its mask == _targetMask. The bit
+    # just above them is never given to a value, see _pathKeyOf.
+    _valueBits: Dict[Any, int] = field(init=False, default_factory=dict)
+    _targetValues: frozenset = field(init=False, default=None)
+    _targetMask: int = field(init=False, default=0)
+    _otherBit: int = field(init=False, default=0)
+    _maskValues: Dict[int, frozenset] = field(init=False, default_factory=dict)
+    # (bit, set of the path keys with the bit, set of the path keys without it) for each bit a path key can have, with
+    # sets of path keys as integers - see _searchBreadthFirst
+    _pathBits: List[Tuple[int, int, int]] = field(init=False, default_factory=list)
 
     def __post_init__(self):
         # Ensure the max jumps are the same, if the WeightFactors uses MaxJumps
         if hasattr(self.WeightFactors, "MaxJumps"):
             self.WeightFactors.MaxJumps = self.MaxJumps
+        if self.TopCount is not None:
+            self.TopOrigins = TopOrigins(self.TopCount, Compact=self.CompactTop)
+
+    @property
+    def TopDetails(self) -> Dict[int, Any]:
+        if self._topDetailsStale:
+            self._topDetails = {origin_id: details for origin_id, _, details in self.TopOrigins.Ranked()}
+            self._topDetailsStale = False
+        return self._topDetails
+
+    @TopDetails.setter
+    def TopDetails(self, top_details: Dict[int, Any]):
+        self._topDetails = top_details
+        self._topDetailsStale = False
+
+    def SearchesLike(self, other: WeightCalculator) -> bool:
+        """If both calculators would give the same results for any origin system, so only one needs to be run"""
+        return (
+            self.WeightFactors == other.WeightFactors
+            and self.WeightResults is other.WeightResults
+            and self.MustFindTargets == other.MustFindTargets
+            and self.MaxJumps == other.MaxJumps
+            and self.Search == other.Search
+            and self.Graph is other.Graph
+            and self.Systems is other.Systems
+        )
 
     def GetLogs(self, key) -> List[str]:
         if isinstance(key, str):
             key = int(key)
-        return self.AllAuditLogs[key]
+        return self.Audit.Lines(key)
 
-    def Run(self, origin_system: System, method: WeightMethod = WeightMethod.AVERAGE) -> Tuple[int, Dict[int, Any]]:
+    def Run(
+        self, origin_system: System, method: WeightMethod = WeightMethod.AVERAGE, neighborhood: Neighborhood = None
+    ) -> Tuple[int, Dict[int, Any]]:
         """Runs the Calculations for Weighing each System within MaxJumps from the origin_system
 
         :param origin_system(System): The starting point to search MaxJumps away from.
         :param method(WeightMethod, Default:AVERAGE): How the weight is returned
+        :param neighborhood(Neighborhood, Default:None): If given, the already walked systems around origin_system. Must
+            reach at least MaxJumps out.
 
         :return weight(int): The weight for the system, with the given method.
         :return results(Dict[int, int]): a dictionary of SystemIds and their weights.
@@ -74,11 +208,22 @@ class WeightCalculator:
         # clear the results
         self.Clear()
         self._origin_system = origin_system
-        self._add_log(f"==== New Run started for {origin_system.Name} ====")
-        self._add_log(f" *** Expected Match Values: {self.MustFindTargets}")
-
-        # weigh the origin system with None as Previous and 0 as current_jumps
-        any_matches = self._checkNextSystem(origin_system, None, 0, set())
+        if neighborhood is not None:
+            if neighborhood.Origin_Id != origin_system.Id or neighborhood.MaxJumps < self.MaxJumps:
+                raise ValueError(f"The Neighborhood does not cover {self.MaxJumps} jumps around {origin_system.Name}")
+            self._neighborhood = neighborhood
+        if self._targetValues != self.MustFindTargets or self._maskFactors != self.WeightFactors:
+            self._setTargets()
+        if self.Audit.Full:
+            self._audit("RUN_STARTED")
+            self._audit("EXPECTED_VALUES", self._targetValues)
+
+        match self.Search:
+            case SearchMethod.DEPTH_FIRST:
+                # weigh the origin system with None as Previous and 0 as current_jumps
+                any_matches = self._checkNextSystem(origin_system, None, 0, 0)
+            case _:
+                any_matches = self._searchBreadthFirst(origin_system)
 
         if any_matches:
             raw_weight = [w.Weight for w in self._results.values()]
@@ -89,92 +234,342 @@ class WeightCalculator:
                     weight = numpy.floor(numpy.sum(raw_weight) * 10) / 100
                 case _:
                     weight = raw_weight
-            self._add_log(
-                f"==== Run Complete: Raw Weight:{raw_weight} | Recorded Weight by {method.name}: {weight} ===="
-            )
+            if self.Audit.Full:
+                self._audit("RUN_COMPLETE", raw_weight, method.name, weight)
         else:
             weight = -1
             self._results = {}
-            self._add_log(f"==== Run Complete: Not able to find complete match. Weight: -1 ====")
+            if self.Audit.Full:
+                self._audit("RUN_INCOMPLETE")
 
         self._results = dict(sorted(self._results.items(), key=lambda x: x[1].SortValue, reverse=True))
         self._recordTopValues(weight, origin_system.Id)
 
         return weight, self._results
 
+    def RunAll(
+        self,
+        origin_systems: List[System],
+        method: WeightMethod = WeightMethod.AVERAGE,
+        progress_bar: ProgressBar = None,
+    ) -> Dict[int, Tuple[int, Dict[int, Any]]]:
+        """Runs the Calculations for every one of origin_systems as a single batch.
+
+        Each system's weight that does not depend on the origin (everything but the jumps) is worked out the first time any
+        origin reaches it and reused by every other origin, so only the jump weight is added per origin. Falls back to
+        weighing every visit when the WeightFactors do not implement DetermineStaticSystemWeight/AddJumpWeight.
+
+        :param origin_systems(List[System]): The systems to search MaxJumps away from.
+        :param method(WeightMethod, Default:AVERAGE): How the weight is returned
+        :param progress_bar(ProgressBar, Default:None): If given, updated and advanced once per origin system.
+
+        :return Dict[int, Tuple[weight, results]]: The return of Run() for each origin, by origin System.Id
+        """
+        all_results = {}
+        self._staticWeights = self._sharedStaticWeights()
+        try:
+            for origin_system in origin_systems:
+                if progress_bar is not None:
+                    progress_bar.Update(f"Weighing {origin_system.Name}")
+                all_results[origin_system.Id] = self.Run(origin_system, method=method)
+                if progress_bar is not None:
+                    progress_bar.Advance()
+        finally:
+            self._staticWeights = None
+
+        return all_results
+
+    def MergeRuns(self, origin_systems: List[System], all_results: Dict[int, Tuple[int, Dict[int, Any]]]):
+        """Records TopWeight and TopDetails for the results of Run() calls made elsewhere, such as in worker processes.
+
+        Origins are recorded in the order of origin_systems, so ties come out the same as a RunAll() over the same list.
+
+        :param origin_systems(List[System]): The origin systems that were run.
+        :param all_results(Dict[int, Tuple[weight, results]]): The return of Run() for each origin, by origin System.Id
+        """
+        for origin_system in origin_systems:
+            weight, results = all_results[origin_system.Id]
+            self._origin_system = origin_system
+            self._results = results
+            self._recordTopValues(weight, origin_system.Id)
+
+        self.Clear()
+
     def Clear(self):
         """Used to Clear the saved values (but not the State of all Run() Calls) between Run() calls"""
         self._results = {}
         self._systemIdsAlreadySearched = {}
         self._origin_system = None
+        self._neighborhood = None
 
     def ClearAll(self):
         """Used to Clear the state of all Run() calls, to reuse the same Calculator object"""
         self.TopWeight = 0
         self.TopDetails = {}
-        self.AllAuditLogs = {}
+        self.Audit.Clear()
+        if self.TopOrigins is not None:
+            self.TopOrigins.Clear()
         self._results = {}
         self._systemIdsAlreadySearched = {}
         self._origin_system = None
+        self._neighborhood = None
+        self._targetValues = None
+        self._systemMasks = {}
 
     def _recordTopValues(self, weight: float, origin_system_id: int):
         """
         Stateful method. This records the top responses (and all of them in ties) for every call of Run() on a given calculator.
+        With TopCount, the origin is offered to TopOrigins instead.
         """
+        if self.TopOrigins is not None:
+            # origins that could not find everything are never worth keeping
+            if weight >= 0 and self.TopOrigins.Push(origin_system_id, weight, self._results):
+                self.TopWeight = max(self.TopWeight, weight)
+                self._topDetailsStale = True
+                if self.Audit.Top:
+                    self._audit("KEPT_TOP", self.TopCount, weight)
+            return
+
         if weight > self.TopWeight:
             self.TopWeight = weight
-            self.TopDetails = {origin_system_id: self._results}
-            self._add_log("New Top Origin System (Previous Systems Removed)")
-            self.AllAuditLogs[
-                1
-            ] = f"[TOP_SYSTEM] {self._origin_system.Name} is new top system with Weight {weight} (removed previous systems)"
+            self._topDetails = {origin_system_id: self._results}
+            if self.Audit.Top:
+                self._audit("NEW_TOP", weight)
 
         if weight == self.TopWeight:
-            self.TopDetails[origin_system_id] = self._results
-            self._add_log("Current Origin System matches Top Weight, adding to To Details")
-            self.AllAuditLogs[
-                1
-            ] = f"[TOP_SYSTEM] {self._origin_system.Name} Matches current top weight ({weight}) (added details to existing)"
+            self._topDetails[origin_system_id] = self._results
+            if self.Audit.Top:
+                self._audit("MATCHES_TOP", weight)
+
+    def _sharedStaticWeights(self) -> Optional[Dict[int, Any]]:
+        """An empty _staticWeights for a batch of origins, or None if the WeightFactors cannot share them (see RunAll)"""
+        factors_class = type(self.WeightFactors)
+        if (
+            factors_class.DetermineStaticSystemWeight is iWeightFactor.DetermineStaticSystemWeight
+            or factors_class.AddJumpWeight is iWeightFactor.AddJumpWeight
+        ):
+            return None
+        return {}
 
-    def _add_log(self, message: str):
+    def _audit(self, event: str, *args):
         """
-        Adds an Audit log to the current origin system
+        Records an event (see calculate.audit_log.AUDIT_EVENTS) for the current origin system. Check Audit.Top/Full first,
+        so that nothing is gathered for events that are not recorded.
         """
-        if self.AllAuditLogs.get(self._origin_system.Id, None) is None:
-            self.AllAuditLogs[self._origin_system.Id] = []
-        prefix = f"[Run{len(self.AllAuditLogs.keys())}|{self._origin_system.Name}#{self._origin_system.Id}]"
-        self.AllAuditLogs[self._origin_system.Id].append(prefix + message)
+        self.Audit.Record(self._origin_system, event, *args)
+
+    def _weighSystem(self, system: System, current_jumps: int) -> Tuple[Any, Any, int]:
+        """
+        WeightFactors.DetermineSystemWeight, with the matched values as a bitmask (see _maskOf). The mask is worked out
+        once per system, and during RunAll() so is the origin independent part of the weight.
+        """
+        mask = self._systemMasks.get(system.Id, None)
+        if self._staticWeights is None:
+            weight, weight_values, matched_values = self.WeightFactors.DetermineSystemWeight(system, current_jumps)
+            if mask is None:
+                mask = self._systemMasks[system.Id] = self._maskOf(matched_values)
+            return weight, weight_values, mask
+
+        static_weight = self._staticWeights.get(system.Id, None)
+        if static_weight is None:
+            static_weight = self._staticWeights[system.Id] = self.WeightFactors.DetermineStaticSystemWeight(system)
+        if mask is None:
+            mask = self._systemMasks[system.Id] = self._maskOf(self.WeightFactors.AddJumpWeight(static_weight, 0)[2])
+
+        weight, weight_values, _ = self.WeightFactors.AddJumpWeight(static_weight, current_jumps)
+        return weight, weight_values, mask
+
+    def _setTargets(self):
+        self._targetValues = frozenset(self.MustFindTargets)
+        self._valueBits = {value: 1 << bit for bit, value in enumerate(self._targetValues)}
+        self._targetMask = (1 << len(self._valueBits)) - 1
+        self._otherBit = self._targetMask + 1
+        self._maskValues = {}
+        self._maskFactors = copy.deepcopy(self.WeightFactors)
+        self._systemMasks = {}
+        if self.TypeCounts is not None and hasattr(self.WeightFactors, "PlanetTypesDesired"):
+            self._systemMasks = self._masksFromTypeCounts()
+
+        # a path key is a number below _otherBit * 2, so there are that many bits in a set of them
+        all_keys = range(self._otherBit * 2)
+        self._pathBits = [
+            (bit, sum(1 << key for key in all_keys if key & bit), sum(1 << key for key in all_keys if not key & bit))
+            for bit in (1 << index for index in range(self._otherBit.bit_length()))
+        ]
+
+    def _masksFromTypeCounts(self) -> Dict[int, int]:
+        """The mask of every system in TypeCounts: the PlanetTypesDesired it has planets of"""
+        desired = set(self.WeightFactors.PlanetTypesDesired)
+        type_ids = self.TypeCounts.PlanetType_Ids.tolist()
+        columns = [column for column, type_id in enumerate(type_ids) if type_id in desired]
+        bits = numpy.asarray([self._maskOf([type_ids[column]]) for column in columns], dtype=numpy.uint64)
+        # each column has its own bit, so adding them up is the same as or-ing them together
+        masks = (self.TypeCounts.Counts[:, columns] > 0).astype(numpy.uint64) @ bits
+        return dict(zip(self.TypeCounts.System_Ids.tolist(), masks.tolist()))
+
+    def _maskOf(self, values: Iterable[Any]) -> int:
+        mask = 0
+        for value in values:
+            bit = self._valueBits.get(value, None)
+            if bit is None:
+                # skipping _otherBit
+                bit = self._valueBits[value] = 1 << (len(self._valueBits) + 1)
+            mask |= bit
+        return mask
+
+    def _pathKeyOf(self, mask: int) -> int:
+        """
+        A mask as _searchBreadthFirst carries it: only the MustFindTargets bits, plus _otherBit if it matched anything
+        else. A path that has matched something else can never equal _targetMask, whatever else it matched.
+        """
+        return mask if mask <= self._targetMask else (mask & self._targetMask) | self._otherBit
+
+    def _orInto(self, paths: int, key: int) -> int:
+        """The set of path keys paths, with key or-ed into every one of them"""
+        for bit, with_bit, without_bit in self._pathBits:
+            if key & bit:
+                paths = (paths & with_bit) | ((paths & without_bit) << bit)
+        return paths
+
+    def _orFrom(self, paths: int, key: int) -> int:
+        """The set of every path key that is in the set paths once key is or-ed into it"""
+        for bit, with_bit, _ in self._pathBits:
+            if key & bit:
+                paths &= with_bit
+                paths |= paths >> bit
+        return paths
+
+    def _valuesOf(self, mask: int) -> frozenset:
+        """The matched values in a mask, for the audit logs"""
+        values = self._maskValues.get(mask, None)
+        if values is None:
+            values = self._maskValues[mask] = frozenset(value for value, bit in self._valueBits.items() if mask & bit)
+        return values
+
+    def _getLinkedSystems(self, system: System) -> List[System]:
+        if self._neighborhood is not None and system.Id in self._neighborhood.Links:
+            return self._neighborhood.Links[system.Id]
+        if self.Graph is None:
+            return system.GetLinkedSystems(cache=self.CACHE_EXPENSIVE_CALLS)
+        linked_system_ids = self.Graph.LinkedSystem_Ids(system.Id)
+        if self.Systems is not None:
+            return [self.Systems[system_id] for system_id in linked_system_ids]
+        return system.client.GetMany("SYSTEMS", linked_system_ids)
+
+    def _searchBreadthFirst(self, origin_system: System) -> bool:
+        """
+        Level synchronous breadth first search out to MaxJumps from the origin system.
+
+        Every system is weighed once, at the fewest jumps it is reached by. Rather than re-walking a system for each path
+        that reaches it, the distinct masks of matched values that arrive at it (over all of the shortest paths from the
+        origin) are carried along together. As with _checkNextSystem, a path stops growing once it has found all of
+        MustFindTargets, and a system is only kept in the results if it is part of at least one path that did.
+
+        The masks are carried as path keys (see _pathKeyOf), so there are at most _otherBit * 2 of them, and a set of
+        them is a single integer with bit k set if path key k is in the set.
+
+        Returns True if any path found everything in MustFindTargets.
+        """
+        complete = 1 << self._targetMask
+        not_complete = (1 << (self._otherBit * 2)) - 1 - complete
+
+        jumps: Dict[int, int] = {origin_system.Id: 0}
+        # System.Id: set of path keys
+        arriving: Dict[int, int] = {origin_system.Id: 1}
+        matched: Dict[int, int] = {}
+        found: Dict[int, int] = {}
+        # System.Id: linked systems, for the systems that had paths carry on out of them
+        links: Dict[int, List[System]] = {}
+        weights: Dict[int, tuple] = {}
+        levels: List[List[System]] = [[origin_system]]
+
+        # forward pass - weigh each level and carry the matched values of every open path on to the next level
+        for current_jumps in range(self.MaxJumps + 1):
+            next_level = []
+            for current_sys in levels[current_jumps]:
+                weight, weight_values, found_mask = self._weighSystem(current_sys, current_jumps)
+                weights[current_sys.Id] = (current_sys, weight, weight_values)
+                found[current_sys.Id] = found_key = self._pathKeyOf(found_mask)
+                matched[current_sys.Id] = paths = self._orInto(arriving[current_sys.Id], found_key)
+
+                if self.Audit.Full:
+                    where = (current_sys.Name, current_sys.Id, current_jumps, None)
+                    self._audit("WEIGHED", *where, weight_values)
+                    self._audit("MATCHED", *where, frozenset(map(self._valuesOf, _keysIn(paths))))
+
+                # paths that have found everything stop here, just as a completed chain does in _checkNextSystem
+                open_paths = paths & not_complete
+                if open_paths == 0 or current_jumps == self.MaxJumps:
+                    continue
+
+                links[current_sys.Id] = linked_systems = self._getLinkedSystems(current_sys)
+                for new_target_system in linked_systems:
+                    if new_target_system.Id not in jumps:
+                        jumps[new_target_system.Id] = current_jumps + 1
+                        arriving[new_target_system.Id] = 0
+                        next_level.append(new_target_system)
+
+                    # only links that lead one jump further out are part of a shortest path
+                    if jumps[new_target_system.Id] == current_jumps + 1:
+                        arriving[new_target_system.Id] |= open_paths
+
+            if len(next_level) == 0:
+                break
+            levels.append(next_level)
+
+        # backward pass - keep a system if any of its paths is complete, or continues into a child whose path completes
+        completes: Dict[int, int] = {}
+        for current_jumps in range(len(levels) - 1, -1, -1):
+            for current_sys in levels[current_jumps]:
+                completing = complete
+                for child in links.get(current_sys.Id, ()):
+                    if jumps[child.Id] == current_jumps + 1:
+                        completing |= self._orFrom(completes[child.Id], found[child.Id])
+                completes[current_sys.Id] = matched[current_sys.Id] & completing
+
+                if completes[current_sys.Id] == 0:
+                    continue
+
+                system, weight, weight_values = weights[current_sys.Id]
+                results = self.WeightResults(self.WeightFactors)
+                self._results[system.Id] = results.Populate(
+                    system, self._origin_system, jumps[system.Id], (weight, weight_values)
+                )
+                if self.Audit.Full:
+                    self._audit("PART_OF_PATH", system.Name, system.Id, jumps[system.Id], None)
+
+        return completes[origin_system.Id] != 0
 
     def _checkNextSystem(
-        self, current_sys: System, previous_system_id: int, current_jumps: int, current_matched_values: set
-    ) -> Tuple[bool, set]:
+        self, current_sys: System, previous_system_id: int, current_jumps: int, current_matched_values: int
+    ) -> bool:
         """
         Recursive function to check all new destinations from a source system, and give their weight.
 
         :param target_sys(System): The system being evaluated.
         :param previous_system_id(int): The System.Id of the system this function was called from.
         :param current_jumps(int): how many jumps away from the origin system this system is.
-        :param current_matched_values(set): the values we have found in this particular chain.
+        :param current_matched_values(int): bitmask of the values we have found in this particular chain (see _maskOf).
         Returns true if all current_matched_values == self.MustFindTargets, indicating we can stop going down this chain.
         """
-        logging_prefix = (
-            f"Weighting [{current_sys.Name}#{current_sys.Id}@Jump-{current_jumps} From {previous_system_id}]"
-        )
+        where = (current_sys.Name, current_sys.Id, current_jumps, previous_system_id) if self.Audit.Full else None
 
-        self._add_log(f"{logging_prefix} Beginning Check of System")
+        if where:
+            self._audit("CHECKING", *where)
         # if the system has already been searched AND the total jumps to get from origin to here by another path is less than this path, cut out
         if (
             current_sys.Id in self._systemIdsAlreadySearched.keys()
             and self._systemIdsAlreadySearched[current_sys.Id] < current_jumps
         ):
-            self._add_log(f"{logging_prefix} has already been checked closer. Returning False.")
+            if where:
+                self._audit("CHECKED_CLOSER", *where)
             return False
 
         # save the current jumps to get to this path for the above
         self._systemIdsAlreadySearched[current_sys.Id] = current_jumps
 
         # save the result from weighing this system. Its OK to overwrite if we already searched this system, because current_jumps will be different
-        weight, weight_values, matched_values = self.WeightFactors.DetermineSystemWeight(current_sys, current_jumps)
+        weight, weight_values, found_mask = self._weighSystem(current_sys, current_jumps)
 
         results = self.WeightResults(self.WeightFactors)
 
@@ -182,21 +577,22 @@ class WeightCalculator:
             current_sys, self._origin_system, current_jumps, (weight, weight_values)
         )
 
-        new_matched_values = current_matched_values.union(matched_values)
+        new_matched_values = current_matched_values | found_mask
 
-        self._add_log(f"{logging_prefix} Weight Values (J, Dv, Dns, sec) {weight_values}")
-        self._add_log(f"{logging_prefix} Current Matched Values {new_matched_values}")
+        if where:
+            self._audit("WEIGHED", *where, weight_values)
+            self._audit("MATCHED", *where, self._valuesOf(new_matched_values))
 
         # if we every meet everything in this chain we can just return - we don't need to search for more systems beyond.
-        if new_matched_values == self.MustFindTargets:
-            self._add_log(f"{logging_prefix} ***** Completes a path! Returning TRUE!!!! *****")
+        if new_matched_values == self._targetMask:
+            if where:
+                self._audit("COMPLETES_PATH", *where)
             return True
         elif current_jumps == self.MaxJumps:  # and hence, new_matched_values != self.MustFindTargets
             # we've reached the end of this chain. The chain to get here did not find everything, so its not worth keeping
             del self._results[current_sys.Id]
-            self._add_log(
-                f"{logging_prefix} Is Final System in Chain, still not all required values found. Returning False."
-            )
+            if where:
+                self._audit("CHAIN_ENDS", *where)
             return False
 
         # We want to gather up all the children's responses as a list of True False.
@@ -204,9 +600,10 @@ class WeightCalculator:
         # an any(children_responses) would indicate that this particular system is potentially valuable.
         children_responses = []
 
-        self._add_log(f"{logging_prefix} Now checking linked children.")
+        if where:
+            self._audit("CHECKING_CHILDREN", *where)
         # loop over all the system linked to this one
-        for new_target_system in current_sys.GetLinkedSystems(cache=self.CACHE_EXPENSIVE_CALLS):
+        for new_target_system in self._getLinkedSystems(current_sys):
             # ignore the one we came from
             if new_target_system.Id == previous_system_id:
                 continue
@@ -221,11 +618,97 @@ class WeightCalculator:
             # to finding everything needed. And we remove their weights from the system.
             if not did_chain_find_everything and self._results.get(new_target_system.Id, None) is not None:
                 del self._results[new_target_system.Id]
-                self._add_log(
-                    f"{logging_prefix} No children of this chain meet all targets. Deleting child #{new_target_system.Id}"
-                )
+                if where:
+                    self._audit("CHILD_DELETED", *where, new_target_system.Id)
 
             children_responses.append(did_chain_find_everything)
 
         # Finally, return True if any child (of any child further down the chain) has meet the requirements of "All Values Matched"
         return any(children_responses)
+
+
+def _keysIn(paths: int) -> Iterable[int]:
+    """The path keys in a set of them, see WeightCalculator._searchBreadthFirst"""
+    key = 0
+    while paths:
+        if paths & 1:
+            yield key
+        paths >>= 1
+        key += 1
+
+
+def RunBatch(
+    calculators: Dict[Any, WeightCalculator],
+    origin_systems: List[System],
+    method: WeightMethod = WeightMethod.AVERAGE,
+    progress_bar: ProgressBar = None,
+) -> Dict[Any, Dict[int, Tuple[int, Dict[int, Any]]]]:
+    """
+    RunAll() for several calculators over the same origin systems, ie: one per commodity. The origins are taken one at a
+    time: the systems around it are walked once into a Neighborhood, which every calculator then searches and weighs with
+    its own WeightFactors and MustFindTargets before moving on to the next origin.
+
+    Calculators that search alike (see WeightCalculator.SearchesLike), such as commodities needing the same planet
+    types, are only run once. The others are given the same results, TopWeight/TopDetails and audit events.
+
+    :param calculators(Dict[Any, WeightCalculator]): The configured calculators, by any key (ie: the commodity name).
+        Linked systems are looked up with the first calculator's Graph/Systems.
+    :param origin_systems(List[System]): The systems to search MaxJumps away from.
+    :param method(WeightMethod, Default:AVERAGE): How the weight is returned
+    :param progress_bar(ProgressBar, Default:None): If given, advanced once per origin system for each calculator.
+
+    :return Dict[Any, Dict[int, Tuple[weight, results]]]: The return of RunAll() for each calculator, by the same keys.
+    """
+    groups: List[Tuple[WeightCalculator, List[Any]]] = []
+    for key, calculator in calculators.items():
+        group = next((group for group in groups if group[0].SearchesLike(calculator)), None)
+        if group is None:
+            groups.append((calculator, [key]))
+        else:
+            group[1].append(key)
+
+    # the others in a group are given the search events as they are recorded. Each records its own top systems.
+    mirrors = [
+        [calculators[key].Audit for key in keys[1:] if calculators[key].Audit is not calculator.Audit]
+        for calculator, keys in groups
+    ]
+    walker = None
+    if len(groups) > 1:
+        walker = groups[0][0]
+        max_jumps = max(calculator.MaxJumps for calculator, _ in groups)
+
+    batch_results = {keys[0]: {} for _, keys in groups}
+    for calculator, _ in groups:
+        calculator._staticWeights = calculator._sharedStaticWeights()
+    try:
+        # one origin at a time, so only its Neighborhood is kept while every calculator searches it
+        for origin_system in origin_systems:
+            neighborhood = None
+            if walker is not None:
+                if progress_bar is not None:
+                    progress_bar.Update(f"Walking around {origin_system.Name}")
+                neighborhood = Neighborhood.Around(origin_system, max_jumps, walker._getLinkedSystems)
+
+            for (calculator, keys), group_mirrors in zip(groups, mirrors):
+                if progress_bar is not None:
+                    progress_bar.Update(f"Weighing {origin_system.Name}")
+                calculator.Audit.Mirrors = group_mirrors
+                try:
+                    batch_results[keys[0]][origin_system.Id] = calculator.Run(
+                        origin_system, method=method, neighborhood=neighborhood
+                    )
+                finally:
+                    calculator.Audit.Mirrors = []
+                if progress_bar is not None:
+                    for _ in keys:
+                        progress_bar.Advance()
+    finally:
+        for calculator, _ in groups:
+            calculator._staticWeights = None
+
+    for _, keys in groups:
+        for key in keys[1:]:
+            calculators[key].MergeRuns(origin_systems, batch_results[keys[0]])
+            batch_results[key] = batch_results[keys[0]]
+
+    return {key: batch_results[key] for key in calculators}
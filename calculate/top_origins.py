@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+
+@dataclass(frozen=True)
+class OriginSummary:
+    """
+    Just the numbers of an origin's results, for keeping many top origins without their result objects.
+
+    :param Origin_Id(int): The System.Id of the origin system.
+    :param Weight(float): The origin's weight, as returned by WeightCalculator.Run()
+    :param Systems(Tuple[Tuple[int, int, Any, Any], ...]): (System.Id, JumpsFromOrigin, Weight, IndividualWeights) of
+        every system that contributed to the weight, in the order of the results.
+    """
+
+    Origin_Id: int
+    Weight: float
+    Systems: Tuple[Tuple[int, int, Any, Any], ...]
+
+    @classmethod
+    def FromResults(cls, origin_system_id: int, weight: float, results: Dict[int, Any]) -> OriginSummary:
+        return cls(
+            Origin_Id=origin_system_id,
+            Weight=weight,
+            Systems=tuple(
+                (system_id, result.JumpsFromOrigin, result.Weight, result.IndividualWeights)
+                for system_id, result in results.items()
+            ),
+        )
+
+
+@dataclass
+class TopOrigins:
+    """
+    The Count highest weighted origins seen so far, kept in a bounded heap. Of origins with the same weight, the ones
+    pushed first are kept, so the ranking does not depend on anything but the order the origins are run in.
+
+    :param Count(int): How many origins to keep.
+    :param Compact(bool, default: False): If True, keeps an OriginSummary for each origin rather than its results.
+    """
+
+    Count: int
+    Compact: bool = field(kw_only=True, default=False)
+    # (weight, -push order, origin System.Id, results or OriginSummary). The root is the origin that is dropped next.
+    _heap: List[Tuple[float, int, int, Any]] = field(init=False, default_factory=list)
+    _pushed: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        if self.Count < 1:
+            raise ValueError(f"TopOrigins needs to keep at least 1 origin, not {self.Count}")
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def Push(self, origin_system_id: int, weight: float, results: Dict[int, Any]) -> bool:
+        """Offers an origin's Run() results. Returns True if they are kept."""
+        self._pushed += 1
+        key = (weight, -self._pushed)
+        if len(self._heap) == self.Count and key <= self._heap[0][:2]:
+            return False
+
+        details = OriginSummary.FromResults(origin_system_id, weight, results) if self.Compact else results
+        entry = (weight, -self._pushed, origin_system_id, details)
+        if len(self._heap) < self.Count:
+            heapq.heappush(self._heap, entry)
+        else:
+            heapq.heapreplace(self._heap, entry)
+
+        return True
+
+    def Ranked(self) -> List[Tuple[int, float, Any]]:
+        """(origin System.Id, weight, results or OriginSummary) of the kept origins, best first"""
+        ranked = sorted(self._heap, key=lambda entry: entry[:2], reverse=True)
+        return [(origin_id, weight, details) for weight, _, origin_id, details in ranked]
+
+    def Clear(self):
+        self._heap = []
+        self._pushed = 0
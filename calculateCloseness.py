@@ -3,8 +3,13 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import Dict, List, Tuple, Union
 
-from buildMapData import LoadPickles
+import numpy
+
+from buildMapData import AllData
+from logic.planetaryResources import RAW_RESOURCE_TO_TYPE
 from models.map import *
+from models.planet_type_counts import PlanetTypeCounts
+from models.stargate_graph import StargateGraph
 
 JUMP_DISTANCE_WEIGHT = 1000
 MULTIPLE_PLANETS_WEIGHT = 10
@@ -90,9 +95,11 @@ class WeightFactor:
         new_factor = WeightFactor(
             SystemName=self.SystemName,
             Planets=self.Planets,
-            JumpsFromSource=self.JumpsFromSource
-            if self.JumpsFromSource < right_hand.JumpsFromSource
-            else right_hand.JumpsFromSource,
+            JumpsFromSource=(
+                self.JumpsFromSource
+                if self.JumpsFromSource < right_hand.JumpsFromSource
+                else right_hand.JumpsFromSource
+            ),
             Weight=self.Weight + right_hand.Weight,
             Audit=self.Audit,
         )
@@ -122,173 +129,214 @@ class SystemTotalWeight:
     SystemName: str
     TotalWeight: int
     PotentialSites: List[WeightFactor]
+    MissingPlanetTypes: List[str] = field(kw_only=True, default_factory=list)
 
 
-def CalculateCloseness(
-    resources_desired: List[PIMaterial], max_jumps: int, map_data: AllData
-) -> Dict[str, SystemTotalWeight]:
-
-    resources_desired = [map_data.RawResources[resource] for resource in resources_desired]
-
-    planets_to_search_for = ConsolidatePlanetTypes(resources_desired)
-
-    system_values = {}
-    for systemId, system in map_data.Systems.items():
-        if len(system.Links) == 0:
-            continue
-        closest_planets = {}
-        for planet_type in planets_to_search_for:
-            CheckNextSystem(system, 0, max_jumps, system.Name, planet_type, None, [], closest_planets)
-
-        surrounding_systems, total_weight = CalculateSystemWeight(closest_planets, max_jumps)
-        system_weight = SystemTotalWeight(system.Name, total_weight, surrounding_systems)
-        system_values[systemId] = system_weight
-    return system_values
+@dataclass
+class NearestPlanetTypes:
+    """
+    For every system, the closest system with at least one planet of each searched planet type, found with one multi
+    source breadth first search per planet type over the StargateGraph (seeded from every system that has the type), so
+    the whole map costs planet types x stargates rather than a search per system.
+
+    Rows are the StargateGraph / PlanetTypeCounts system rows and columns are the searched planet types. Only systems
+    fewer than MaxJumps jumps away are found. When several systems are equally close, the one with the lowest row is used.
+
+    :param System_Ids(numpy.ndarray[int64]): The System.Id for each row.
+    :param PlanetType_Ids(numpy.ndarray[int64]): The PlanetType.Id for each column.
+    :param Jumps(numpy.ndarray[int16]): systems x planet types - jumps to the closest system with the type, -1 if none.
+    :param Sites(numpy.ndarray[int32]): systems x planet types - row of the closest system with the type, -1 if none.
+    :param Planets(numpy.ndarray[int32]): systems x planet types - planets of the type in that closest system.
+    :param MaxJumps(int): The jump limit the search was run with.
+    """
+
+    System_Ids: numpy.ndarray
+    PlanetType_Ids: numpy.ndarray
+    Jumps: numpy.ndarray
+    Sites: numpy.ndarray
+    Planets: numpy.ndarray
+    MaxJumps: int
+
+    @classmethod
+    def Calculate(
+        cls,
+        graph: StargateGraph,
+        planet_type_counts: PlanetTypeCounts,
+        planet_type_ids: List[int],
+        max_jumps: int,
+    ) -> NearestPlanetTypes:
+        if not numpy.array_equal(graph.System_Ids, planet_type_counts.System_Ids):
+            raise ValueError("The StargateGraph and PlanetTypeCounts were not built from the same systems")
+
+        columns = [planet_type_counts.ColumnById[type_id] for type_id in planet_type_ids]
+        jumps = numpy.full((graph.TotalSystems, len(columns)), -1, dtype=numpy.int16)
+        sites = numpy.full((graph.TotalSystems, len(columns)), -1, dtype=numpy.int32)
+        for index, column in enumerate(columns):
+            jumps[:, index], sites[:, index] = _search_from_all(
+                graph, planet_type_counts.Counts[:, column] > 0, max_jumps - 1
+            )
 
+        found = sites >= 0
+        planets = numpy.where(found, planet_type_counts.Counts[numpy.where(found, sites, 0), columns], 0)
 
-def CalculateSystemWeight(
-    closest_planets: Dict[str, List[PotentialSite]], max_jumps: int
-) -> Tuple[List[WeightFactor], int]:
-    system_weights: List[WeightFactor] = []
-    for planet_type, potential_sites in closest_planets.items():
-        for site in potential_sites:
+        return cls(
+            System_Ids=graph.System_Ids,
+            PlanetType_Ids=numpy.asarray(planet_type_ids, dtype=numpy.int64),
+            Jumps=jumps,
+            Sites=sites,
+            Planets=planets.astype(numpy.int32),
+            MaxJumps=max_jumps,
+        )
 
-            if site.Planets is None:
+    def TotalWeights(self) -> numpy.ndarray:
+        """
+        The SystemTotalWeight.TotalWeight of every system, straight from the arrays. A system that is closest for more
+        than one planet type only gets its jump weight once, the same as when the types are combined in one WeightFactor.
+        """
+        order = numpy.argsort(self.Sites, axis=1, kind="stable")
+        sites = numpy.take_along_axis(self.Sites, order, axis=1)
+        jumps = numpy.take_along_axis(self.Jumps, order, axis=1).astype(numpy.int64)
+
+        first_for_site = sites >= 0
+        first_for_site[:, 1:] &= sites[:, 1:] != sites[:, :-1]
+        jump_weights = numpy.where(first_for_site, (self.MaxJumps - jumps) * JUMP_DISTANCE_WEIGHT, 0).sum(axis=1)
+
+        found = self.Sites >= 0
+        planet_weights = numpy.where(
+            found, MULTIPLE_PLANET_TYPES_WEIGHT + self.Planets.astype(numpy.int64) * MULTIPLE_PLANETS_WEIGHT, 0
+        ).sum(axis=1)
+        missing_weights = (~found).sum(axis=1) * MISSING_PLANET_TYPE_WEIGHT
+
+        return jump_weights + planet_weights + missing_weights
+
+    def WeightFactorsFor(self, row: int, client: MapClient) -> Tuple[List[WeightFactor], List[int]]:
+        """
+        A WeightFactor for each closest system around the system at row, with the planet types it is closest for.
+
+        :return factors(List[WeightFactor]): The weighed closest systems, in the order their planet types were searched.
+        :return missing(List[int]): The PlanetType.Ids with no system within range.
+        """
+        factors: Dict[int, WeightFactor] = {}
+        missing = []
+        for planet_type_id, site, jumps in zip(
+            self.PlanetType_Ids.tolist(), self.Sites[row].tolist(), self.Jumps[row].tolist()
+        ):
+            if site < 0:
+                missing.append(planet_type_id)
                 continue
-            site_weight = WeightFactor(
-                JumpsFromSource=site.JumpsFromSource,
-                Planets={
-                    planet_type: PlanetsInfo(planet_type, len(site.Planets), [planet.Name for planet in site.Planets])
-                },
-                SystemName=site.SystemName,
-            )
 
-            if site_weight not in system_weights:
-                system_weights.append(site_weight)
+            site_system_id = int(self.System_Ids[site])
+            if site not in factors:
+                factors[site] = WeightFactor(
+                    JumpsFromSource=jumps,
+                    Planets={},
+                    SystemName=client.Get("SYSTEMS", site_system_id).Name,
+                )
+            factors[site].AddAdditionalPlanetType(
+                client.Get("PLANET_TYPES", planet_type_id).Name,
+                [
+                    planet
+                    for planet in client.PLANETS_BY_SYSTEM.get(site_system_id, [])
+                    if planet.Type_Id == planet_type_id
+                ],
+            )
 
-            else:
-                existing, existing_idx = FindExistingWeightFactor(system_weights, site_weight)
-                existing += site_weight
-                system_weights[existing_idx] = existing
+        for factor in factors.values():
+            factor.CalculateWeight(self.MaxJumps)
 
-        if len(potential_sites) == 0:
-            existing, existing_idx = FindExistingWeightFactor(system_weights, site.SystemName)
-            existing.PenalizeForMissingType(planet_type)
-            system_weights[existing_idx] = existing
+        return list(factors.values()), missing
 
-    running_total = sum([system.CalculateWeight(max_jumps) for system in system_weights])
 
-    return system_weights, running_total
+def _search_from_all(
+    graph: StargateGraph, sources: numpy.ndarray, max_depth: int
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Breadth first search out from every source system at once, one whole jump at a time.
 
+    :return jumps(numpy.ndarray[int16]): Jumps from each system to its closest source, -1 if further than max_depth.
+    :return sites(numpy.ndarray[int32]): Row of each system's closest source (the lowest row when tied), -1 if none.
+    """
+    jumps = numpy.full(graph.TotalSystems, -1, dtype=numpy.int16)
+    sites = numpy.full(graph.TotalSystems, -1, dtype=numpy.int32)
 
-def FindExistingWeightFactor(system_weights, site):
-    for idx, system in enumerate(system_weights):
-        if system == site:
-            existing = system
-            existing_idx = idx
+    frontier = numpy.flatnonzero(sources)
+    jumps[frontier] = 0
+    sites[frontier] = frontier
 
-    return existing, existing_idx
+    for depth in range(1, max_depth + 1):
+        if frontier.size == 0:
+            break
 
+        degrees = graph.Degrees[frontier]
+        starts = numpy.repeat(graph.Offsets[frontier] - (numpy.cumsum(degrees) - degrees), degrees)
+        reached = graph.Neighbors[starts + numpy.arange(degrees.sum())]
+        labels = numpy.repeat(sites[frontier], degrees)
 
-def CheckNextSystem(
-    system: System,
-    total_jumps: int,
-    max_jumps: int,
-    source_system_name: str,
-    searching_for_planet_type: PlanetType,
-    previous_system: System,
-    systems_already_searched: List[str],
-    viable_planets: Dict[str, List[PotentialSite]],
-) -> Dict[str, List[PotentialSite]]:
+        unvisited = jumps[reached] < 0
+        reached, labels = reached[unvisited], labels[unvisited]
 
-    # if we've hit our max jumps, time to stop searching
-    if total_jumps >= max_jumps:
-        return viable_planets
+        # keep the lowest labelled source for each newly reached system
+        order = numpy.lexsort((labels, reached))
+        reached, labels = reached[order], labels[order]
+        first = numpy.ones(len(reached), dtype=bool)
+        first[1:] = reached[1:] != reached[:-1]
 
-    # Have we already visited this node? if check if we are closer or further away. If not, add it to the list of already searched.
-    if system.Name in [system[0] for system in systems_already_searched]:
-        if total_jumps >= [system[1] for system in systems_already_searched if system[0] == system.Name]:
-            return viable_planets
-        else:
-            pass
-    else:
-        systems_already_searched.append((system.Name, total_jumps))
-
-    # loop over every planet, seeing if it matches the type searched for
-    for planet in system.Planets:
-        if planet.Type == searching_for_planet_type:
-            new_site = PotentialSite(
-                SystemName=system.Name,
-                SystemId=system.Id,
-                Planets=[planet],
-                PlanetType=planet.Type,
-                JumpsFromSource=total_jumps,
-                SourceSystemName=source_system_name,
-            )
+        frontier = reached[first]
+        jumps[frontier] = depth
+        sites[frontier] = labels[first]
 
-            # if this is the first entry for a planet of type searching_for, then be sure to initialize that key
-            if searching_for_planet_type.Name not in viable_planets.keys():
-                viable_planets[searching_for_planet_type.Name] = [new_site]
-                print(f"found sites for: {viable_planets.keys()} ")
+    return jumps, sites
 
-            # else, check to see if the site already exists in that key's list of sites, and if not add it.
-            elif new_site.SystemName not in [
-                existing_system.SystemName for existing_system in viable_planets[searching_for_planet_type.Name]
-            ]:
-                viable_planets[searching_for_planet_type.Name].append(new_site)
-                print(f"+++++new site for {searching_for_planet_type.Name}")
 
-            # otherwise, find the existing site, add to it, and replace it. This can happen if there is multiple paths to the same system from the source.
-            else:
-                # find an existing record of the system
-                index, existing = [
-                    (index, system) for index, system in enumerate(viable_planets[searching_for_planet_type.Name])
-                ][0]
+def ConsolidatePlanetTypes(map_data: AllData, resources_desired: List[Commodity]) -> List[PlanetType]:
+    """Every planet type any of the raw resources can be found on, in the order they are first needed"""
+    planet_type_ids = []
+    for resource in resources_desired:
+        for planet_type_id in RAW_RESOURCE_TO_TYPE.get(resource.Id, []):
+            if planet_type_id not in planet_type_ids:
+                planet_type_ids.append(planet_type_id)
 
-                # add thew new planets
-                existing += new_site
-                # replace
-                viable_planets[searching_for_planet_type.Name][index] = existing
+    return [map_data.GetPlanetType(planet_type_id) for planet_type_id in planet_type_ids]
 
-    # Get the smallest JumpsFromSource in the list - this will *probably* be one we just found, this also catches if
-    # in a system with no viable planets but have already found a closer system
 
-    closest_found = min(
-        [site.JumpsFromSource for site in viable_planets.get(searching_for_planet_type.Name, [])], default=999999
-    )
-    if closest_found <= total_jumps:
-        return viable_planets
+def CalculateCloseness(resources_desired: List[str], max_jumps: int, map_data: AllData) -> Dict[int, SystemTotalWeight]:
+    """
+    Weighs every system with stargates by how close it is to planets of every type the desired raw resources are found on.
 
-    else:
-        # make sure we dont go back the way we came, otherwise loop over every link and head on out to search again.
-        for next_system in system.Links:
-            if next_system == previous_system:
-                continue
+    :param resources_desired(List[str]): Names of raw resource commodities (see RawResourcesDesired)
+    :param max_jumps(int): Planets must be fewer than this many jumps away.
+    :param map_data(AllData): The loaded map.
 
-            return CheckNextSystem(
-                next_system,
-                total_jumps=total_jumps + 1,
-                max_jumps=max_jumps,
-                source_system_name=source_system_name,
-                searching_for_planet_type=searching_for_planet_type,
-                previous_system=system,
-                systems_already_searched=systems_already_searched,
-                viable_planets=viable_planets,
-            )
+    :return system_values(Dict[int, SystemTotalWeight]): System.Id: weight of that system.
+    """
+    resources_desired = [map_data.GetCommodity(resource) for resource in resources_desired]
 
+    planets_to_search_for = ConsolidatePlanetTypes(map_data, resources_desired)
 
-def ConsolidatePlanetTypes(resources_desired: List[PIMaterial]) -> List[PlanetType]:
-    unique_planet_types = []
-    planet_types_already_chosen = []
-    for resource in resources_desired:
-        for planet_type in resource.OnTypes:
-            if planet_type.Name not in planet_types_already_chosen:
-                planet_types_already_chosen.append(planet_type.Name)
-                unique_planet_types.append(planet_type)
+    nearest = NearestPlanetTypes.Calculate(
+        map_data.Graph,
+        map_data.PlanetTypeCounts,
+        [planet_type.Id for planet_type in planets_to_search_for],
+        max_jumps,
+    )
+    total_weights = nearest.TotalWeights().tolist()
+    system_names = map_data.MapClient.Column("SYSTEMS", "Name")
+    planet_type_names = {planet_type.Id: planet_type.Name for planet_type in planets_to_search_for}
 
-    return unique_planet_types
+    system_values = {}
+    for row in numpy.flatnonzero(map_data.Graph.Degrees > 0).tolist():
+        surrounding_systems, missing = nearest.WeightFactorsFor(row, map_data.MapClient)
+        system_values[int(nearest.System_Ids[row])] = SystemTotalWeight(
+            system_names[row],
+            total_weights[row],
+            surrounding_systems,
+            MissingPlanetTypes=[planet_type_names[planet_type_id] for planet_type_id in missing],
+        )
+    return system_values
 
 
 if __name__ == "__main__":
-    map_data = LoadPickles(regions=False, constellations=False)
-    CalculateCloseness(RawResourcesDesired, MAX_JUMPS, map_data)
+    map_data = AllData(skip_build=True, lazy=True)
+    system_values = CalculateCloseness(RawResourcesDesired, MAX_JUMPS, map_data)
+    for system_weight in sorted(system_values.values(), key=lambda value: value.TotalWeight, reverse=True)[:10]:
+        print(f"{system_weight.SystemName}: {system_weight.TotalWeight}")
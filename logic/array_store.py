@@ -0,0 +1,64 @@
+import struct
+import zipfile
+from typing import Dict
+
+import numpy
+
+LOCAL_HEADER_SIZE = 30  # fixed portion of a zip local file header, before the file name and extra field
+
+
+def save_arrays(file_path: str, **arrays: numpy.ndarray):
+    """
+    Saves named arrays into a single uncompressed .npz file. Uncompressed members can be memory mapped straight back
+    out of the archive by load_arrays, so nothing is copied into memory until it is actually read.
+    """
+    with open(file_path, "wb") as file:
+        numpy.savez(file, **arrays)
+
+
+def load_arrays(file_path: str, mmap: bool = True) -> Dict[str, numpy.ndarray]:
+    """
+    Loads every array from an .npz file written by save_arrays.
+
+    :param file_path(str): path to the .npz file
+    :param mmap(bool, default: True): If true, each array is a read only numpy.memmap into the file rather than a copy.
+        Compressed members cannot be mapped and are read normally.
+    """
+    if not mmap:
+        with numpy.load(file_path) as data:
+            return {key: data[key] for key in data.files}
+
+    arrays = {}
+    with zipfile.ZipFile(file_path) as archive, open(file_path, "rb") as raw:
+        for info in archive.infolist():
+            key = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[key] = numpy.lib.format.read_array(member)
+                continue
+
+            raw.seek(info.header_offset)
+            local_header = raw.read(LOCAL_HEADER_SIZE)
+            name_length, extra_length = struct.unpack("<HH", local_header[26:30])
+            raw.seek(info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length)
+
+            version = numpy.lib.format.read_magic(raw)
+            if version == (1, 0):
+                shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(raw)
+            else:
+                shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(raw)
+
+            if int(numpy.prod(shape)) == 0:
+                arrays[key] = numpy.empty(shape, dtype=dtype)
+                continue
+
+            arrays[key] = numpy.memmap(
+                file_path,
+                dtype=dtype,
+                mode="r",
+                shape=shape,
+                order="F" if fortran_order else "C",
+                offset=raw.tell(),
+            )
+
+    return arrays
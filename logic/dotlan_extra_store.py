@@ -0,0 +1,109 @@
+import os
+import pickle
+import struct
+from dataclasses import dataclass, field
+from time import time
+from typing import Any, Dict, IO, Optional, Tuple
+
+from models.third_party.dotlan import DotlanAdditionalSystemData
+
+DEFAULT_DOTLAN_EXTRA_STORE_PATH = "data/dotlan_extra_store"
+# every record is the length of its pickle, then the pickle
+RECORD_HEADER = struct.Struct("<Q")
+
+
+@dataclass
+class DotlanExtraStore:
+    """
+    The extra data scraped from dotlan for each system, kept in an append only file. Every system is written out as
+    soon as it is added, so a scrape that is interrupted loses nothing it had already finished. If the same system is
+    added again the later entry wins.
+
+    A last record cut short by a crash is dropped (and cut off the end of the file) when the store is next opened. Any
+    other record that cannot be read is skipped but left in the file, so nothing is lost if it can be read later (ie: by
+    code that has the class it was pickled from).
+
+    :param FilePath(str, default: DEFAULT_DOTLAN_EXTRA_STORE_PATH): The file the store is kept in.
+    """
+
+    FilePath: str = field(default=DEFAULT_DOTLAN_EXTRA_STORE_PATH)
+    # System_Id: (time it was scraped, the data)
+    _entries: Dict[str, Tuple[float, DotlanAdditionalSystemData]] = field(init=False, default_factory=dict, repr=False)
+    _file: Optional[IO] = field(init=False, default=None, repr=False)
+
+    def __post_init__(self):
+        self._load()
+
+    def __contains__(self, system_id: Any) -> bool:
+        return str(system_id) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def Get(self, system_id: Any) -> Optional[DotlanAdditionalSystemData]:
+        entry = self._entries.get(str(system_id), None)
+        return None if entry is None else entry[1]
+
+    def IsFresh(self, system_id: Any, ttl: float) -> bool:
+        """If the system was scraped less than ttl seconds ago"""
+        entry = self._entries.get(str(system_id), None)
+        return entry is not None and time() - entry[0] < ttl
+
+    def Add(self, system_id: Any, data: DotlanAdditionalSystemData, scraped_at: float = None):
+        """
+        :param scraped_at(float, default: None): When the data was scraped, as a unix timestamp. Now if None.
+        """
+        entry = (str(system_id), time() if scraped_at is None else scraped_at, data)
+        if self._file is None:
+            self._file = open(self.FilePath, "ab")
+        record = pickle.dumps(entry)
+        self._file.write(RECORD_HEADER.pack(len(record)) + record)
+        self._file.flush()
+        self._entries[entry[0]] = entry[1:]
+
+    def Adopt(self, pickle_file_path: str):
+        """
+        Adds the systems from an old per region pickle ({System_Id: DotlanAdditionalSystemData}) that are not in the
+        store yet, as scraped when the pickle was last written.
+        """
+        if not os.path.exists(pickle_file_path):
+            return
+
+        scraped_at = os.path.getmtime(pickle_file_path)
+        with open(pickle_file_path, "rb") as pickleFile:
+            cache = pickle.load(pickleFile)
+        for system_id, data in cache.items():
+            if system_id not in self and data is not None:
+                self.Add(system_id, data, scraped_at)
+
+    def Close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _load(self):
+        if not os.path.exists(self.FilePath):
+            return
+
+        file_size = os.path.getsize(self.FilePath)
+        torn_at = None
+        with open(self.FilePath, "rb") as file:
+            while file.tell() < file_size:
+                record_start = file.tell()
+                header = file.read(RECORD_HEADER.size)
+                body = file.read(RECORD_HEADER.unpack(header)[0]) if len(header) == RECORD_HEADER.size else b""
+                try:
+                    system_id, scraped_at, data = pickle.loads(body)
+                except Exception as e:
+                    # a write cut short can only ever be the last record. Anything else is kept for whatever can read it.
+                    if file.tell() == file_size and isinstance(e, (EOFError, pickle.UnpicklingError)):
+                        torn_at = record_start
+                        break
+                    print(f"{self.FilePath}: skipping the record at byte {record_start}, it cannot be read: {e!r}")
+                    continue
+
+                self._entries[system_id] = (scraped_at, data)
+
+        if torn_at is not None:
+            with open(self.FilePath, "r+b") as file:
+                file.truncate(torn_at)
@@ -1,57 +1,105 @@
-from dataclasses import dataclass
+from html.parser import HTMLParser
 from pickle import dump, load
-
-import requests
-from bs4 import BeautifulSoup
-
-
-def get_anokis_system_page():
+from typing import Any, Dict, List, Optional
+
+from models.third_party.anoikis import AnokisSystem
+
+ANOKIS_SYSTEM_PAGE_PATH = "data/anokis_system_page.html"
+# (tag, class): the AnokisSystem value the text of the first such element in a system's div is
+SYSTEM_FIELDS = {
+    ("a", "system-link"): "name",
+    ("span", "wormholeclass"): "wh_class",
+    ("span", "statics"): "statics",
+    ("span", "effect"): "weather",
+}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class AnokisPageParser(HTMLParser):
+    """
+    Reads every div.system of the anoik.is systems page in a single pass, keeping only the text of the elements in
+    SYSTEM_FIELDS.
+    """
+
+    def reset(self):
+        super().reset()
+        self.Systems: List[AnokisSystem] = []
+        self._fields: Optional[Dict[str, List[str]]] = None  # the text so far of each field of the current system
+        self._open: List[Optional[str]] = []  # the field the text of each element open in the system's div is part of
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+
+        classes = next((value or "" for name, value in attrs if name == "class"), "").split()
+        if self._fields is None:
+            if tag == "div" and "system" in classes:
+                self._fields = {}
+                self._open = [None]
+            return
+
+        field_name = self._open[-1]
+        if field_name is None:
+            field_name = next(
+                (
+                    name
+                    for (field_tag, field_class), name in SYSTEM_FIELDS.items()
+                    if tag == field_tag and field_class in classes and name not in self._fields
+                ),
+                None,
+            )
+            if field_name is not None:
+                self._fields[field_name] = []
+        self._open.append(field_name)
+
+    def handle_endtag(self, tag):
+        if self._fields is None or tag in VOID_TAGS:
+            return
+
+        self._open.pop()
+        if len(self._open) == 0:
+            self.Systems.append(AnokisFactory(**{name: "".join(text) for name, text in self._fields.items()}))
+            self._fields = None
+
+    def handle_data(self, data):
+        if self._fields is not None and self._open[-1] is not None:
+            self._fields[self._open[-1]].append(data)
+
+
+def read_anokis_system_page(file_path: str = ANOKIS_SYSTEM_PAGE_PATH) -> List[AnokisSystem]:
     # anokis_system_page = requests.get("http://anoik.is/systems")
-    with open("data/anokis_system_page.html") as file:
-        return BeautifulSoup(file, "html.parser")
-
-
-def get_bracket_group(html_tree):
-
-    return html_tree.find_all("section", attrs={"class": "bracketgroup"})
+    parser = AnokisPageParser()
+    with open(file_path, encoding="utf-8") as file:
+        parser.feed(file.read())
+    parser.close()
 
+    return parser.Systems
 
-def get_system_from_bracket(bracket_tree):
-    return bracket_tree.find_all("div", attrs={"class": "system"})
 
+def AnokisFactory(name: str = "", wh_class: str = "", statics: str = "", weather: str = None):
+    """Cleans up the text of a system's elements on the anoik.is systems page"""
+    statics = statics.replace(" ", "").replace("statics", "").replace("static", "")
+    weather = None if weather is None else weather.replace(" ", "").replace("\n", "")
 
-def get_systems(html_tree):
-    brackets = get_bracket_group(html_tree)
-    return [get_system_from_bracket(entry) for entry in brackets]
-
-
-@dataclass
-class AnokisSystem:
-    name: str
-    wh_class: str
-    statics: str
-    weather: str
-
-    def __getstate__(self):
-        return (self.name, self.wh_class, self.statics, self.weather)
+    return AnokisSystem(name, wh_class, statics, weather)
 
-    def __setstate__(self, state):
-        self.name, self.wh_class, self.statics, self.weather = state
 
+def index_anokis_data(client: Any, anokis_data: List[AnokisSystem]) -> Dict[int, AnokisSystem]:
+    """
+    Joins the anoik.is systems onto the map by name, returning them by System.Id (and setting their System_Id). Systems
+    that are not on the map are left out.
 
-def AnokisFactory(system_tree):
-    name = system_tree.find("a", attrs={"class": "system-link"}).text
-    wh_class = system_tree.find("span", attrs={"class": "wormholeclass"}).text
-    statics = (
-        system_tree.find("span", attrs={"class": "statics"})
-        .text.replace(" ", "")
-        .replace("statics", "")
-        .replace("static", "")
-    )
-    weather_node = system_tree.find("span", attrs={"class": "effect"})
-    weather = None if weather_node is None else weather_node.text.replace(" ", "").replace("\n", "")
+    :param client(MapClient): The map to join onto.
+    """
+    systems_by_name = client.NAME_INDEX.get("SYSTEMS", {})
+    anokis_by_id = {}
+    for anokis_system in anokis_data:
+        system = systems_by_name.get(anokis_system.name, None)
+        if system is not None:
+            anokis_system.System_Id = system.Id
+            anokis_by_id[system.Id] = anokis_system
 
-    return AnokisSystem(name, wh_class, statics, weather)
+    return anokis_by_id
 
 
 def GetAnokisData(pickle_data: bool):
@@ -65,9 +113,7 @@ def GetAnokisData(pickle_data: bool):
             pickle_data = True
             pass
 
-    html_data = get_anokis_system_page()
-    systems = get_system_from_bracket(html_data)
-    anokis_data = [AnokisFactory(system) for system in systems]
+    anokis_data = read_anokis_system_page()
 
     if pickle_data:
         with open(pickle_file_path, "wb") as pickleFile:
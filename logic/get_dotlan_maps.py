@@ -1,13 +1,15 @@
+import hashlib
 import os
+from concurrent.futures import as_completed, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from io import BytesIO
 from pickle import dump, load
-from time import sleep
-from typing import Dict, Tuple
-
-import requests
-from bs4 import BeautifulSoup, ResultSet
+from typing import Dict, List, Optional, Set, Tuple
+from xml.parsers import expat
 
 from logic.common import ProgressBar
+from logic.dotlan_extra_store import DotlanExtraStore
+from logic.http_fetcher import DEFAULT_HTTP_CACHE_DIRECTORY, Fetcher
 from logic.parse_dotlan_system_data import *
 from models.common import Position, Universe
 from models.third_party.dotlan import *
@@ -15,7 +17,10 @@ from models.third_party.dotlan import *
 REGION_X_OFFSET = 1000
 REGION_Y_OFFSET = 1000
 BASE_URL = "https://evemaps.dotlan.net/svg/"
-DEFAULT_PAUSE_COUNT = 5  # how long to pause between region pulls/scrapes when rebuilding all data
+DOTLAN_REQUESTS_PER_SECOND = 2  # shared by every thread fetching from dotlan
+DOTLAN_BURST = 4  # requests that may go out at once before DOTLAN_REQUESTS_PER_SECOND applies
+DOTLAN_WORKERS = 4
+DOTLAN_EXTRA_TTL = 30 * 24 * 60 * 60  # seconds before a system's scraped extra data is scraped again
 
 REGION_NAMES = [
     "Aridia",
@@ -89,31 +94,143 @@ REGION_NAMES = [
 ]
 
 
-def get_map(name: str, backoff: int = 5, count=1):
-    map_url = f"{BASE_URL}{name}.svg"
-    response = requests.get(map_url)
-    if response.status_code == 200:
-        return BytesIO(response.content)
+def dotlan_fetcher(cache_directory: str = DEFAULT_HTTP_CACHE_DIRECTORY) -> Fetcher:
+    """
+    A Fetcher with the rate limit for dotlan
 
-    else:
-        if count > 5:
-            raise Exception(f"Cannot get {name} map")
-        sleep(backoff)
-        get_map(name, backoff=backoff * 2, count=count + 1)
+    :param cache_directory(str, default: DEFAULT_HTTP_CACHE_DIRECTORY): Where responses are cached. None to not cache.
+    """
+    return Fetcher(
+        CacheDirectory=cache_directory,
+        RequestsPerSecond=DOTLAN_REQUESTS_PER_SECOND,
+        Burst=DOTLAN_BURST,
+        Workers=DOTLAN_WORKERS,
+    )
+
+
+def map_url(name: str, base_url: str = BASE_URL) -> str:
+    return f"{base_url}{name}.svg"
+
+
+def get_map(name: str, fetcher: Fetcher = None, base_url: str = BASE_URL) -> BytesIO:
+    fetcher = dotlan_fetcher() if fetcher is None else fetcher
+    return BytesIO(fetcher.Get(map_url(name, base_url)).Content)
 
 
 def get_region_map():
     return get_map("New_Eden")
 
 
-def build_region_central_coordinates():
-    xml_root = BeautifulSoup(get_map("New_Eden"), features="xml")
+@dataclass
+class DotlanSymbol:
+    """
+    The parts of a <symbol> definition in a dotlan map svg that parse_system reads.
+
+    :param Texts(Dict[str, str]): The text of the first <text> of each class.
+    :param Text_Ids(Set[str]): The ids of its <text>s.
+    :param Polygons(Set[str]): The classes of its <polygon>s.
+    :param Link(str): The xlink:href of its first <a>.
+    """
+
+    Texts: Dict[str, str] = field(default_factory=dict)
+    Text_Ids: Set[str] = field(default_factory=set)
+    Polygons: Set[str] = field(default_factory=set)
+    Link: Optional[str] = field(default=None)
+
+
+@dataclass
+class DotlanSvg:
+    """
+    Everything parse_map needs from a dotlan map svg, read in a single pass by read_map_svg.
+
+    :param Symbols(Dict[str, DotlanSymbol]): The <symbol> definitions, by the system id they are for.
+    :param Uses(List[Dict[str, str]]): The attributes of each <use>, placing a symbol on the map.
+    :param Lines(List[Dict[str, str]]): The attributes of each <line>, the jumps between systems.
+    """
+
+    Symbols: Dict[str, DotlanSymbol] = field(default_factory=dict)
+    Uses: List[Dict[str, str]] = field(default_factory=list)
+    Lines: List[Dict[str, str]] = field(default_factory=list)
+
+
+def read_map_svg(map_svg: BytesIO) -> DotlanSvg:
+    """
+    Streams a dotlan map svg through expat, indexing the symbols by id as they go past, so no part of the document is
+    searched again afterwards.
+    """
+    svg = DotlanSvg()
+    symbol: Optional[DotlanSymbol] = None  # the <symbol> being read
+    text: Optional[Tuple[str, List[str]]] = None  # (class, text so far) of the outermost <text> being read
+    text_depth = 0
+
+    def start_element(name: str, attributes: Dict[str, str]):
+        nonlocal symbol, text, text_depth
+        if name == "use":
+            svg.Uses.append(attributes)
+        elif name == "line":
+            svg.Lines.append(attributes)
+        elif name == "symbol":
+            symbol = svg.Symbols[attributes.get("id", "")[3:]] = DotlanSymbol()
+        elif symbol is None:
+            return
+        elif name == "text":
+            text_depth += 1
+            if text_depth == 1:
+                text = (attributes.get("class", None), [])
+                if "id" in attributes:
+                    symbol.Text_Ids.add(attributes["id"])
+        elif name == "polygon":
+            symbol.Polygons.add(attributes.get("class", None))
+        elif name == "a" and symbol.Link is None:
+            symbol.Link = attributes.get("xlink:href", "")
+
+    def end_element(name: str):
+        nonlocal symbol, text, text_depth
+        if name == "symbol":
+            symbol = None
+            text_depth = 0
+        elif name == "text" and text_depth > 0:
+            text_depth -= 1
+            if text_depth == 0:
+                symbol.Texts.setdefault(text[0], "".join(text[1]))
+                text = None
+
+    def character_data(data: str):
+        if text is not None:
+            text[1].append(data)
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+    parser.ParseFile(map_svg)
+
+    return svg
+
+
+def parse_systems(
+    all_data_client: "AllData",
+    svg: DotlanSvg,
+    expected_region: str,
+    is_region_map: bool = False,
+    region_offset: DotlanRegionOffset = None,
+) -> Dict[str, DotlanSystem]:
+    systems = {}
+    for node in svg.Uses:
+        sys_id = node.get("id")[3:]
+        system = parse_system(all_data_client, svg.Symbols[sys_id], node, expected_region, is_region_map, region_offset)
+        if system is not None:
+            systems[system.Name if is_region_map else system.System_Id] = system
+
+    return systems
 
-    return {
-        region.Name: region
-        for region in [parse_system(None, xml_root, node, "", is_region_map=True) for node in xml_root.findAll("use")]
-        if region is not None
-    }
+
+def build_region_central_coordinates(region_map: BytesIO = None):
+    """:param region_map(BytesIO, default: None): The New_Eden map, if already fetched. Otherwise it is fetched here."""
+    svg = read_map_svg(get_map("New_Eden") if region_map is None else region_map)
+
+    return parse_systems(None, svg, "", is_region_map=True)
 
 
 def determine_region_relative_position(region_name, region_data):
@@ -123,12 +240,10 @@ def determine_region_relative_position(region_name, region_data):
         return (position.X * REGION_X_OFFSET, position.Y * REGION_Y_OFFSET)
 
 
-def find_map_center(xml_root: BeautifulSoup):
-    all_coordinates = xml_root.findAll("use")
-
+def find_map_center(uses: List[Dict[str, str]]):
     max_x = 0
     max_y = 0
-    for coord in all_coordinates:
+    for coord in uses:
         x = float(coord.get("x"))
         y = float(coord.get("y"))
         max_x = x if x > max_x else max_x
@@ -147,53 +262,81 @@ def parse_map(
     """
     parse the xml representation of a dotlan map svg to pull out coordinate data for each system
     """
-    xml_root = BeautifulSoup(map_svg, features="xml")
-    center_x, center_y = find_map_center(xml_root)
+    svg = read_map_svg(map_svg)
+    center_x, center_y = find_map_center(svg.Uses)
     region_x, region_y = determine_region_relative_position(region_name, region_data)
 
     region_offset = DotlanRegionOffset(center_x, center_y, region_x, region_y)
 
-    systems = {
-        system.System_Id: system
-        for system in [
-            parse_system(all_data_client, xml_root, node, region_name, region_offset=region_offset)
-            for node in xml_root.findAll("use")
-        ]
-        if system is not None
-    }
+    systems = parse_systems(all_data_client, svg, region_name, region_offset=region_offset)
     connections = {
         connection.origin.sys_id: connection
-        for connection in [parse_connections(node, region_offset=region_offset) for node in xml_root.findAll("line")]
+        for connection in [parse_connections(node, region_offset=region_offset) for node in svg.Lines]
     }
 
     return {"systems": systems, "connections": connections}
 
 
-def load_dotlan_extra_data(region_name, force_active_dotlan_scrape, systems, progress_bar: ProgressBar):
-    cache = {}
-    region_extra_pickle = f"data/pickled_{region_name}_dotlan_extra"
+def load_dotlan_extra_data(
+    region_name,
+    force_active_dotlan_scrape,
+    systems,
+    progress_bar: ProgressBar,
+    fetcher: Fetcher = None,
+    store: DotlanExtraStore = None,
+    ttl: float = DOTLAN_EXTRA_TTL,
+    base_url: str = SYSTEM_BASE_URL,
+):
+    """
+    Sets More on each system from the store, first scraping those that are missing from it or were scraped more than
+    ttl seconds ago (every system, if force_active_dotlan_scrape). Systems are scraped across the fetcher's workers and
+    added to the store as each one finishes, so an interrupted scrape carries on from where it stopped.
+
+    A system that cannot be scraped is reported and left for the next run, keeping whatever data it had before.
+
+    :param fetcher(Fetcher, default: None): What the pages are fetched with. An uncached dotlan_fetcher() if None.
+    :param store(DotlanExtraStore, default: None): Where the scraped data is kept. The default store if None.
+    :param ttl(float, default: DOTLAN_EXTRA_TTL): How many seconds scraped data is used for before scraping it again.
+    :param base_url(str, default: SYSTEM_BASE_URL): Where the system pages are fetched from.
+    """
     base_update_string = f"D-Scrape[{region_name}]"
-    pickle_exists = os.path.exists(region_extra_pickle)
-    if not force_active_dotlan_scrape:
-        if pickle_exists:
-            progress_bar.Update(f"{base_update_string}: Load Pickle")
-            with open(region_extra_pickle, "rb") as pickleFile:
-                cache = load(pickleFile)
+    own_store = store is None
+    store = DotlanExtraStore() if own_store else store
+    ttl = 0 if force_active_dotlan_scrape else ttl
+
+    if any(system.System_Id not in store for system in systems.values()):
+        # data scraped before the store existed was pickled by region
+        store.Adopt(f"data/pickled_{region_name}_dotlan_extra")
+
+    stale = [system for system in systems.values() if not store.IsFresh(system.System_Id, ttl)]
+    if len(stale) > 0:
+        fetcher = dotlan_fetcher(cache_directory=None) if fetcher is None else fetcher
+        failed = []
+        with ThreadPoolExecutor(max_workers=fetcher.Workers) as executor:
+            scrapes = {
+                executor.submit(parse_extra_dotlan_data, system.Name, system.System_Id, fetcher, base_url): system
+                for system in stale
+            }
+            for scrape in as_completed(scrapes):
+                system = scrapes[scrape]
+                progress_bar.Update(f"{base_update_string}: {system.Name}")
+                try:
+                    store.Add(system.System_Id, scrape.result())
+                except Exception as e:
+                    failed.append(system.Name)
+                    print(f"{base_update_string}: Cannot scrape {system.Name}: {e}")
+
+        if len(failed) > 0:
+            print(f"{base_update_string}: {len(failed)} systems will be scraped again next run")
 
     for system in systems.values():
-        progress_bar.Update(f"{base_update_string}: {system.Name}")
-        if system.System_Id not in cache.keys():
-            cache[system.System_Id] = parse_extra_dotlan_data(system.Name, system.System_Id)
+        system.More = store.Get(system.System_Id)
 
-        system.More = cache[system.System_Id]
+    if own_store:
+        store.Close()
 
-    if not pickle_exists or force_active_dotlan_scrape:
-        progress_bar.Update(f"{base_update_string}: Pickling")
-        with open(region_extra_pickle, "wb") as pickleFile:
-            dump(cache, pickleFile)
 
-
-def parse_connections(node: ResultSet, region_offset: DotlanRegionOffset) -> DotlanConnection:
+def parse_connections(node: Dict[str, str], region_offset: DotlanRegionOffset) -> DotlanConnection:
     system_id = node.get("id")
 
     origin_x, origin_y = offset_around_region(node, region_offset, "x1", "y1")
@@ -212,47 +355,38 @@ def parse_connections(node: ResultSet, region_offset: DotlanRegionOffset) -> Dot
 
 def parse_system(
     all_data_client: "AllData",
-    root_node: ResultSet,
-    node: ResultSet,
+    symbol: DotlanSymbol,
+    node: Dict[str, str],
     expected_region,
     is_region_map: bool = False,
     region_offset: DotlanRegionOffset = None,
 ):
     """
     pull out system data if the system is in the expected region (to prevent duplications)
+
+    :param symbol(DotlanSymbol): The definition the <use> node places, from read_map_svg.
+    :param node(Dict[str, str]): The attributes of the <use> node.
     """
 
     sys_id = node.get("id")[3:]
 
-    data_node = root_node.find(f"symbol", id=f"def{sys_id}")
-
-    if is_region_map:
-        region = data_node.find("text", **{"class": "ss"})
-    else:
-        region = data_node.find("text", **{"class": "er"})
-
-    ice = data_node.find("text", id=f"ice{sys_id}")
-    refining = data_node.find("polygon", **{"class": "v1"})
-    cloning = data_node.find("polygon", **{"class": "v2"})
-    industry = data_node.find("polygon", **{"class": "v3"})
-    research = data_node.find("polygon", **{"class": "v4"})
-    alliance = data_node.find("text", **{"class": "st"})
-    link = data_node.find("a").get("xlink:href", "")
+    region = symbol.Texts.get("ss" if is_region_map else "er", None)
+    alliance = symbol.Texts.get("st", None)
 
     x, y = offset_around_region(node, region_offset)
 
-    if is_region_map or (region is None or region.text == expected_region):
+    if is_region_map or (region is None or region == expected_region):
         return DotlanSystem(
             System_Id=sys_id,
-            Name=region.text if is_region_map else all_data_client.GetSystem(sys_id).Name,
+            Name=region if is_region_map else all_data_client.GetSystem(sys_id).Name,
             Position=Position(X=x, Y=y, Z=0, Universe=Universe.EDEN),
-            faction=alliance.text if alliance is not None else "",
-            has_ice=ice is not None,
-            has_refinery=refining is not None,
-            has_cloning=cloning is not None,
-            has_industry=industry is not None,
-            has_research=research is not None,
-            dotlan_link=link,
+            faction=alliance if alliance is not None else "",
+            has_ice=f"ice{sys_id}" in symbol.Text_Ids,
+            has_refinery="v1" in symbol.Polygons,
+            has_cloning="v2" in symbol.Polygons,
+            has_industry="v3" in symbol.Polygons,
+            has_research="v4" in symbol.Polygons,
+            dotlan_link=symbol.Link or "",
         )
 
     return None
@@ -273,45 +407,64 @@ def offset_around_region(node, region_offset: DotlanRegionOffset, x_name: str =
         return original_x, original_y
 
 
-def attach_dotlan_data(client: "AllData", region_data: dict):
+def stargate_ids_by_route(client: "AllData") -> Dict[Tuple[int, int], int]:
+    """The Id of the stargate from one system to another, by (origin System_Id, destination System_Id)"""
+    map_client = client.MapClient
+    routes = zip(
+        map_client.Column("STARGATES", "OriginSystem_Id"), map_client.Column("STARGATES", "DestinationSystem_Id")
+    )
+    # built back to front so the first stargate for a route wins
+    return dict(reversed(list(zip(routes, map_client.Column("STARGATES", "Id")))))
+
+
+def attach_dotlan_data(client: "AllData", region_data: dict, stargate_ids: Dict[Tuple[int, int], int] = None):
+    """
+    Sets the dotlan data of a region on its systems and stargates. None of them are created for it when the client is
+    lazy (see MapSnapshot.Populate), the data is set when they are first accessed.
+
+    :param stargate_ids(Dict[Tuple[int, int], int], default: None): The stargate_ids_by_route(). Worked out if None.
+    """
+    map_client = client.MapClient
+    if stargate_ids is None:
+        stargate_ids = stargate_ids_by_route(client)
 
     regions: Dict[int, DotlanSystem] = region_data["systems"]
     for sys_id, dotlan_system in regions.items():
-        system = client.GetSystem(sys_id)
-        system.Dotlan = dotlan_system
+        map_client.Set("SYSTEMS", int(sys_id), "Dotlan", dotlan_system)
 
     connections: Dict[int, DotlanConnection] = region_data["connections"]
     for sys_id, connection in connections.items():
-        system = client.GetSystem(sys_id)
         destination_id = connection.destination.sys_id
 
-        origin_stargate = next(
-            (
-                stargate
-                for stargate in system.GetStargates(cache=True)
-                if stargate.DestinationSystem_Id == destination_id
-            ),
-            None,
-        )
-        origin_stargate.DotlanOrigin = connection.origin
-        origin_stargate.DotlanDestination = connection.destination
+        origin_stargate_id = stargate_ids[(sys_id, destination_id)]
+        map_client.Set("STARGATES", origin_stargate_id, "DotlanOrigin", connection.origin)
+        map_client.Set("STARGATES", origin_stargate_id, "DotlanDestination", connection.destination)
 
-        destination_system = system = client.GetSystem(destination_id)
-        destination_stargate = next(
-            (stargate for stargate in destination_system.GetStargates() if stargate.DestinationSystem_Id == sys_id),
-            None,
-        )
-        destination_stargate.DotlanOrigin = connection.destination
-        destination_stargate.DotlanDestination = connection.origin
+        destination_stargate_id = stargate_ids[(destination_id, sys_id)]
+        map_client.Set("STARGATES", destination_stargate_id, "DotlanOrigin", connection.destination)
+        map_client.Set("STARGATES", destination_stargate_id, "DotlanDestination", connection.origin)
 
 
 def get_all_dotlan_data(
-    client: "AllData", build_data=True, progress_bar: ProgressBar = None, force_dotlan_scrape: bool = False
+    client: "AllData",
+    build_data=True,
+    progress_bar: ProgressBar = None,
+    force_dotlan_scrape: bool = False,
+    fetcher: Fetcher = None,
+    base_url: str = BASE_URL,
+    system_base_url: str = SYSTEM_BASE_URL,
 ):
     """
     download all the svgs for each region from dotlan and extract system_ids, system x-y coords, and connection data
 
-    if build_data=True will re-download and re-pickled
+    if build_data=True will re-download and re-pickled. The maps are fetched together (see dotlan_fetcher), asking only
+    for those that changed since they were last cached, and only regions whose map (or the region map, which places
+    them) differs from the one their pickled data was parsed from are parsed again. This is checked against checksums
+    kept with the pickled data rather than the fetcher's Changed, as the fetcher's cache is written before the pickle.
+
+    :param fetcher(Fetcher, default: None): What the maps are fetched with. dotlan_fetcher() if None.
+    :param base_url(str, default: BASE_URL): Where the region svgs are fetched from.
+    :param system_base_url(str, default: SYSTEM_BASE_URL): Where the system pages are fetched from.
     """
     os.system("cls" if os.name == "nt" else "clear")
     progress_bar = ProgressBar(None) if progress_bar is None else progress_bar
@@ -319,39 +472,68 @@ def get_all_dotlan_data(
 
     data = {}
     pickled_file_exists = os.path.exists(pickle_file_name)
+    if pickled_file_exists:
+        progress_bar.Update("Dotlan: Load Pickle")
+        with open(pickle_file_name, "rb") as pickleFile:
+            data = load(pickleFile)
+
+    rebuild = build_data or not pickled_file_exists
+    maps = {}
     region_data = None
+    region_map_checksum = None
+    extra_store = None
+    extra_fetcher = None
+    if rebuild:
+        fetcher = dotlan_fetcher() if fetcher is None else fetcher
+        extra_store = DotlanExtraStore()
+        # system pages are kept in extra_store once parsed, so there is no need to also cache the html
+        extra_fetcher = dotlan_fetcher(cache_directory=None)
+        progress_bar.Update("Dotlan: Fetching region maps")
+        maps = fetcher.GetMany(map_url(name, base_url) for name in ["New_Eden"] + REGION_NAMES)
+        region_map = maps[map_url("New_Eden", base_url)]
+        progress_bar.Update("Dotlan: Region Offset")
+        region_data = build_region_central_coordinates(BytesIO(region_map.Content))
+        region_map_checksum = hashlib.sha256(region_map.Content).hexdigest()
+
+    stargate_ids = stargate_ids_by_route(client)
     for region in REGION_NAMES:
         base_update_string = f"Dotlan[{region}]"
         progress_bar.Update(base_update_string)
 
-        if not build_data and pickled_file_exists and len(data) <= 0:
-            progress_bar.Update(f"{base_update_string}: Load Pickle")
-            with open(pickle_file_name, "rb") as pickleFile:
-                data = load(pickleFile)
-
-        if build_data or not pickled_file_exists:
-            if region_data is None:
-                progress_bar.Update(f"{base_update_string}: Region Offset")
-                region_data = build_region_central_coordinates()
-
-            if data.get(region, None) is None:
+        if rebuild:
+            fetched = maps[map_url(region, base_url)]
+            checksums = {
+                "map_checksum": hashlib.sha256(fetched.Content).hexdigest(),
+                # every region is placed by the region map, so they all move with it
+                "region_map_checksum": region_map_checksum,
+            }
+            previous = data.get(region, None)
+            if previous is None or any(previous.get(key, None) != value for key, value in checksums.items()):
                 progress_bar.Update(f"{base_update_string}: Refresh data")
-                content = get_map(region)
-                data[region] = parse_map(content, client, region, region_data, force_dotlan_scrape)
-                pause_count = DEFAULT_PAUSE_COUNT
-                while pause_count > 0:
-                    progress_bar.Update(f"{base_update_string}: Refresh data {pause_count}")
-                    sleep(1)
-                    pause_count -= 1
-
-            load_dotlan_extra_data(region, force_dotlan_scrape, data[region]["systems"], progress_bar)
+                data[region] = parse_map(BytesIO(fetched.Content), client, region, region_data, force_dotlan_scrape)
+                data[region].update(checksums)
+
+            load_dotlan_extra_data(
+                region,
+                force_dotlan_scrape,
+                data[region]["systems"],
+                progress_bar,
+                fetcher=extra_fetcher,
+                store=extra_store,
+                base_url=system_base_url,
+            )
 
         progress_bar.Update(f"Combining {region} with map_data")
-        attach_dotlan_data(client, data[region])
+        attach_dotlan_data(client, data[region], stargate_ids)
         print(f"{region} dotlan data loaded")
 
         progress_bar.Advance()
 
-    with open(pickle_file_name, "wb") as pickleFile:
-        print(f"Pickling dotlan map data")
-        dump(data, pickleFile)
+    if extra_store is not None:
+        extra_store.Close()
+
+    # only re-pickle when something was rebuilt, so loading does not rewrite the file every time
+    if build_data or not pickled_file_exists:
+        with open(pickle_file_name, "wb") as pickleFile:
+            print(f"Pickling dotlan map data")
+            dump(data, pickleFile)
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from time import monotonic, sleep
+from typing import Dict, Iterable, Optional
+
+import requests
+
+DEFAULT_HTTP_CACHE_DIRECTORY = "data/http_cache"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Rate limit shared between threads. Holds up to capacity tokens, refilled at rate tokens a second, and Acquire()
+    blocks until one is free - so bursts of up to capacity requests go straight out, then they are spaced out to rate.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1) -> None:
+        if rate <= 0 or capacity < 1:
+            raise ValueError(f"A TokenBucket needs a positive rate and capacity, not {rate}/{capacity}")
+        self.Rate = rate
+        self.Capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = monotonic()
+        self._lock = threading.Lock()
+
+    def Acquire(self):
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._tokens = min(self.Capacity, self._tokens + (now - self._updated) * self.Rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.Rate
+            sleep(wait)
+
+
+@dataclass
+class FetchResult:
+    """
+    :param Url(str): The url that was fetched.
+    :param Content(bytes): The body, from the server or the cache.
+    :param Changed(bool): False if the content is the same as was cached the last time it was fetched.
+    """
+
+    Url: str
+    Content: bytes
+    Changed: bool
+
+
+@dataclass
+class Fetcher:
+    """
+    Gets urls with a shared rate limit, retrying with exponential backoff, and keeps every response in an on disk cache.
+    Cached urls are asked for again with their ETag/Last-Modified, so unchanged ones come back as a 304 with no body and
+    are read from the cache.
+
+    :param CacheDirectory(str, default: DEFAULT_HTTP_CACHE_DIRECTORY): Where responses are cached. None to not cache.
+    :param RequestsPerSecond(float, default: 1): How many requests may be started a second, across every thread.
+    :param Burst(int, default: 1): How many requests may go out at once before the rate limit applies.
+    :param Workers(int, default: 4): How many threads GetMany() fetches with.
+    :param MaxAttempts(int, default: 5): How many times a url is tried before giving up.
+    :param Backoff(float, default: 1): Seconds to wait before the first retry, doubled for each one after. A Retry-After
+        header is used instead, when the server sends one.
+    :param Timeout(float, default: 30): Seconds to wait for the server on each attempt.
+    """
+
+    CacheDirectory: Optional[str] = field(kw_only=True, default=DEFAULT_HTTP_CACHE_DIRECTORY)
+    RequestsPerSecond: float = field(kw_only=True, default=1)
+    Burst: int = field(kw_only=True, default=1)
+    Workers: int = field(kw_only=True, default=4)
+    MaxAttempts: int = field(kw_only=True, default=5)
+    Backoff: float = field(kw_only=True, default=1)
+    Timeout: float = field(kw_only=True, default=30)
+    _bucket: TokenBucket = field(init=False, repr=False)
+    _local: threading.local = field(init=False, repr=False, default_factory=threading.local)
+
+    def __post_init__(self):
+        self._bucket = TokenBucket(self.RequestsPerSecond, self.Burst)
+        if self.CacheDirectory is not None:
+            os.makedirs(self.CacheDirectory, exist_ok=True)
+
+    def Get(self, url: str) -> FetchResult:
+        cached = self._readCache(url)
+        headers = {}
+        if cached is not None:
+            if cached["etag"] is not None:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"] is not None:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = self._request(url, headers)
+        if response.status_code == 304 and cached is not None:
+            return FetchResult(Url=url, Content=cached["content"], Changed=False)
+
+        changed = cached is None or cached["content"] != response.content
+        self._writeCache(url, response)
+        return FetchResult(Url=url, Content=response.content, Changed=changed)
+
+    def GetMany(self, urls: Iterable[str]) -> Dict[str, FetchResult]:
+        """Get() for every url, across Workers threads. Returns the results by url, in the order given."""
+        urls = list(urls)
+        with ThreadPoolExecutor(max_workers=self.Workers) as executor:
+            return dict(zip(urls, executor.map(self.Get, urls)))
+
+    def _request(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        for attempt in range(self.MaxAttempts):
+            self._bucket.Acquire()
+            try:
+                response = self._session().get(url, headers=headers, timeout=self.Timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                response = None
+
+            if response is not None and response.status_code not in RETRY_STATUS_CODES:
+                if response.status_code in (200, 304):
+                    return response
+                raise Exception(f"Cannot get {url}: {response.status_code}")
+
+            if attempt + 1 < self.MaxAttempts:
+                sleep(self._retryDelay(response, attempt))
+
+        raise Exception(f"Cannot get {url} after {self.MaxAttempts} attempts")
+
+    def _retryDelay(self, response: Optional[requests.Response], attempt: int) -> float:
+        retry_after = response.headers.get("Retry-After", None) if response is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return self.Backoff * 2**attempt
+
+    def _session(self) -> requests.Session:
+        # sessions are not thread safe, so each thread keeps its own (and its connections to the server)
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _cachePath(self, url: str) -> str:
+        return os.path.join(self.CacheDirectory, hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def _readCache(self, url: str) -> Optional[dict]:
+        if self.CacheDirectory is None:
+            return None
+
+        path = self._cachePath(url)
+        if not os.path.exists(f"{path}.json") or not os.path.exists(f"{path}.body"):
+            return None
+        with open(f"{path}.json", "r") as file:
+            cached = json.load(file)
+        with open(f"{path}.body", "rb") as file:
+            cached["content"] = file.read()
+        return cached
+
+    def _writeCache(self, url: str, response: requests.Response):
+        if self.CacheDirectory is None:
+            return
+
+        path = self._cachePath(url)
+        # the body goes first, so an interrupted write never pairs new ETag/Last-Modified values with an old body
+        with open(f"{path}.body", "wb") as file:
+            file.write(response.content)
+        with open(f"{path}.json", "w") as file:
+            json.dump(
+                {
+                    "url": url,
+                    "etag": response.headers.get("ETag", None),
+                    "last_modified": response.headers.get("Last-Modified", None),
+                },
+                file,
+            )
@@ -1,20 +1,157 @@
-import re
-from time import sleep
-
-import requests
-from bs4 import BeautifulSoup, ResultSet, Tag
+import sys
+import threading
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
 
 from logic.common import try_parse
+from logic.http_fetcher import Fetcher
 from models.third_party.dotlan import DotlanAdditionalSystemData, DotlanAgent, DotlanStation
 
+SYSTEM_BASE_URL = "https://evemaps.dotlan.net/system/"
+TABLE_CLASS = "tablelist"  # the class dotlan gives its tables of data
+CELL_TAGS = ("td", "th")
+
+
+@dataclass
+class DotlanCell:
+    """
+    :param Text(str): All the text in the cell, as it is on the page.
+    :param Attributes(str): The values of the cell's attributes, to look for an image_indicator in.
+    :param Image(str, default: None): The src of the first <img> in the cell.
+    """
+
+    Text: str
+    Attributes: str
+    Image: Optional[str] = field(default=None)
+
+    def Value(self, image_indicator: str = None) -> Optional[str]:
+        """The cell's stripped text, or its image src if image_indicator is one of its attribute values"""
+        if image_indicator is None or image_indicator.strip() == "":
+            return self.Text.strip()
+
+        if image_indicator in self.Attributes:
+            return self.Image
 
-def parse_extra_dotlan_data(system_name: str, system_id: int):
+        return self.Text.strip()
+
+
+@dataclass
+class DotlanPage:
+    """
+    The tablelist tables of a dotlan page, read by DotlanTableParser.
+
+    :param Tables(List[List[List[DotlanCell]]]): The rows of cells of each table, in page order.
+    :param Index(Dict[Tuple[str, str], int]): (cell tag, cell text): the first table with such a cell, so tables are
+        found by a header without looking through them again.
+    """
+
+    Tables: List[List[List[DotlanCell]]] = field(default_factory=list)
+    Index: Dict[Tuple[str, str], int] = field(default_factory=dict)
+
+    def FindTable(self, unique_text: str, element_tag: str = "th") -> Optional[List[List[DotlanCell]]]:
+        table = self.Index.get((element_tag, unique_text), None)
+        return None if table is None else self.Tables[table]
+
+
+class DotlanTableParser(HTMLParser):
+    """
+    Reads every tablelist table of a dotlan page in a single pass, keeping only what the factories use out of each cell.
+    Can be fed page after page, see read_page.
+    """
+
+    def reset(self):
+        super().reset()
+        self.Page = DotlanPage()
+        self._tables: List[Optional[List[List[DotlanCell]]]] = []  # open tables, None for ones that are not tablelists
+        self._row: Optional[List[DotlanCell]] = None
+        self._cell: Optional[Tuple[str, List[str], DotlanCell]] = None  # (tag, text so far, cell)
+
+    def Read(self, content: str) -> DotlanPage:
+        self.reset()
+        self.feed(content)
+        self.close()
+        return self.Page
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._endRow()
+            classes = next((value or "" for name, value in attrs if name == "class"), "").split()
+            self._tables.append([] if TABLE_CLASS in classes else None)
+            return
+
+        if len(self._tables) == 0 or self._tables[-1] is None:
+            return
+
+        if tag == "tr":
+            self._endRow()
+            self._row = []
+            self._tables[-1].append(self._row)
+        elif tag in CELL_TAGS:
+            self._endCell()
+            if self._row is None:
+                self._row = []
+                self._tables[-1].append(self._row)
+            attributes = str([value for _, value in attrs])
+            self._cell = (tag, [], DotlanCell(Text="", Attributes=attributes))
+        elif tag == "img" and self._cell is not None and self._cell[2].Image is None:
+            self._cell[2].Image = next((value for name, value in attrs if name == "src"), None)
+
+    def handle_endtag(self, tag):
+        if tag == "table" and len(self._tables) > 0:
+            self._endRow()
+            table = self._tables.pop()
+            if table is not None:
+                self.Page.Tables.append(table)
+                for row in table:
+                    for cell_tag, cell in row:
+                        self.Page.Index.setdefault((cell_tag, cell.Text), len(self.Page.Tables) - 1)
+                table[:] = [[cell for _, cell in row] for row in table]
+        elif tag == "tr":
+            self._endRow()
+        elif tag in CELL_TAGS:
+            self._endCell()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell[1].append(data)
+
+    def _endCell(self):
+        if self._cell is None:
+            return
+        tag, text, cell = self._cell
+        cell.Text = "".join(text)
+        self._row.append((tag, cell))
+        self._cell = None
+
+    def _endRow(self):
+        self._endCell()
+        self._row = None
+
+
+_parsers = threading.local()
+
+
+def read_page(content: bytes) -> DotlanPage:
+    """Reads the tables out of a dotlan page, with a parser kept for each thread"""
+    parser = getattr(_parsers, "parser", None)
+    if parser is None:
+        parser = _parsers.parser = DotlanTableParser()
+    return parser.Read(content.decode("utf-8", errors="replace"))
+
+
+def parse_extra_dotlan_data(system_name: str, system_id: int, fetcher: Fetcher = None, base_url: str = SYSTEM_BASE_URL):
     """
     primary function to scrape extra Dotlan data from the dotlan/system/name page for a given system.
 
     try to call it sparingly. Data should be cached.
+
+    :param fetcher(Fetcher, default: None): What the pages are fetched with, so that every thread scraping dotlan
+        shares one rate limit. An uncached Fetcher if None.
+    :param base_url(str, default: SYSTEM_BASE_URL): Where the system pages are fetched from.
     """
-    scrape = _scrape_page(system_name, "")
+    scrape = _scrape_page(system_name, "", fetcher, base_url)
     stations = _get_subpage_data(system_name, "", "Services", image_indicator="tlogo", _page=scrape)
     system_data = _get_subpage_data(
         system_name, "", "Belts/Icebelts", unique_element_tag="td", _page=scrape, drop_header=False
@@ -23,16 +160,16 @@ def parse_extra_dotlan_data(system_name: str, system_id: int):
     SystemData = DotlanAdditionalSystemDataFactory(system_data)
 
     SystemData.Stations = DotlanStationFactory(stations, system_id)
-    SystemData.Agents = DotlanAgentFactory(system_name, system_id)
+    SystemData.Agents = DotlanAgentFactory(system_name, system_id, fetcher, base_url)
 
     return SystemData
 
 
-def DotlanAgentFactory(system_name: str, sys_id: int):
+def DotlanAgentFactory(system_name: str, sys_id: int, fetcher: Fetcher = None, base_url: str = SYSTEM_BASE_URL):
     """
     parses a list of data from dotlan/system/name/agents page and returns a list of DotlanAgents
     """
-    agents = _get_subpage_data(system_name, "agents", "Division / Type / Research")
+    agents = _get_subpage_data(system_name, "agents", "Division / Type / Research", fetcher=fetcher, base_url=base_url)
     parsed_agents = []
     current_station = "In Space"
     for agent in agents:
@@ -93,73 +230,60 @@ def _get_subpage_data(
     unique_elment_value: str,
     unique_element_tag: str = "th",
     image_indicator: str = None,
-    _page=None,
+    _page: DotlanPage = None,
     drop_header: bool = True,
+    fetcher: Fetcher = None,
+    base_url: str = SYSTEM_BASE_URL,
 ):
     """
     Scrapes a system/subpage off dotlan for tables, finds the correct table, and parses the rows into a list.
     """
-    _page = _scrape_page(system_name, sub_page) if _page is None else _page
+    _page = _scrape_page(system_name, sub_page, fetcher, base_url) if _page is None else _page
 
-    _table = _find_correct_dotlan_table(_page, unique_elment_value, unique_element_tag)
+    _table = _page.FindTable(unique_elment_value, unique_element_tag)
     if _table is None:
         return []
-    _data = _parse_table_into_list(_table, image_indicator)
-    _rows = [datum for datum in _data if len(datum) > 0]
+    _rows = [[cell.Value(image_indicator) for cell in row] for row in _table if len(row) > 0]
 
     return _rows[1:] if drop_header else _rows
 
 
-def _scrape_page(system_name: str, subpage: str, backoff: int = 5, count: int = 1):
+def _scrape_page(
+    system_name: str, subpage: str, fetcher: Fetcher = None, base_url: str = SYSTEM_BASE_URL
+) -> DotlanPage:
     """
-    Get dotlan system/name/subpage data
+    Get dotlan system/name/subpage data. Retries and backing off are left to the fetcher.
     """
-    base_url = f"https://evemaps.dotlan.net/system/{system_name}/"
-    document = requests.get(f"{base_url}{subpage}")
-    if document.status_code == 200:
-        return BeautifulSoup(document.content, features="html.parser")
-    else:
-        if count > 4:
-            raise Exception(f"Cannot scrape {system_name}/{subpage}")
-        sleep(backoff)
-        _scrape_page(system_name, subpage, backoff=backoff * 2, count=count + 1)
+    fetcher = Fetcher(CacheDirectory=None) if fetcher is None else fetcher
+    document = fetcher.Get(f"{base_url}{system_name}/{subpage}")
+    return read_page(document.Content)
 
 
-def _find_correct_dotlan_table(page: BeautifulSoup, unique_text: str, element_tag):
-    """
-    checks all elements of a given tag [element_tag] for text that would indicate its part of the table that is needed.
-    Returns said table.
+def time_page_reads(file_paths: List[str], repeat: int = 20) -> Dict[str, float]:
     """
-    page_tables = page.findAll("table", **{"class": "tablelist"})
-    for table in page_tables:
-        table_elements = table.findAll(element_tag)
-        for header in table_elements:
-            if header.text == unique_text:
-                return table
-
-
-def _parse_table_into_list(table: ResultSet, image_indicator: str):
+    Average seconds read_page takes on each saved dotlan page, along with finding and converting the tables that
+    parse_extra_dotlan_data uses.
     """
-    converts an html table into a set of rows of text for each cell, or potentially image link.
-    """
-    rows = table.findAll("tr")
-    table_data = []
-    for row in rows:
-        cols = row.findAll(re.compile(r"(td|th)"))
-        parsed_cols = [_parse_row_element(ele, image_indicator) for ele in cols]
-        table_data.append(parsed_cols)
-    return table_data
-
-
-def _parse_row_element(element: Tag, image_indicator: str):
-    """
-    gets the text or the img src link out of an table element
-    """
-    if image_indicator is None or image_indicator.strip() == "":
-        return element.text.strip()
-
-    if image_indicator in str(element.attrs.values()):
-        for child in element.findAll("img"):
-            return child.attrs["src"]
-
-    return element.text.strip()
+    timings = {}
+    for file_path in file_paths:
+        with open(file_path, "rb") as file:
+            content = file.read()
+
+        start = perf_counter()
+        for _ in range(repeat):
+            page = read_page(content)
+            for unique_text, tag, image_indicator in [
+                ("Services", "th", "tlogo"),
+                ("Belts/Icebelts", "td", None),
+                ("Division / Type / Research", "th", None),
+            ]:
+                _get_subpage_data("", "", unique_text, tag, image_indicator, _page=page)
+        timings[file_path] = (perf_counter() - start) / repeat
+
+    return timings
+
+
+if __name__ == "__main__":
+    # python -m logic.parse_dotlan_system_data <saved system page.html> [<saved agents page.html> ...]
+    for file_path, seconds in time_page_reads(sys.argv[1:]).items():
+        print(f"{file_path}: {seconds * 1000:.2f}ms a page")
@@ -0,0 +1,94 @@
+import hashlib
+import os
+from pickle import dump, HIGHEST_PROTOCOL, load
+from typing import Any, Iterator, List
+
+import yaml
+
+# libyaml's C loader is many times faster than the pure python one, but is only there when pyyaml was built against it
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+DEFAULT_YAML_CACHE_PATH = "data/yaml_cache"
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def hash_file(file_name: str) -> str:
+    """sha256 of a file's content, read in blocks so large SDE files are never held in memory at once"""
+    digest = hashlib.sha256()
+    with open(file_name, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _is_entry_start(line: str) -> bool:
+    """
+    A top level entry starts on an unindented line, ie: a `"30000001":` key or a `- ` list item. Comments, blank lines
+    and document markers are not entries.
+    """
+    return line[:1] not in ("", " ", "\t", "\n", "\r", "#") and not line.startswith(("---", "..."))
+
+
+def _parse_entry(text: str) -> Iterator[Any]:
+    parsed = yaml.load(text, Loader=SafeLoader)
+    if isinstance(parsed, dict):
+        yield from parsed.values()
+    elif isinstance(parsed, list):
+        yield from parsed
+    elif parsed is not None:
+        raise ValueError(f"Expected a top level mapping or list entry, got: {text[:80]!r}")
+
+
+def iter_yaml_entries(file_name: str) -> Iterator[Any]:
+    """
+    Parses a SDE yaml file one top level entry at a time, yielding the value of each entry (or each item, for a top level
+    list). Only the lines of the current entry are held and parsed, rather than composing the whole document first.
+
+    Relies on the SDE layout of one unindented line starting each entry, with everything belonging to it indented.
+    """
+    lines: List[str] = []
+    with open(file_name, "r", encoding="utf-8", errors="ignore") as file:
+        for line in file:
+            if lines and _is_entry_start(line):
+                yield from _parse_entry("".join(lines))
+                lines.clear()
+            lines.append(line)
+
+    if lines:
+        yield from _parse_entry("".join(lines))
+
+
+def load_yaml_entries(file_name: str, cache_path: str = DEFAULT_YAML_CACHE_PATH) -> Iterator[Any]:
+    """
+    Yields every top level entry of a SDE yaml file, from the parsed cache if this exact file content was parsed before.
+    Otherwise the file is stream parsed and the entries cached under the content hash once they have all been read, so
+    only files that changed since the last build are parsed again.
+
+    :param file_name(str): path to the yaml file
+    :param cache_path(str, default: DEFAULT_YAML_CACHE_PATH): Folder for the parsed cache. None turns caching off.
+    """
+    if cache_path is None:
+        yield from iter_yaml_entries(file_name)
+        return
+
+    base_name = os.path.basename(file_name)
+    cache_file_name = os.path.join(cache_path, f"{base_name}.{hash_file(file_name)}.pickle")
+    if os.path.exists(cache_file_name):
+        with open(cache_file_name, "rb") as pickleFile:
+            yield from load(pickleFile)
+        return
+
+    entries = []
+    for entry in iter_yaml_entries(file_name):
+        entries.append(entry)
+        yield entry
+
+    os.makedirs(cache_path, exist_ok=True)
+    for old_file_name in os.listdir(cache_path):
+        if old_file_name.startswith(f"{base_name}.") and old_file_name.endswith((".pickle", ".pickle.partial")):
+            os.remove(os.path.join(cache_path, old_file_name))
+    # written under another name first, so an interrupted write never leaves a cache that looks complete
+    partial_file_name = f"{cache_file_name}.partial"
+    with open(partial_file_name, "wb") as pickleFile:
+        dump(entries, pickleFile, protocol=HIGHEST_PROTOCOL)
+    os.replace(partial_file_name, cache_file_name)
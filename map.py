@@ -8,7 +8,6 @@ import plotly.graph_objects as go
 from distinctipy import distinctipy
 
 from buildMapData import *
-from logic.get_anoikis_data import GetAnokisData
 from map.formatting import *
 from models.common import Universe
 from models.map import *
@@ -103,9 +102,8 @@ def QuickMap(
 
             if system.Position.Universe == Universe.EDEN:
                 bar.title(f"Building {system.Name} Connections")
-                system.GetLinkedSystems()
 
-                for destination in system.GetLinkedSystems():
+                for destination in all_data.MapClient.GetMany("SYSTEMS", all_data.Graph.LinkedSystem_Ids(system.Id)):
                     destination_position = destination.Dotlan.Position if dotlan_layout else destination.Position
 
                     line = (destination.Name, system.Name)
@@ -303,16 +301,13 @@ def break_into_color_groups(
 if __name__ == "__main__":
     all_data = AllData(skip_build=True)
 
-    AnokisData = GetAnokisData(pickle_data=False)
+    # joins the anoik.is details onto the systems, for the wormhole formatting
+    all_data.Anoikis
 
     # WormholeWeatherFormatting.color_map = generate_distinct_colorings(keys=weather, existing=WormholeClassFormatting.color_map, pastel_factor=True)
     # RegionFormatting.color_map = generate_distinct_colorings(
     #     keys=[region.Name for region in all_data.Regions], existing=None, pastel_factor=True
     # )
-    WormholeClassFormatting.anokis_map = {system.name: system for system in AnokisData}
-    WormholeStaticFormatting.anokis_map = WormholeClassFormatting.anokis_map
-    WormholeWeatherFormatting.anokis_map = WormholeClassFormatting.anokis_map
-
     figure = QuickMap(
         all_data,
         include_universe=[Universe.EDEN],
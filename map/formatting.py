@@ -303,8 +303,6 @@ class WormholeClassFormatting(iDisplayFormatting):
         "K": "Drifter",
     }
 
-    anokis_map = {}
-
     @classmethod
     def node_naming(cls, system: System):
         wh_class = system.Region_Name[0]
@@ -415,7 +413,6 @@ class WormholeStaticFormatting(iDisplayFormatting):
         "Class: (c4) - Static c1/c2": (0.8997216561282793, 0.4214516396075859, 0.4577923825559667),
         "Class: (drifter) - Static c2": (0.6446279947912195, 0.8058122831530198, 0.8025864339721883),
     }
-    anokis_map = {}
 
     region_class_map = {
         "A": "C1",
@@ -433,13 +430,13 @@ class WormholeStaticFormatting(iDisplayFormatting):
     def node_naming(cls, system: System):
         wh_class = system.Region_Name[0]
         class_name = cls.region_class_map[wh_class]
-        return f"{system.Name} ({class_name}) - {cls.anokis_map[system.Name].statics}"
+        return f"{system.Name} ({class_name}) - {system.Anoikis.statics}"
 
     @classmethod
     def node_coloring(cls, system: System):
         wh_class = system.Region_Name[0]
         class_name = cls.region_class_map[wh_class]
-        static = cls.anokis_map[system.Name].statics
+        static = system.Anoikis.statics
 
         key = f"Class: ({class_name.lower()}) - Static {static}"
 
@@ -470,8 +467,6 @@ class WormholeWeatherFormatting(iDisplayFormatting):
         "K": "Drifter",
     }
 
-    anokis_map = {}
-
     @classmethod
     def marker(cls, weights: list, three_dimension: bool, size: int = 13):
         if three_dimension:
@@ -495,11 +490,11 @@ class WormholeWeatherFormatting(iDisplayFormatting):
     @classmethod
     def node_naming(cls, system: System):
         wh_class = system.Region_Name[0]
-        return f"{system.Name} ({cls.region_class_map[wh_class]}) {cls.anokis_map[system.Name].weather}"
+        return f"{system.Name} ({cls.region_class_map[wh_class]}) {system.Anoikis.weather}"
 
     @classmethod
     def node_coloring(cls, system: System):
-        weather = cls.anokis_map[system.Name].weather
+        weather = system.Anoikis.weather
 
         if weather is None:
             weather = "None"
@@ -23,6 +23,17 @@ class WeightMethod(Enum):
     TOTAL = 2
 
 
+class SearchMethod(Enum):
+    DEPTH_FIRST = 1
+    BREADTH_FIRST = 2
+
+
+class AuditLevel(Enum):
+    OFF = 0
+    TOP_ONLY = 1
+    FULL = 2
+
+
 @dataclass
 class Position:
     X: float
@@ -50,6 +61,27 @@ class iWeightFactor:
         """
         raise NotImplementedError
 
+    def DetermineStaticSystemWeight(self, system):
+        """
+        Optional. Everything DetermineSystemWeight works out that does not depend on jumps_from_source, so that
+        WeightCalculator.RunAll can weigh each system once and reuse it for every origin that reaches it.
+
+        Whatever is returned is handed back to AddJumpWeight, so its shape is up to the child class.
+
+        :param system(System): The system being weighted.
+        """
+        raise NotImplementedError
+
+    def AddJumpWeight(self, static_weight, jumps_from_source):
+        """
+        Optional. Combines a DetermineStaticSystemWeight result with the jumps from the source system, returning the same
+        values DetermineSystemWeight would have.
+
+        :param static_weight(Any): The return of DetermineStaticSystemWeight for the system.
+        :param jumps_from_source(int): The jumps from the system being checked for radial proximity searches
+        """
+        raise NotImplementedError
+
 
 @dataclass
 class iWeightResult:
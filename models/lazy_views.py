@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class LazyCollection(Sequence):
+    """
+    A read only, list like stand in for a MapClient.ALL_* list, where each object is only created the first time it is
+    accessed. Once created an object is kept, so every access returns the same object (and any values set on it stick).
+    Values Set() on an object that has not been created yet are held until it is.
+
+    :param size(int): How many objects are in the collection.
+    :param create(Callable[[int], Any]): Creates the object at a position in the collection.
+    :param columns(Dict[str, Callable[[], List[Any]]], default: None): For attributes stored as arrays, gets every
+        object's value without creating the objects. Used by Column().
+    """
+
+    def __init__(
+        self, size: int, create: Callable[[int], Any], columns: Dict[str, Callable[[], List[Any]]] = None
+    ) -> None:
+        self._items: List[Optional[Any]] = [None] * size
+        self._create = create
+        self._columns = columns or {}
+        # attribute: {position: value} for objects not created yet
+        self._pending: Dict[str, Dict[int, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self._items)))]
+
+        item = self._items[index]
+        if item is None:
+            position = index if index >= 0 else len(self._items) + index
+            item = self._items[position] = self._create(position)
+            for attribute, values in self._pending.items():
+                if position in values:
+                    setattr(item, attribute, values.pop(position))
+        return item
+
+    def __iter__(self) -> Iterator[Any]:
+        for position in range(len(self._items)):
+            yield self[position]
+
+    @property
+    def TotalCreated(self) -> int:
+        return len(self._items) - self._items.count(None)
+
+    def Set(self, position: int, attribute: str, value: Any):
+        """Sets an attribute of the object at a position, without creating the object if it has not been yet"""
+        item = self._items[position]
+        if item is None:
+            self._pending.setdefault(attribute, {})[position] = value
+        else:
+            setattr(item, attribute, value)
+
+    def Column(self, attribute: str) -> List[Any]:
+        """Every object's value for an attribute, read from the arrays when possible rather than creating the objects"""
+        if attribute in self._columns:
+            return self._columns[attribute]()
+        return [getattr(item, attribute) for item in self]
+
+
+class LazyIndex(Mapping):
+    """
+    Key: object lookup over a LazyCollection, for the MapClient ID_INDEX/NAME_INDEX. Only holds each key's position in
+    the collection, which is worked out the first time the index is used.
+
+    :param items(LazyCollection): The collection the positions are in.
+    :param build(Callable[[], Dict[Any, int]]): Creates the key: position dictionary.
+    """
+
+    def __init__(self, items: LazyCollection, build: Callable[[], Dict[Any, int]]) -> None:
+        self._items = items
+        self._build = build
+        self._positions: Dict[Any, int] = None
+
+    @property
+    def Positions(self) -> Dict[Any, int]:
+        if self._positions is None:
+            self._positions = self._build()
+        return self._positions
+
+    def __getitem__(self, key) -> Any:
+        return self._items[self.Positions[key]]
+
+    def __contains__(self, key) -> bool:
+        return key in self.Positions
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.Positions)
+
+    def __len__(self) -> int:
+        return len(self.Positions)
+
+
+class LazyGroups(Mapping):
+    """
+    Key: list of objects over a LazyCollection, for the MapClient *_BY_* groupings (ie: SYSTEMS_BY_CONSTELLATION). Each
+    access returns a new list, holding only the objects in that group.
+
+    :param items(LazyCollection): The collection the grouped objects are in.
+    :param keys(Callable[[], List[Any]]): Gets the key of every object in the collection, in order.
+    """
+
+    def __init__(self, items: LazyCollection, keys: Callable[[], List[Any]]) -> None:
+        self._items = items
+        self._keys = keys
+        self._positions: Dict[Any, List[int]] = None
+
+    @property
+    def Positions(self) -> Dict[Any, List[int]]:
+        if self._positions is None:
+            self._positions = {}
+            for position, key in enumerate(self._keys()):
+                if key in self._positions:
+                    self._positions[key].append(position)
+                else:
+                    self._positions[key] = [position]
+        return self._positions
+
+    def __getitem__(self, key) -> List[Any]:
+        return [self._items[position] for position in self.Positions[key]]
+
+    def __contains__(self, key) -> bool:
+        return key in self.Positions
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.Positions)
+
+    def __len__(self) -> int:
+        return len(self.Positions)
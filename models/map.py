@@ -3,11 +3,13 @@ from __future__ import annotations
 import re
 from dataclasses import dataclass, field, InitVar
 from functools import cached_property
-from typing import Any, Dict, List, Optional
+from typing import Any, ClassVar, Dict, Iterable, List, Optional, Union
 
+from logic.common import try_parse
 from logic.planetaryResources import *
 from logic.planetaryResources import RAW_RESOURCE_TO_TYPE
 from models.common import Position, Universe
+from models.third_party.anoikis import AnokisSystem
 from models.third_party.dotlan import *
 
 MISSING = "ThisValueIsMissing"
@@ -23,9 +25,138 @@ class MapClient:
     ALL_CONSTELLATIONS: List[Constellation] = field(init=False, default_factory=list)
     ALL_REGIONS: List[Region] = field(init=False, default_factory=list)
 
+    # Lookup indexes, keyed by the ALL_* collection suffix (ie: "SYSTEMS"). Kept in sync by Register() as objects are
+    # created, and rebuilt wholesale by Reindex() when the ALL_* lists are replaced (such as loading from pickles).
+    ID_INDEX: Dict[str, Dict[int, Any]] = field(init=False, default_factory=dict, repr=False)
+    NAME_INDEX: Dict[str, Dict[str, Any]] = field(init=False, default_factory=dict, repr=False)
+    # Id: position in the ALL_* list, so what is looked up by Id can be returned in ALL_* order (see InOrder)
+    POSITION_INDEX: Dict[str, Dict[int, int]] = field(init=False, default_factory=dict, repr=False)
+    SYSTEMS_BY_CONSTELLATION: Dict[int, List[System]] = field(init=False, default_factory=dict, repr=False)
+    CONSTELLATIONS_BY_REGION: Dict[int, List[Constellation]] = field(init=False, default_factory=dict, repr=False)
+    PLANETS_BY_SYSTEM: Dict[int, List[Planet]] = field(init=False, default_factory=dict, repr=False)
+    STARGATES_BY_SYSTEM: Dict[int, List[Stargate]] = field(init=False, default_factory=dict, repr=False)
+    # models.planet_type_counts.PlanetTypeCounts for the ALL_* lists. Set once they are all loaded (see BuildMapData)
+    PLANET_TYPE_COUNTS: Any = field(init=False, default=None, repr=False)
+    # models.production_tree.ProductionTree for ALL_COMMODITIES. Set once they are all loaded (see AllData)
+    PRODUCTION_TREE: Any = field(init=False, default=None, repr=False)
+    # System.Id: models.third_party.anoikis.AnokisSystem of every J-space system. Set when AllData.Anoikis is first used
+    ANOIKIS: Optional[Dict[int, Any]] = field(init=False, default=None, repr=False)
+
+    def Register(self, item: iStaticDataExport):
+        """Adds a newly created object to its ALL_* list and to every index that covers it"""
+        getattr(self, f"ALL_{item.COLLECTION}").append(item)
+        self._index(item)
+
+    def Reindex(self):
+        """Rebuilds every index from the current ALL_* lists"""
+        self.ID_INDEX = {}
+        self.NAME_INDEX = {}
+        self.POSITION_INDEX = {}
+        for collection in [
+            "COMMODITIES",
+            "PLANET_TYPES",
+            "PLANETS",
+            "STARGATES",
+            "SYSTEMS",
+            "CONSTELLATIONS",
+            "REGIONS",
+        ]:
+            items = getattr(self, f"ALL_{collection}")
+            # built back to front so the first item registered for an Id or Name wins, as it does with Register()
+            self.ID_INDEX[collection] = dict(reversed([(item.Id, item) for item in items]))
+            self.NAME_INDEX[collection] = dict(reversed([(item.Name, item) for item in items]))
+            self.POSITION_INDEX[collection] = dict(reversed([(item.Id, row) for row, item in enumerate(items)]))
+
+        self.SYSTEMS_BY_CONSTELLATION = _group_by(self.ALL_SYSTEMS, "Constellation_Id")
+        self.CONSTELLATIONS_BY_REGION = _group_by(self.ALL_CONSTELLATIONS, "Region_Id")
+        self.PLANETS_BY_SYSTEM = _group_by(self.ALL_PLANETS, "System_Id")
+        self.STARGATES_BY_SYSTEM = _group_by(self.ALL_STARGATES, "OriginSystem_Id")
+
+    def Get(self, collection: str, value: Union[str, int]) -> Any:
+        """
+        Finds an object in a collection by Id (or anything that parses to an Id) or by Name. Returns None if not found.
+
+        When more than one object shares a Name, the first one registered is returned.
+        """
+        item = self.ID_INDEX.get(collection, {}).get(try_parse(int, value), None)
+        if item is None:
+            item = self.NAME_INDEX.get(collection, {}).get(value, None)
+        return item
+
+    def Column(self, collection: str, attribute: str) -> List[Any]:
+        """
+        Every object's value for an attribute, in ALL_* order. When the collection is lazy (see models.map_snapshot) stored
+        attributes are read straight from the arrays, without creating the objects.
+        """
+        items = getattr(self, f"ALL_{collection}")
+        if hasattr(items, "Column"):
+            return items.Column(attribute)
+        return [getattr(item, attribute) for item in items]
+
+    def Set(self, collection: str, item_id: int, attribute: str, value: Any):
+        """
+        Sets an attribute of the object with an Id. When the collection is lazy (see models.map_snapshot) the object is
+        not created for it, the value is set when the object is first accessed.
+        """
+        items = getattr(self, f"ALL_{collection}")
+        if hasattr(items, "Set"):
+            items.Set(self._positions(collection)[item_id], attribute, value)
+        else:
+            setattr(self.ID_INDEX[collection][item_id], attribute, value)
+
+    def GetMany(self, collection: str, ids: Iterable[int]) -> List[Any]:
+        """
+        Finds every object in a collection for the given Ids, once each and in ALL_* order (as scanning ALL_* for them
+        would), skipping any that do not exist. The depth first search relies on linked systems coming back in this order.
+        """
+        index = self.ID_INDEX.get(collection, {})
+        return [index[item_id] for item_id in self.InOrder(collection, ids)]
+
+    def InOrder(self, collection: str, ids: Iterable[int]) -> List[int]:
+        """The given Ids that are in a collection, once each, in ALL_* order"""
+        positions = self._positions(collection)
+        return sorted({item_id for item_id in ids if item_id in positions}, key=positions.__getitem__)
+
+    def _positions(self, collection: str) -> Dict[int, int]:
+        index = self.ID_INDEX.get(collection, {})
+        # a lazy index (see models.lazy_views) already holds the positions
+        if hasattr(index, "Positions"):
+            return index.Positions
+        return self.POSITION_INDEX.get(collection, {})
+
+    def _index(self, item: iStaticDataExport):
+        position = len(getattr(self, f"ALL_{item.COLLECTION}")) - 1
+        self.POSITION_INDEX.setdefault(item.COLLECTION, {}).setdefault(item.Id, position)
+        self.ID_INDEX.setdefault(item.COLLECTION, {}).setdefault(item.Id, item)
+        self.NAME_INDEX.setdefault(item.COLLECTION, {}).setdefault(item.Name, item)
+
+        match item.COLLECTION:
+            case "SYSTEMS":
+                self.SYSTEMS_BY_CONSTELLATION.setdefault(item.Constellation_Id, []).append(item)
+            case "CONSTELLATIONS":
+                self.CONSTELLATIONS_BY_REGION.setdefault(item.Region_Id, []).append(item)
+            case "PLANETS":
+                self.PLANETS_BY_SYSTEM.setdefault(item.System_Id, []).append(item)
+            case "STARGATES":
+                self.STARGATES_BY_SYSTEM.setdefault(item.OriginSystem_Id, []).append(item)
+
+
+def _group_by(items: List[Any], attribute: str) -> Dict[Any, List[Any]]:
+    groups = {}
+    for item in items:
+        key = getattr(item, attribute)
+        if key in groups:
+            groups[key].append(item)
+        else:
+            groups[key] = [item]
+    return groups
+
 
 @dataclass
 class iStaticDataExport:
+    # Which of the MapClient.ALL_* collections this object belongs to. Set on each child class.
+    COLLECTION: ClassVar[str] = None
+
     properties: InitVar[Dict[str, Any]]
     client: MapClient = field(init=True)
     Name: str = field(kw_only=True, default=None)
@@ -50,6 +181,7 @@ class iStaticDataExport:
 
 @dataclass
 class Commodity(iStaticDataExport):
+    COLLECTION: ClassVar[str] = "COMMODITIES"
 
     Tier: int = field(kw_only=True, default=0)
     Ingredient_Ids: List[int] = field(kw_only=True, default_factory=list)
@@ -65,61 +197,38 @@ class Commodity(iStaticDataExport):
 
             self._determineTier()
 
-        self.client.ALL_COMMODITIES.append(self)
+        self.client.Register(self)
 
     @cached_property
     def Ingredient_Names(self) -> List[str]:
-        return [ingredient.Name for ingredient in self.client.ALL_COMMODITIES if ingredient.Id in self.Ingredient_Ids]
+        return [ingredient.Name for ingredient in self.client.GetMany("COMMODITIES", self.Ingredient_Ids)]
 
     def GetIngredients(self, cache: bool = False) -> List[Commodity]:
         if hasattr(self, "Ingredients"):
             return self.Ingredients
-        ingredients = [ingredient for ingredient in self.client.ALL_COMMODITIES if ingredient.Id in self.Ingredient_Ids]
+        ingredients = self.client.GetMany("COMMODITIES", self.Ingredient_Ids)
         if cache:
             self.Ingredients = ingredients
         return ingredients
 
     def GetRawResourceIds(self, cache: bool = False) -> List[int]:
+        """Every raw resource (P0) that goes into this commodity, once each. A raw resource returns just itself."""
+        if self.client.PRODUCTION_TREE is not None:
+            return list(self.client.PRODUCTION_TREE.RawResourceIdsFor(self.Id))
 
-        if hasattr(self, "RawResource_Ids") and len(self.RawResource_Ids) > 0:
-            return self.RawResource_Ids
-        else:
-            self.RawResource_Ids = []
-
-        temp = []
+        if self.Tier == 0:
+            return [self.Id]
 
+        raw_resource_ids = []
         for ingredient in self.GetIngredients(cache=cache):
-            if ingredient.Tier > 0:
-                temp.extend(ingredient.GetRawResourceIds(cache=cache))
-            else:
-                return [ingredient.Id]
-
-        if cache:
-            self.RawResource_Ids = temp
+            for raw_resource_id in ingredient.GetRawResourceIds(cache=cache):
+                if raw_resource_id not in raw_resource_ids:
+                    raw_resource_ids.append(raw_resource_id)
 
-        return temp
+        return raw_resource_ids
 
     def GetRawResources(self, cache: bool = False) -> List[Commodity]:
-        if hasattr(self, "RawResources") and len(self.RawResources) > 0:
-            return self.RawResources
-        else:
-            self.RawResources = []
-
-        if hasattr(self.RawResource_Ids) and len(self.RawResource_Ids) > 0:
-            return [commodity for commodity in self.client.ALL_COMMODITIES if commodity.Id in self.RawResource_Ids]
-
-        temp = []
-
-        for ingredient in self.GetIngredients(cache=cache):
-            if ingredient.Tier > 0:
-                temp.extend(ingredient.GetRawResources(cache=cache))
-            else:
-                return [ingredient]
-
-        if cache:
-            self.RawResources = temp
-
-        return temp
+        return self.client.GetMany("COMMODITIES", self.GetRawResourceIds(cache=cache))
 
     def _determineTier(self):
 
@@ -133,7 +242,7 @@ class Commodity(iStaticDataExport):
             self.Tier = 1
 
     def __repr__(self) -> str:
-        return f"Commodity( Name={self.Name}, Id={self.Id}, Tier={self.Tier}, Ingredients={self.IngredientNames} )"
+        return f"Commodity( Name={self.Name}, Id={self.Id}, Tier={self.Tier}, Ingredients={self.Ingredient_Names} )"
 
     def __getstate__(self):
         return (self.Name, self.Id, self.Tier, self.Ingredient_Ids)
@@ -144,12 +253,14 @@ class Commodity(iStaticDataExport):
 
 @dataclass
 class PlanetType(iStaticDataExport):
+    COLLECTION: ClassVar[str] = "PLANET_TYPES"
+
     def __post_init__(self, properties: Dict[str, Any]):
         if properties is not None:
             self.Name = properties["name"].replace("Planet", "").replace("(", "").replace(")", "").strip()
             self.Id = properties["type_id"]
 
-        self.client.ALL_PLANET_TYPES.append(self)
+        self.client.Register(self)
 
     @cached_property
     def RawResources_Ids(self) -> List[int]:
@@ -157,15 +268,17 @@ class PlanetType(iStaticDataExport):
 
     @cached_property
     def RawResources_Names(self) -> List[Commodity]:
-        return [ingredient.Name for ingredient in self.client.ALL_COMMODITIES if ingredient.Id in self.RawResources_Ids]
+        return [ingredient.Name for ingredient in self.client.GetMany("COMMODITIES", self.RawResources_Ids)]
 
     @cached_property
     def RawResources(self) -> List[Commodity]:
-        return [ingredient for ingredient in self.client.ALL_COMMODITIES if ingredient.Id in self.RawResources_Ids]
+        return self.client.GetMany("COMMODITIES", self.RawResources_Ids)
 
 
 @dataclass
 class Planet(iStaticDataExport):
+    COLLECTION: ClassVar[str] = "PLANETS"
+
     Type_Id: int = field(kw_only=True, default=0)
     System_Id: int = field(kw_only=True, default=0)
 
@@ -176,11 +289,12 @@ class Planet(iStaticDataExport):
             self.System_Id = properties["system_id"]
             self.Type_Id = properties["type_id"]
 
-        self.client.ALL_PLANETS.append(self)
+        self.client.Register(self)
 
     @cached_property
     def Type_Name(self) -> str:
-        return next((pt.Name for pt in self.client.ALL_PLANET_TYPES if pt.Id == self.Type_Id), None)
+        planet_type = self.client.Get("PLANET_TYPES", self.Type_Id)
+        return planet_type.Name if planet_type is not None else None
 
     @cached_property
     def RawResource_Ids(self) -> List[int]:
@@ -193,7 +307,7 @@ class Planet(iStaticDataExport):
     def GetType(self, cache: bool = False) -> PlanetType:
         if hasattr(self, "Type"):
             return self.Type
-        planet_type = next((pt for pt in self.client.ALL_PLANET_TYPES if pt.Id == self.Type_Id), None)
+        planet_type = self.client.Get("PLANET_TYPES", self.Type_Id)
         if cache:
             self.Type = planet_type
         return planet_type
@@ -201,7 +315,7 @@ class Planet(iStaticDataExport):
     def GetSystem(self, cache: bool = False) -> System:
         if hasattr(self, "System"):
             return self.System
-        system = next((sys for sys in self.client.ALL_SYSTEMS if sys.Id == self.System_Id), None)
+        system = self.client.Get("SYSTEMS", self.System_Id)
         if cache:
             self.System = system
         return system
@@ -215,6 +329,8 @@ class Planet(iStaticDataExport):
 
 @dataclass
 class Stargate(iStaticDataExport):
+    COLLECTION: ClassVar[str] = "STARGATES"
+
     DestinationSystem_Id: int = field(kw_only=True, default=0)
     DestinationName: str = field(kw_only=True, default="")
     OriginSystem_Id: int = field(kw_only=True, default=0)
@@ -229,28 +345,32 @@ class Stargate(iStaticDataExport):
             self.DestinationSystem_Id = properties["destination"]["system_id"]
             self.DestinationSystem_Name = self.Name.replace("Stargate (", "")[:-1]
 
-            self.client.ALL_STARGATES.append(self)
+            self.client.Register(self)
 
     @cached_property
     def DestinationSystem_Name(self) -> str:
-        return next((sys.Name for sys in self.client.ALL_SYSTEMS if sys.Id == self.DestinationSystem_Id), None)
+        destination = self.client.Get("SYSTEMS", self.DestinationSystem_Id)
+        return destination.Name if destination is not None else None
 
     @cached_property
     def DestinationSystem_Position(self) -> Position:
-        return next((sys.Position for sys in self.client.ALL_SYSTEMS if sys.Id == self.DestinationSystem_Id), None)
+        destination = self.client.Get("SYSTEMS", self.DestinationSystem_Id)
+        return destination.Position if destination is not None else None
 
     @cached_property
     def OriginSystem_Name(self) -> str:
-        return next((sys.Name for sys in self.client.ALL_SYSTEMS if sys.Id == self.OriginSystem_Id), None)
+        origin = self.client.Get("SYSTEMS", self.OriginSystem_Id)
+        return origin.Name if origin is not None else None
 
     @cached_property
     def OriginSystem_Position(self) -> Position:
-        return next((sys.Position for sys in self.client.ALL_SYSTEMS if sys.Id == self.OriginSystem_Id), None)
+        origin = self.client.Get("SYSTEMS", self.OriginSystem_Id)
+        return origin.Position if origin is not None else None
 
     def GetDestinationSystem(self, cache: bool = False) -> System:
         if hasattr(self, "Destination"):
             return self.Destination
-        destination = next((sys for sys in self.client.ALL_SYSTEMS if sys.Id == self.DestinationSystem_Id), None)
+        destination = self.client.Get("SYSTEMS", self.DestinationSystem_Id)
         if cache:
             self.Destination = destination
         return destination
@@ -258,7 +378,7 @@ class Stargate(iStaticDataExport):
     def GetOriginSystem(self, cache: bool = False) -> System:
         if hasattr(self, "Origin"):
             return self.Origin
-        origin = next((sys for sys in self.client.ALL_SYSTEMS if sys.Id == self.OriginSystem_Id), None)
+        origin = self.client.Get("SYSTEMS", self.OriginSystem_Id)
         if cache:
             self.Origin = origin
         return origin
@@ -288,6 +408,8 @@ class Stargate(iStaticDataExport):
 
 @dataclass
 class System(iStaticDataExport):
+    COLLECTION: ClassVar[str] = "SYSTEMS"
+
     Position: Position = field(kw_only=True, default=None)
     Security_Status: float = field(kw_only=True, default=1.0)
     Planet_Ids: List[int] = field(kw_only=True, default_factory=list)
@@ -336,11 +458,11 @@ class System(iStaticDataExport):
                 self.Position.Universe = Universe.TRIG
 
         # if re.match(r"AD\d{3}$", self.Name) is None and re.match(r"V-(\d{3})$", self.Name) is None:
-        self.client.ALL_SYSTEMS.append(self)
+        self.client.Register(self)
 
     @cached_property
     def Stargate_Names(self) -> List[str]:
-        return [sg.Name for sg in self.client.ALL_STARGATES if sg.Id in self.Stargate_Ids]
+        return [sg.Name for sg in self.client.GetMany("STARGATES", self.Stargate_Ids)]
 
     @cached_property
     def LinkedSystem_Names(self) -> List[str]:
@@ -348,48 +470,60 @@ class System(iStaticDataExport):
 
     @cached_property
     def LinkedSystem_Ids(self) -> List[int]:
-        return [sys.Id for sys in self.client.ALL_SYSTEMS if sys.Name in self.LinkedSystem_Names]
+        systems_by_name = self.client.NAME_INDEX.get("SYSTEMS", {})
+        return self.client.InOrder(
+            "SYSTEMS", [systems_by_name[name].Id for name in self.LinkedSystem_Names if name in systems_by_name]
+        )
 
     @cached_property
     def Planet_Names(self) -> List[str]:
-        return [planet.Name for planet in self.client.ALL_PLANETS if planet.Id in self.Planet_Ids]
+        return [planet.Name for planet in self.client.GetMany("PLANETS", self.Planet_Ids)]
 
     @cached_property
     def PlanetTypes_Ids(self) -> List[int]:
-        return [planet.Type_Id for planet in self.client.ALL_PLANETS if planet.Id in self.Planet_Ids]
+        if self.client.PLANET_TYPE_COUNTS is not None:
+            return self.client.PLANET_TYPE_COUNTS.PlanetTypeIdsOf(self.Planet_Ids)
+        return [planet.Type_Id for planet in self.client.GetMany("PLANETS", self.Planet_Ids)]
+
+    @cached_property
+    def PlanetTypeCounts(self) -> Dict[int, int]:
+        """PlanetType.Id: number of planets, for each type the system has at least one planet of"""
+        if self.client.PLANET_TYPE_COUNTS is not None:
+            return self.client.PLANET_TYPE_COUNTS.CountsFor(self.Id)
+        planet_type_counts = {}
+        for planet_type_id in self.PlanetTypes_Ids:
+            planet_type_counts[planet_type_id] = planet_type_counts.get(planet_type_id, 0) + 1
+        return planet_type_counts
+
+    @property
+    def Anoikis(self) -> Optional[AnokisSystem]:
+        """This system's anoik.is wormhole details, once they are joined onto the map by AllData.Anoikis"""
+        if self.client.ANOIKIS is None:
+            return None
+        return self.client.ANOIKIS.get(self.Id, None)
 
     @cached_property
     def Constellation_Name(self) -> str:
-        return next(
-            (
-                constellation.Name
-                for constellation in self.client.ALL_CONSTELLATIONS
-                if self.Id in constellation.System_Ids
-            ),
-            None,
-        )
+        constellation = self.GetConstellation()
+        return constellation.Name if constellation is not None else None
 
     @cached_property
     def Region_Name(self) -> str:
-        return next(
-            (
-                constellation.Region_Name
-                for constellation in self.client.ALL_CONSTELLATIONS
-                if self.Constellation_Id == constellation.Id
-            ),
-            None,
-        )
+        constellation = self.GetConstellation()
+        return constellation.Region_Name if constellation is not None else None
 
     def GetStargates(self, cache: bool = False) -> List[Stargate]:
         if hasattr(self, "Stargates"):
             return self.Stargates
-        stargates = [sg for sg in self.client.ALL_STARGATES if sg.Id in self.Stargate_Ids]
+        stargates = self.client.GetMany("STARGATES", self.Stargate_Ids)
         if cache:
             self.Stargates = stargates
         return stargates
 
     def GetLinkedSystems(self, cache: bool = False) -> List[System]:
-        systems = [sys for sys in self.client.ALL_SYSTEMS if sys.Id in self.LinkedSystem_Ids]
+        if hasattr(self, "Systems"):
+            return self.Systems
+        systems = self.client.GetMany("SYSTEMS", self.LinkedSystem_Ids)
         if cache:
             self.Systems = systems
 
@@ -398,7 +532,7 @@ class System(iStaticDataExport):
     def GetPlanets(self, cache: bool = False) -> List[Planet]:
         if hasattr(self, "Planets"):
             return self.Planets
-        planets = [planet for planet in self.client.ALL_PLANETS if planet.Id in self.Planet_Ids]
+        planets = self.client.GetMany("PLANETS", self.Planet_Ids)
         if cache:
             self.Planets = planets
         return planets
@@ -407,10 +541,7 @@ class System(iStaticDataExport):
         if hasattr(self, "Constellation"):
             return self.Constellation
 
-        constellation = next(
-            (constellation for constellation in self.client.ALL_CONSTELLATIONS if self.Id in constellation.System_Ids),
-            None,
-        )
+        constellation = self.client.Get("CONSTELLATIONS", self.Constellation_Id)
         if cache:
             self.Constellation = constellation
         return constellation
@@ -419,10 +550,8 @@ class System(iStaticDataExport):
         if hasattr(self, "Region"):
             return self.Region
 
-        if hasattr(self, "Region_Name"):
-            region = next((region for region in self.client.ALL_REGIONS if region.Name == self.Region_Name), None)
-        else:
-            region = next((region for region in self.client.ALL_REGIONS if self.Constellation_Id))
+        constellation = self.GetConstellation()
+        region = self.client.Get("REGIONS", constellation.Region_Id) if constellation is not None else None
 
         if cache:
             self.Region = region
@@ -456,6 +585,8 @@ class System(iStaticDataExport):
 
 @dataclass
 class Constellation(iStaticDataExport):
+    COLLECTION: ClassVar[str] = "CONSTELLATIONS"
+
     System_Ids: List[int] = field(kw_only=True, default_factory=list)
     Region_Id: int = field(kw_only=True, default=0)
     Position: Position = field(kw_only=True, default=None)
@@ -478,24 +609,25 @@ class Constellation(iStaticDataExport):
                 self.Position.Universe = Universe.JOVIAN
 
         # if re.match(r"ADC\d{2}", self.Name) is None and re.match(r"VC-\d{3}", self.Name) is None:
-        self.client.ALL_CONSTELLATIONS.append(self)
+        self.client.Register(self)
 
     @cached_property
     def Region_Name(self) -> str:
-        return next((region.Name for region in self.client.ALL_REGIONS if self.Id in region.Constellation_Ids), None)
+        region = self.GetRegion()
+        return region.Name if region is not None else None
 
     @cached_property
     def System_Ids(self) -> List[int]:
-        return [sys.Id for sys in self.client.ALL_SYSTEMS if self.Id == sys.Constellation_Id]
+        return [sys.Id for sys in self.client.SYSTEMS_BY_CONSTELLATION.get(self.Id, [])]
 
     @cached_property
     def System_Names(self) -> List[str]:
-        return [sys.Name for sys in self.client.ALL_SYSTEMS if self.Id == sys.Constellation_Id]
+        return [sys.Name for sys in self.client.SYSTEMS_BY_CONSTELLATION.get(self.Id, [])]
 
     def GetRegion(self, cache: bool = False) -> Region:
         if hasattr(self, "Region"):
             return self.Region
-        region = next((region for region in self.client.ALL_REGIONS if self.Id in region.Constellation_Ids), None)
+        region = self.client.Get("REGIONS", self.Region_Id)
         if cache:
             self.Region = region
         return region
@@ -503,7 +635,7 @@ class Constellation(iStaticDataExport):
     def GetSystems(self, cache: bool = False) -> List[System]:
         if hasattr(self, "Systems"):
             return self.Systems
-        systems = [sys for sys in self.client.ALL_SYSTEMS if self.Id == sys.Constellation_Id]
+        systems = list(self.client.SYSTEMS_BY_CONSTELLATION.get(self.Id, []))
         if cache:
             self.Systems = systems
 
@@ -518,6 +650,8 @@ class Constellation(iStaticDataExport):
 
 @dataclass
 class Region(iStaticDataExport):
+    COLLECTION: ClassVar[str] = "REGIONS"
+
     Constellation_Ids: list[int] = field(kw_only=True, default_factory=list)
 
     def __post_init__(self, properties: Dict[str, Any]):
@@ -527,25 +661,16 @@ class Region(iStaticDataExport):
             self.Constellation_Ids = properties.get("constellations", [])
 
         # if re.match(r"ADR\d{2}", self.Name) is None and re.match(r"VR-\d{2}", self.Name) is None:
-        self.client.ALL_REGIONS.append(self)
+        self.client.Register(self)
 
     @cached_property
     def Constellation_Name(self) -> str:
-        return next(
-            (
-                constellation.Name
-                for constellation in self.client.ALL_CONSTELLATIONS
-                if self.Id == constellation.Region_id
-            ),
-            None,
-        )
+        return next((constellation.Name for constellation in self.GetConstellations()), None)
 
     def GetConstellations(self, cache: bool = False) -> List[Constellation]:
         if hasattr(self, "Constellations"):
             return self.Constellations
-        constellations = [
-            constellation for constellation in self.client.ALL_CONSTELLATIONS if self.Id == constellation.Region_id
-        ]
+        constellations = list(self.client.CONSTELLATIONS_BY_REGION.get(self.Id, []))
         if cache:
             self.Constellations = constellations
         return constellations
@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy
+
+import models.map as mapData
+from logic.array_store import load_arrays, save_arrays
+from models.common import Position, Universe
+from models.lazy_views import LazyCollection, LazyGroups, LazyIndex
+
+DEFAULT_SNAPSHOT_FILE_PATH = "data/map_snapshot.npz"
+
+NAME_SEPARATOR = "\n"
+
+# ALL_* collection: (class, column prefix, {attribute: column}). "names" and "position" are the packed names and the
+# x/y/z/universe columns, a column with .values/.offsets arrays is a list per object, anything else is a plain array.
+SNAPSHOT_COLLECTIONS = {
+    "COMMODITIES": (
+        mapData.Commodity,
+        "commodities",
+        {"Name": "names", "Id": "ids", "Tier": "tier", "Ingredient_Ids": "ingredient_ids"},
+    ),
+    "PLANET_TYPES": (mapData.PlanetType, "planet_types", {"Name": "names", "Id": "ids"}),
+    "PLANETS": (
+        mapData.Planet,
+        "planets",
+        {"Name": "names", "Id": "ids", "System_Id": "system_id", "Type_Id": "type_id"},
+    ),
+    "STARGATES": (
+        mapData.Stargate,
+        "stargates",
+        {
+            "Name": "names",
+            "Id": "ids",
+            "OriginSystem_Id": "origin_system_id",
+            "DestinationSystem_Id": "destination_system_id",
+        },
+    ),
+    "SYSTEMS": (
+        mapData.System,
+        "systems",
+        {
+            "Name": "names",
+            "Id": "ids",
+            "Position": "position",
+            "Security_Status": "security_status",
+            "Constellation_Id": "constellation_id",
+            "Region_Id": "region_id",
+            "Planet_Ids": "planet_ids",
+            "Stargate_Ids": "stargate_ids",
+        },
+    ),
+    "CONSTELLATIONS": (
+        mapData.Constellation,
+        "constellations",
+        {"Name": "names", "Id": "ids", "Position": "position", "Region_Id": "region_id"},
+    ),
+    "REGIONS": (
+        mapData.Region,
+        "regions",
+        {"Name": "names", "Id": "ids", "Constellation_Ids": "constellation_ids"},
+    ),
+}
+
+
+@dataclass
+class MapSnapshot:
+    """
+    Every object in a MapClient stored as typed column arrays, one set of columns per ALL_* collection, in a single .npz.
+
+    Columns are named "<collection>.<attribute>" (ie: "systems.security_status"). Names are stored as one utf-8 blob per
+    collection, and lists of ids (System.Planet_Ids and the like) as a flat array of ids plus the offset each object's ids
+    start at, so nothing in the file is a pickled python object. Loading only maps the file; objects are created by
+    Populate().
+
+    Only what the static data export provides is stored. Anything from dotlan is attached after loading, as it is with
+    the pickles.
+
+    Positions are stored as float64. The export gives them as whole metres up to ~1e19, past what int64 can hold, so they
+    come back as floats accurate to about 1 part in 1e16.
+
+    :param Columns(Dict[str, numpy.ndarray]): The column arrays, by name.
+    """
+
+    Columns: Dict[str, numpy.ndarray]
+    # prefix: every name in that collection, decoded the first time any are needed
+    _names: Dict[str, List[str]] = field(init=False, default_factory=dict, repr=False)
+
+    @classmethod
+    def FromMapClient(cls, client: mapData.MapClient) -> MapSnapshot:
+        columns = {}
+
+        commodities = client.ALL_COMMODITIES
+        columns.update(_identity_columns("commodities", commodities))
+        columns["commodities.tier"] = numpy.fromiter((item.Tier for item in commodities), dtype=numpy.int8)
+        columns.update(_list_columns("commodities.ingredient_ids", [item.Ingredient_Ids for item in commodities]))
+
+        columns.update(_identity_columns("planet_types", client.ALL_PLANET_TYPES))
+
+        planets = client.ALL_PLANETS
+        columns.update(_identity_columns("planets", planets))
+        columns["planets.system_id"] = numpy.fromiter((item.System_Id for item in planets), dtype=numpy.int64)
+        columns["planets.type_id"] = numpy.fromiter((item.Type_Id for item in planets), dtype=numpy.int64)
+
+        stargates = client.ALL_STARGATES
+        columns.update(_identity_columns("stargates", stargates))
+        columns["stargates.origin_system_id"] = numpy.fromiter(
+            (item.OriginSystem_Id for item in stargates), dtype=numpy.int64
+        )
+        columns["stargates.destination_system_id"] = numpy.fromiter(
+            (item.DestinationSystem_Id for item in stargates), dtype=numpy.int64
+        )
+
+        systems = client.ALL_SYSTEMS
+        columns.update(_identity_columns("systems", systems))
+        columns.update(_position_columns("systems", systems))
+        columns["systems.security_status"] = numpy.fromiter((item.Security_Status for item in systems), dtype=float)
+        columns["systems.constellation_id"] = numpy.fromiter(
+            (item.Constellation_Id for item in systems), dtype=numpy.int64
+        )
+        columns["systems.region_id"] = numpy.fromiter((item.Region_Id for item in systems), dtype=numpy.int64)
+        columns.update(_list_columns("systems.planet_ids", [item.Planet_Ids for item in systems]))
+        columns.update(_list_columns("systems.stargate_ids", [item.Stargate_Ids for item in systems]))
+
+        constellations = client.ALL_CONSTELLATIONS
+        columns.update(_identity_columns("constellations", constellations))
+        columns.update(_position_columns("constellations", constellations))
+        columns["constellations.region_id"] = numpy.fromiter(
+            (item.Region_Id for item in constellations), dtype=numpy.int64
+        )
+
+        regions = client.ALL_REGIONS
+        columns.update(_identity_columns("regions", regions))
+        columns.update(_list_columns("regions.constellation_ids", [item.Constellation_Ids for item in regions]))
+
+        return cls(Columns=columns)
+
+    @classmethod
+    def Load(cls, file_path: str = DEFAULT_SNAPSHOT_FILE_PATH, mmap: bool = True) -> MapSnapshot:
+        return cls(Columns=load_arrays(file_path, mmap=mmap))
+
+    def Save(self, file_path: str = DEFAULT_SNAPSHOT_FILE_PATH):
+        save_arrays(file_path, **self.Columns)
+
+    def Values(self, prefix: str, column: str) -> List[Any]:
+        """Every object's value for a column (ie: Values("systems", "security_status")), as python values"""
+        match column:
+            case "names":
+                return list(self._unpackedNames(prefix))
+            case "position":
+                return [
+                    Position(X=x, Y=y, Z=z, Universe=Universe(universe))
+                    for x, y, z, universe in zip(
+                        self.Columns[f"{prefix}.x"].tolist(),
+                        self.Columns[f"{prefix}.y"].tolist(),
+                        self.Columns[f"{prefix}.z"].tolist(),
+                        self.Columns[f"{prefix}.universe"].tolist(),
+                    )
+                ]
+
+        if f"{prefix}.{column}.values" in self.Columns:
+            # a flattened list column, split back out into one list per object
+            values = self.Columns[f"{prefix}.{column}.values"].tolist()
+            offsets = self.Columns[f"{prefix}.{column}.offsets"].tolist()
+            return [values[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+        return self.Columns[f"{prefix}.{column}"].tolist()
+
+    def Reader(self, prefix: str, column: str) -> Callable[[int], Any]:
+        """Gets a single object's value for a column by its row, without reading the rest of the column"""
+        match column:
+            case "names":
+                return self._unpackedNames(prefix).__getitem__
+            case "position":
+                x, y, z, universe = (
+                    numpy.asarray(self.Columns[f"{prefix}.{axis}"]) for axis in ["x", "y", "z", "universe"]
+                )
+                return lambda row: Position(
+                    X=x[row].item(), Y=y[row].item(), Z=z[row].item(), Universe=Universe(universe[row].item())
+                )
+
+        if f"{prefix}.{column}.values" in self.Columns:
+            values = numpy.asarray(self.Columns[f"{prefix}.{column}.values"])
+            offsets = numpy.asarray(self.Columns[f"{prefix}.{column}.offsets"])
+            return lambda row: values[offsets[row] : offsets[row + 1]].tolist()
+
+        # a plain ndarray view of the mapped column, as indexing a numpy.memmap is much slower
+        values = numpy.asarray(self.Columns[f"{prefix}.{column}"])
+        return lambda row: values[row].item()
+
+    def Populate(self, client: mapData.MapClient, lazy: bool = False):
+        """
+        Puts every object in the snapshot into the client's ALL_* collections, replacing what was there, and indexes it.
+
+        Objects are created the same way unpickling does - without running __post_init__ - so they hold the same values
+        as ones loaded from the pickles.
+
+        :param client(MapClient): The client to fill.
+        :param lazy(bool, default: False): If true, the ALL_* collections and indexes are views over the arrays
+            (see models.lazy_views), and each object is only created when it is first accessed. Nothing new can be
+            Register()ed into a lazy client.
+        """
+        for collection, (cls, prefix, attributes) in SNAPSHOT_COLLECTIONS.items():
+            if lazy:
+                items = LazyCollection(
+                    len(self.Columns[f"{prefix}.ids"]),
+                    partial(
+                        _create_item,
+                        cls,
+                        client,
+                        [(attribute, self.Reader(prefix, column)) for attribute, column in attributes.items()],
+                    ),
+                    columns={
+                        attribute: partial(self.Values, prefix, column) for attribute, column in attributes.items()
+                    },
+                )
+            else:
+                items = _materialize(
+                    cls, client, **{attribute: self.Values(prefix, column) for attribute, column in attributes.items()}
+                )
+            setattr(client, f"ALL_{collection}", items)
+
+        if not lazy:
+            client.Reindex()
+            return
+
+        client.ID_INDEX = {}
+        client.NAME_INDEX = {}
+        for collection, (_, prefix, _) in SNAPSHOT_COLLECTIONS.items():
+            items = getattr(client, f"ALL_{collection}")
+            client.ID_INDEX[collection] = LazyIndex(items, partial(self._firstPositions, prefix, "ids"))
+            client.NAME_INDEX[collection] = LazyIndex(items, partial(self._firstPositions, prefix, "names"))
+
+        client.SYSTEMS_BY_CONSTELLATION = LazyGroups(
+            client.ALL_SYSTEMS, partial(self.Values, "systems", "constellation_id")
+        )
+        client.CONSTELLATIONS_BY_REGION = LazyGroups(
+            client.ALL_CONSTELLATIONS, partial(self.Values, "constellations", "region_id")
+        )
+        client.PLANETS_BY_SYSTEM = LazyGroups(client.ALL_PLANETS, partial(self.Values, "planets", "system_id"))
+        client.STARGATES_BY_SYSTEM = LazyGroups(
+            client.ALL_STARGATES, partial(self.Values, "stargates", "origin_system_id")
+        )
+
+    def _firstPositions(self, prefix: str, column: str) -> Dict[Any, int]:
+        # built back to front so the first object for a value wins, as it does with MapClient.Register()
+        return dict(reversed([(value, row) for row, value in enumerate(self.Values(prefix, column))]))
+
+    def _unpackedNames(self, prefix: str) -> List[str]:
+        if prefix not in self._names:
+            self._names[prefix] = _unpack_names(self.Columns[f"{prefix}.names"])
+        return self._names[prefix]
+
+
+def _create_item(
+    cls: type, client: mapData.MapClient, readers: List[Tuple[str, Callable[[int], Any]]], row: int
+) -> Any:
+    item = cls.__new__(cls)
+    item.__dict__.update({attribute: read(row) for attribute, read in readers})
+    item.client = client
+    return item
+
+
+def _materialize(cls: type, client: mapData.MapClient, **columns: List[Any]) -> List[Any]:
+    names = list(columns.keys())
+    items = []
+    for values in zip(*columns.values()):
+        item = cls.__new__(cls)
+        item.__dict__.update(zip(names, values))
+        item.client = client
+        items.append(item)
+    return items
+
+
+def _identity_columns(collection: str, items: List[mapData.iStaticDataExport]) -> Dict[str, numpy.ndarray]:
+    return {
+        f"{collection}.ids": numpy.fromiter((item.Id for item in items), dtype=numpy.int64, count=len(items)),
+        f"{collection}.names": _pack_names([item.Name for item in items]),
+    }
+
+
+def _position_columns(collection: str, items: List[Any]) -> Dict[str, numpy.ndarray]:
+    return {
+        f"{collection}.x": numpy.fromiter((item.Position.X for item in items), dtype=float, count=len(items)),
+        f"{collection}.y": numpy.fromiter((item.Position.Y for item in items), dtype=float, count=len(items)),
+        f"{collection}.z": numpy.fromiter((item.Position.Z for item in items), dtype=float, count=len(items)),
+        f"{collection}.universe": numpy.fromiter(
+            (item.Position.Universe.value for item in items), dtype=numpy.int8, count=len(items)
+        ),
+    }
+
+
+def _list_columns(column: str, lists: List[List[int]]) -> Dict[str, numpy.ndarray]:
+    offsets = numpy.zeros(len(lists) + 1, dtype=numpy.int64)
+    numpy.cumsum(
+        numpy.fromiter((len(values) for values in lists), dtype=numpy.int64, count=len(lists)), out=offsets[1:]
+    )
+    return {
+        f"{column}.values": numpy.fromiter(
+            (value for values in lists for value in values), dtype=numpy.int64, count=int(offsets[-1])
+        ),
+        f"{column}.offsets": offsets,
+    }
+
+
+def _pack_names(names: List[str]) -> numpy.ndarray:
+    return numpy.frombuffer(NAME_SEPARATOR.join(names).encode("utf-8"), dtype=numpy.uint8)
+
+
+def _unpack_names(packed: numpy.ndarray) -> List[str]:
+    return packed.tobytes().decode("utf-8").split(NAME_SEPARATOR)
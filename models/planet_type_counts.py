@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, Iterable, List
+
+import numpy
+
+from logic.array_store import load_arrays, save_arrays
+from models.map import MapClient
+
+DEFAULT_PLANET_TYPE_COUNTS_FILE_PATH = "data/planet_type_counts.npz"
+
+
+@dataclass
+class PlanetTypeCounts:
+    """
+    How many planets of each type every system has, as a systems x planet types integer matrix, along with the type of
+    every planet.
+
+    Rows are in MapClient.ALL_SYSTEMS order (the same dense system index as StargateGraph) and columns in
+    MapClient.ALL_PLANET_TYPES order. Every planet type is a column, so a row sums to the total planets in the system.
+
+    :param System_Ids(numpy.ndarray[int64]): The System.Id for each row.
+    :param PlanetType_Ids(numpy.ndarray[int64]): The PlanetType.Id for each column.
+    :param Counts(numpy.ndarray[int32]): systems x planet types - the number of planets of each type in each system.
+    :param Planet_Ids(numpy.ndarray[int64]): The Planet.Id of every planet.
+    :param Planet_Columns(numpy.ndarray[int8]): The column (in PlanetType_Ids) of the type of each planet in Planet_Ids.
+    """
+
+    System_Ids: numpy.ndarray
+    PlanetType_Ids: numpy.ndarray
+    Counts: numpy.ndarray
+    Planet_Ids: numpy.ndarray
+    Planet_Columns: numpy.ndarray
+
+    @classmethod
+    def FromMapClient(cls, client: MapClient) -> PlanetTypeCounts:
+        """Counts every planet in the client whose system and planet type both exist"""
+        system_ids = numpy.asarray(client.Column("SYSTEMS", "Id"), dtype=numpy.int64)
+        planet_type_ids = numpy.asarray(client.Column("PLANET_TYPES", "Id"), dtype=numpy.int64)
+        row_by_id = {system_id: index for index, system_id in enumerate(system_ids.tolist())}
+        column_by_id = {type_id: index for index, type_id in enumerate(planet_type_ids.tolist())}
+
+        planet_ids = []
+        rows = []
+        columns = []
+        for planet_id, system_id, type_id in zip(
+            client.Column("PLANETS", "Id"), client.Column("PLANETS", "System_Id"), client.Column("PLANETS", "Type_Id")
+        ):
+            row = row_by_id.get(system_id, None)
+            column = column_by_id.get(type_id, None)
+            if row is None or column is None:
+                continue
+            planet_ids.append(planet_id)
+            rows.append(row)
+            columns.append(column)
+
+        counts = numpy.zeros((len(system_ids), len(planet_type_ids)), dtype=numpy.int32)
+        numpy.add.at(counts, (numpy.asarray(rows, dtype=numpy.int64), numpy.asarray(columns, dtype=numpy.int64)), 1)
+
+        type_counts = cls(
+            System_Ids=system_ids,
+            PlanetType_Ids=planet_type_ids,
+            Counts=counts,
+            Planet_Ids=numpy.asarray(planet_ids, dtype=numpy.int64),
+            Planet_Columns=numpy.asarray(columns, dtype=numpy.int8),
+        )
+        type_counts.__dict__["RowById"] = row_by_id
+        type_counts.__dict__["ColumnById"] = column_by_id
+
+        return type_counts
+
+    @classmethod
+    def Load(cls, file_path: str = DEFAULT_PLANET_TYPE_COUNTS_FILE_PATH, mmap: bool = True) -> PlanetTypeCounts:
+        arrays = load_arrays(file_path, mmap=mmap)
+        return cls(
+            System_Ids=arrays["system_ids"],
+            PlanetType_Ids=arrays["planet_type_ids"],
+            Counts=arrays["counts"],
+            Planet_Ids=arrays["planet_ids"],
+            Planet_Columns=arrays["planet_columns"],
+        )
+
+    def Save(self, file_path: str = DEFAULT_PLANET_TYPE_COUNTS_FILE_PATH):
+        save_arrays(
+            file_path,
+            system_ids=self.System_Ids,
+            planet_type_ids=self.PlanetType_Ids,
+            counts=self.Counts,
+            planet_ids=self.Planet_Ids,
+            planet_columns=self.Planet_Columns,
+        )
+
+    def Matches(self, client: MapClient) -> bool:
+        """If this was built from the same systems, planet types and planets as are in the client"""
+        return (
+            len(self.System_Ids) == len(client.ALL_SYSTEMS)
+            and len(self.PlanetType_Ids) == len(client.ALL_PLANET_TYPES)
+            and len(self.Planet_Ids) == len(client.ALL_PLANETS)
+            and numpy.array_equal(self.System_Ids, numpy.asarray(client.Column("SYSTEMS", "Id"), dtype=numpy.int64))
+        )
+
+    @cached_property
+    def RowById(self) -> Dict[int, int]:
+        return {system_id: index for index, system_id in enumerate(self.System_Ids.tolist())}
+
+    @cached_property
+    def ColumnById(self) -> Dict[int, int]:
+        return {type_id: index for index, type_id in enumerate(self.PlanetType_Ids.tolist())}
+
+    @cached_property
+    def PlanetTypeIdById(self) -> Dict[int, int]:
+        """Planet.Id: PlanetType.Id for every planet"""
+        return dict(zip(self.Planet_Ids.tolist(), self.PlanetType_Ids[self.Planet_Columns].tolist()))
+
+    @cached_property
+    def TotalPlanets(self) -> numpy.ndarray:
+        """The number of planets in each system"""
+        return self.Counts.sum(axis=1)
+
+    @cached_property
+    def TotalByType(self) -> numpy.ndarray:
+        """The number of planets of each type across every system"""
+        return self.Counts.sum(axis=0)
+
+    def CountsFor(self, system_id: int) -> Dict[int, int]:
+        """PlanetType.Id: number of planets, for each type the system has at least one planet of"""
+        row = self.Counts[self.RowById[system_id]]
+        columns = numpy.flatnonzero(row)
+        return dict(zip(self.PlanetType_Ids[columns].tolist(), row[columns].tolist()))
+
+    def PlanetTypeIdsOf(self, planet_ids: Iterable[int]) -> List[int]:
+        """The PlanetType.Id of each planet, in the order given, skipping any that do not exist"""
+        type_ids = self.PlanetTypeIdById
+        return [type_ids[planet_id] for planet_id in planet_ids if planet_id in type_ids]
+
+    def PlanetIdsByType(self) -> Dict[int, numpy.ndarray]:
+        """PlanetType.Id: the Planet.Ids of every planet of that type"""
+        return {
+            type_id: self.Planet_Ids[self.Planet_Columns == column]
+            for column, type_id in enumerate(self.PlanetType_Ids.tolist())
+        }
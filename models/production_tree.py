@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Tuple, Union
+
+from logic.planetaryResources import RAW_RESOURCE_TO_TYPE
+from models.map import MapClient
+
+
+@dataclass
+class ProductionTree:
+    """
+    Every planetary industry schematic, walked once in dependency order so each commodity knows everything that goes
+    into it. For each commodity the raw resources (P0), the intermediate commodities (P1 - P3) and the planet types the
+    raw resources can be found on are held as bitsets (python ints), where bit i is set for the i-th id in
+    RawResource_Ids, Intermediate_Ids or PlanetType_Ids. A raw resource's only raw resource is itself.
+
+    :param Commodity_Ids(List[int]): Every Commodity.Id, with each commodity after all of its ingredients.
+    :param RawResource_Ids(List[int]): The Commodity.Id of each raw resource bit.
+    :param Intermediate_Ids(List[int]): The Commodity.Id of each intermediate bit.
+    :param PlanetType_Ids(List[int]): The PlanetType.Id of each planet type bit.
+    :param RawResourceBits(Dict[int, int]): Commodity.Id: bitset of the raw resources it is made from.
+    :param IntermediateBits(Dict[int, int]): Commodity.Id: bitset of the intermediates it is made from.
+    :param PlanetTypeBits(Dict[int, int]): Commodity.Id: bitset of the planet types its raw resources are found on.
+    :param Id_By_Name(Dict[str, int]): Commodity.Name: Commodity.Id
+    """
+
+    Commodity_Ids: List[int]
+    RawResource_Ids: List[int]
+    Intermediate_Ids: List[int]
+    PlanetType_Ids: List[int]
+    RawResourceBits: Dict[int, int]
+    IntermediateBits: Dict[int, int]
+    PlanetTypeBits: Dict[int, int]
+    Id_By_Name: Dict[str, int]
+
+    @classmethod
+    def FromMapClient(cls, client: MapClient) -> ProductionTree:
+        commodity_ids = client.Column("COMMODITIES", "Id")
+        tiers = dict(zip(commodity_ids, client.Column("COMMODITIES", "Tier")))
+        ingredient_ids = {
+            commodity_id: [ingredient_id for ingredient_id in ingredients if ingredient_id in tiers]
+            for commodity_id, ingredients in zip(commodity_ids, client.Column("COMMODITIES", "Ingredient_Ids"))
+        }
+        planet_type_ids = client.Column("PLANET_TYPES", "Id")
+
+        ordered_ids = _dependency_order(ingredient_ids)
+        raw_resource_ids = [commodity_id for commodity_id in ordered_ids if tiers[commodity_id] == 0]
+        intermediate_ids = [commodity_id for commodity_id in ordered_ids if 0 < tiers[commodity_id] < 4]
+        raw_resource_bit = {commodity_id: 1 << bit for bit, commodity_id in enumerate(raw_resource_ids)}
+        intermediate_bit = {commodity_id: 1 << bit for bit, commodity_id in enumerate(intermediate_ids)}
+        planet_type_bit = {type_id: 1 << bit for bit, type_id in enumerate(planet_type_ids)}
+
+        raw_resource_bits = {}
+        intermediate_bits = {}
+        planet_type_bits = {}
+        for commodity_id in ordered_ids:
+            if tiers[commodity_id] == 0:
+                raw_resource_bits[commodity_id] = raw_resource_bit[commodity_id]
+                intermediate_bits[commodity_id] = 0
+                planet_type_bits[commodity_id] = _combine(
+                    planet_type_bit.get(type_id, 0) for type_id in RAW_RESOURCE_TO_TYPE.get(commodity_id, [])
+                )
+                continue
+
+            # ingredients always come first in ordered_ids, so theirs are already worked out
+            ingredients = ingredient_ids[commodity_id]
+            raw_resource_bits[commodity_id] = _combine(raw_resource_bits[ingredient] for ingredient in ingredients)
+            intermediate_bits[commodity_id] = _combine(
+                intermediate_bits[ingredient] | intermediate_bit.get(ingredient, 0) for ingredient in ingredients
+            )
+            planet_type_bits[commodity_id] = _combine(planet_type_bits[ingredient] for ingredient in ingredients)
+
+        return cls(
+            Commodity_Ids=ordered_ids,
+            RawResource_Ids=raw_resource_ids,
+            Intermediate_Ids=intermediate_ids,
+            PlanetType_Ids=planet_type_ids,
+            RawResourceBits=raw_resource_bits,
+            IntermediateBits=intermediate_bits,
+            PlanetTypeBits=planet_type_bits,
+            Id_By_Name=dict(reversed(list(zip(client.Column("COMMODITIES", "Name"), commodity_ids)))),
+        )
+
+    @cached_property
+    def RawResourceIdsById(self) -> Dict[int, Tuple[int, ...]]:
+        return _decode_all(self.RawResourceBits, self.RawResource_Ids)
+
+    @cached_property
+    def IntermediateIdsById(self) -> Dict[int, Tuple[int, ...]]:
+        return _decode_all(self.IntermediateBits, self.Intermediate_Ids)
+
+    @cached_property
+    def PlanetTypeIdsById(self) -> Dict[int, Tuple[int, ...]]:
+        return _decode_all(self.PlanetTypeBits, self.PlanetType_Ids)
+
+    def IdOf(self, value: Union[str, int]) -> int:
+        """The Commodity.Id for a commodity Id or Name. Raises KeyError if there is no such commodity"""
+        if value in self.RawResourceBits:
+            return value
+        return self.Id_By_Name[value]
+
+    def RawResourceIdsFor(self, value: Union[str, int]) -> Tuple[int, ...]:
+        """Every raw resource (P0) that goes into a commodity, in RawResource_Ids order"""
+        return self.RawResourceIdsById[self.IdOf(value)]
+
+    def IntermediateIdsFor(self, value: Union[str, int]) -> Tuple[int, ...]:
+        """Every P1 - P3 commodity that goes into a commodity, in Intermediate_Ids order"""
+        return self.IntermediateIdsById[self.IdOf(value)]
+
+    def PlanetTypeIdsFor(self, value: Union[str, int]) -> Tuple[int, ...]:
+        """Every planet type at least one of a commodity's raw resources can be found on, in PlanetType_Ids order"""
+        return self.PlanetTypeIdsById[self.IdOf(value)]
+
+    def NeedsPlanetType(self, value: Union[str, int], planet_type_id: int) -> bool:
+        if planet_type_id not in self.PlanetType_Ids:
+            return False
+        return bool(self.PlanetTypeBits[self.IdOf(value)] >> self.PlanetType_Ids.index(planet_type_id) & 1)
+
+
+def _dependency_order(ingredient_ids: Dict[int, List[int]]) -> List[int]:
+    """Orders the commodities so each one comes after all of its ingredients (Kahn's algorithm)"""
+    used_by: Dict[int, List[int]] = {commodity_id: [] for commodity_id in ingredient_ids}
+    waiting_on = {}
+    for commodity_id, ingredients in ingredient_ids.items():
+        waiting_on[commodity_id] = len(set(ingredients))
+        for ingredient in set(ingredients):
+            used_by[ingredient].append(commodity_id)
+
+    ordered = [commodity_id for commodity_id, waiting in waiting_on.items() if waiting == 0]
+    for commodity_id in ordered:
+        for product_id in used_by[commodity_id]:
+            waiting_on[product_id] -= 1
+            if waiting_on[product_id] == 0:
+                ordered.append(product_id)
+
+    if len(ordered) != len(ingredient_ids):
+        raise ValueError("The commodity schematics contain a cycle")
+
+    return ordered
+
+
+def _combine(bitsets) -> int:
+    combined = 0
+    for bits in bitsets:
+        combined |= bits
+    return combined
+
+
+def _decode_all(bits_by_id: Dict[int, int], ids: List[int]) -> Dict[int, Tuple[int, ...]]:
+    return {
+        commodity_id: tuple(item_id for bit, item_id in enumerate(ids) if bits >> bit & 1)
+        for commodity_id, bits in bits_by_id.items()
+    }
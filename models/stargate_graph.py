@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Optional
+
+import numpy
+
+from logic.array_store import load_arrays, save_arrays
+from models.map import MapClient
+
+DEFAULT_GRAPH_FILE_PATH = "data/stargate_graph.npz"
+
+
+@dataclass
+class StargateGraph:
+    """
+    The stargate network as a compact, integer indexed adjacency list in CSR (compressed sparse row) form.
+
+    Every system gets a dense index (its position in MapClient.ALL_SYSTEMS). The systems linked to the system at index i
+    are Neighbors[Offsets[i]:Offsets[i + 1]], once each and in index order - the same systems in the same order as
+    System.GetLinkedSystems(), which the depth first search relies on. Nothing here references the map objects, so
+    searches can run over plain integers and the arrays can be saved and memory mapped back in (or shipped to other
+    processes) cheaply.
+
+    :param System_Ids(numpy.ndarray[int64]): The System.Id for each dense system index.
+    :param Offsets(numpy.ndarray[int64]): Start of each system's neighbors in Neighbors. Has one more entry than systems.
+    :param Neighbors(numpy.ndarray[int32]): Dense indexes of the linked systems, grouped by origin system.
+    :param Checksum(str, default: None): sha256 of the systems and stargates the graph was built from (see Matches).
+    """
+
+    System_Ids: numpy.ndarray
+    Offsets: numpy.ndarray
+    Neighbors: numpy.ndarray
+    Checksum: Optional[str] = None
+
+    @classmethod
+    def FromMapClient(cls, client: MapClient) -> StargateGraph:
+        """Builds the graph from every stargate in the client whose origin and destination systems both exist"""
+        system_ids = numpy.asarray(client.Column("SYSTEMS", "Id"), dtype=numpy.int64)
+        index_by_id = {system_id: index for index, system_id in enumerate(system_ids.tolist())}
+
+        origin_system_ids = client.Column("STARGATES", "OriginSystem_Id")
+        destination_system_ids = client.Column("STARGATES", "DestinationSystem_Id")
+
+        origins = []
+        destinations = []
+        for origin_system_id, destination_system_id in zip(origin_system_ids, destination_system_ids):
+            origin = index_by_id.get(origin_system_id, None)
+            destination = index_by_id.get(destination_system_id, None)
+            if origin is None or destination is None:
+                continue
+            origins.append(origin)
+            destinations.append(destination)
+
+        origins = numpy.asarray(origins, dtype=numpy.int64)
+        destinations = numpy.asarray(destinations, dtype=numpy.int64)
+
+        # sorted by origin then destination, once each
+        links = numpy.unique(numpy.column_stack((origins, destinations)), axis=0)
+        offsets = numpy.zeros(len(system_ids) + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(links[:, 0], minlength=len(system_ids)), out=offsets[1:])
+
+        graph = cls(
+            System_Ids=system_ids,
+            Offsets=offsets,
+            Neighbors=links[:, 1].astype(numpy.int32),
+            Checksum=_checksum(system_ids, origin_system_ids, destination_system_ids),
+        )
+        graph.__dict__["IndexById"] = index_by_id
+
+        return graph
+
+    @classmethod
+    def Load(cls, file_path: str = DEFAULT_GRAPH_FILE_PATH, mmap: bool = True) -> StargateGraph:
+        arrays = load_arrays(file_path, mmap=mmap)
+        return cls(
+            System_Ids=arrays["system_ids"],
+            Offsets=arrays["offsets"],
+            Neighbors=arrays["neighbors"],
+            Checksum=str(arrays["checksum"]) if "checksum" in arrays else None,
+        )
+
+    def Save(self, file_path: str = DEFAULT_GRAPH_FILE_PATH):
+        save_arrays(
+            file_path,
+            system_ids=self.System_Ids,
+            offsets=self.Offsets,
+            neighbors=self.Neighbors,
+            checksum=numpy.asarray(self.Checksum),
+        )
+
+    def Matches(self, client: MapClient) -> bool:
+        """If this was built from the same systems and stargates as are in the client"""
+        return self.Checksum is not None and self.Checksum == _checksum(
+            client.Column("SYSTEMS", "Id"),
+            client.Column("STARGATES", "OriginSystem_Id"),
+            client.Column("STARGATES", "DestinationSystem_Id"),
+        )
+
+    @cached_property
+    def IndexById(self) -> Dict[int, int]:
+        return {system_id: index for index, system_id in enumerate(self.System_Ids.tolist())}
+
+    @cached_property
+    def Degrees(self) -> numpy.ndarray:
+        return numpy.diff(self.Offsets)
+
+    @property
+    def TotalSystems(self) -> int:
+        return len(self.System_Ids)
+
+    @property
+    def TotalLinks(self) -> int:
+        """Directed links - each stargate pair is counted once from each side"""
+        return len(self.Neighbors)
+
+    def IndexOf(self, system_id: int) -> int:
+        return self.IndexById[system_id]
+
+    def IdOf(self, index: int) -> int:
+        return int(self.System_Ids[index])
+
+    def LinkedIndexes(self, index: int) -> numpy.ndarray:
+        return self.Neighbors[self.Offsets[index] : self.Offsets[index + 1]]
+
+    def LinkedSystem_Ids(self, system_id: int) -> List[int]:
+        return self.System_Ids[self.LinkedIndexes(self.IndexOf(system_id))].tolist()
+
+    def Edges(self) -> numpy.ndarray:
+        """Every link once, as an (n, 2) array of [lower index, higher index] pairs. Useful for drawing connections."""
+        origins = numpy.repeat(numpy.arange(self.TotalSystems, dtype=numpy.int32), self.Degrees)
+        pairs = numpy.column_stack((origins, self.Neighbors))
+        return numpy.unique(numpy.sort(pairs, axis=1), axis=0)
+
+
+def _checksum(system_ids: List[int], origin_system_ids: List[int], destination_system_ids: List[int]) -> str:
+    digest = hashlib.sha256()
+    for ids in (system_ids, origin_system_ids, destination_system_ids):
+        digest.update(numpy.asarray(ids, dtype=numpy.int64).tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,30 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class AnokisSystem:
+    """
+    A J-space system's details from anoik.is
+
+    :param name(str): The system name.
+    :param wh_class(str): The wormhole class, ie: (c5)
+    :param statics(str): The classes its static wormholes lead to, separated by /, ie: c3/ns
+    :param weather(str): The system effect, with the spaces taken out (ie: RedGiant). None if there is none.
+    :param System_Id(int, default: 0): The System.Id, once joined onto the map (see logic.get_anoikis_data).
+    """
+
+    name: str
+    wh_class: str
+    statics: str
+    weather: Optional[str]
+    System_Id: int = field(kw_only=True, default=0)
+
+    def __getstate__(self):
+        return (self.name, self.wh_class, self.statics, self.weather, self.System_Id)
+
+    def __setstate__(self, state):
+        # pickled before System_Id was kept
+        if len(state) == 4:
+            state = (*state, 0)
+        self.name, self.wh_class, self.statics, self.weather, self.System_Id = state
@@ -83,7 +83,9 @@ class DotlanAgent:
         return (self.Name, self.Station, self.System_Id, self.Corporation, self.Level, self.Notes)
 
     def __setstate__(self, state):
-        (self.Name, self.Station, self.System_Id, self.Corporation, self.Level, self.Notes) = state
+        # frozen, so the values have to be set around the dataclass's __setattr__
+        for name, value in zip(["Name", "Station", "System_Id", "Corporation", "Level", "Notes"], state):
+            object.__setattr__(self, name, value)
 
 
 @dataclass(frozen=True)
@@ -99,7 +101,9 @@ class DotlanStation:
         return (self.Name, self.FactionImage, self.Corporation, self.Services, self.Type, self.System_Id)
 
     def __setstate__(self, state):
-        (self.Name, self.FactionImage, self.Corporation, self.Services, self.Type, self.System_Id) = state
+        # frozen, so the values have to be set around the dataclass's __setattr__
+        for name, value in zip(["Name", "FactionImage", "Corporation", "Services", "Type", "System_Id"], state):
+            object.__setattr__(self, name, value)
 
 
 @dataclass
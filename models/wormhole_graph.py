@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, Iterable, List
+
+import numpy
+
+from models.map import MapClient
+from models.third_party.anoikis import AnokisSystem
+
+DEFAULT_WORMHOLES_FILE_PATH = "wormholes.csv"
+
+# Everywhere a static wormhole can lead. A class's bit in the masks below is 1 << its position here
+WORMHOLE_CLASSES = ["C1", "C2", "C3", "C4", "C5", "C6", "C13", "Thera", "Drifter", "HS", "LS", "NS"]
+CLASS_INDEX = {name: index for index, name in enumerate(WORMHOLE_CLASSES)}
+CLASS_INDEX_LOWER = {name.lower(): index for name, index in CLASS_INDEX.items()}
+KSPACE_MASK = (1 << CLASS_INDEX["HS"]) | (1 << CLASS_INDEX["LS"]) | (1 << CLASS_INDEX["NS"])
+# the first letter of a wormhole region/constellation name: its class (as in map.formatting)
+REGION_LETTER_CLASSES = {
+    "A": "C1",
+    "B": "C2",
+    "C": "C3",
+    "D": "C4",
+    "E": "C5",
+    "F": "C6",
+    "G": "Thera",
+    "H": "C13",
+    "K": "Drifter",
+}
+
+
+def class_mask(class_names: Iterable[str]) -> int:
+    """The bitmask of some WORMHOLE_CLASSES, by name in any case (ie: ["c3", "ns"])"""
+    mask = 0
+    for name in class_names:
+        index = CLASS_INDEX_LOWER.get(name.strip().lower(), None)
+        if index is not None:
+            mask |= 1 << index
+    return mask
+
+
+@dataclass
+class WormholeGraph:
+    """
+    How J-space is linked by static wormholes, as integer arrays and class bitmasks.
+
+    A static leads to a random system of its class, so what can be reached is worked out a class at a time: a system's
+    static reaches every system of that class, and every system with a static to a class can be reached from any
+    system of that class (the hole has two ends). K-space is kept as the HS/LS/NS classes only, without its systems.
+
+    Every J-space system gets a dense index, its position in wormholes.csv. The systems of the class at index c are
+    Members[Offsets[c]:Offsets[c + 1]].
+
+    :param System_Ids(numpy.ndarray[int64]): The System.Id for each dense system index.
+    :param Classes(numpy.ndarray[int8]): The WORMHOLE_CLASSES index of each system.
+    :param Statics(numpy.ndarray[uint16]): Bitmask of the classes each system's statics lead to.
+    :param Offsets(numpy.ndarray[int64]): Start of each class's systems in Members. Has one more entry than classes.
+    :param Members(numpy.ndarray[int32]): Dense indexes of the systems of each class, grouped by class.
+    """
+
+    System_Ids: numpy.ndarray
+    Classes: numpy.ndarray
+    Statics: numpy.ndarray
+    Offsets: numpy.ndarray
+    Members: numpy.ndarray
+
+    @classmethod
+    def FromData(
+        cls, client: MapClient, anoikis: Dict[int, AnokisSystem], file_path: str = DEFAULT_WORMHOLES_FILE_PATH
+    ) -> WormholeGraph:
+        """
+        Builds the graph from the (constellation, system name) rows of wormholes.csv, with the statics from anoik.is
+
+        :param anoikis(Dict[int, AnokisSystem]): The anoik.is details by System.Id, see AllData.Anoikis.
+        """
+        systems_by_name = client.NAME_INDEX.get("SYSTEMS", {})
+        system_ids = []
+        classes = []
+        statics = []
+        with open(file_path, "r") as file:
+            for line in file:
+                if line.strip() == "":
+                    continue
+                constellation_name, system_name = [value.strip() for value in line.split(",")]
+                system = systems_by_name.get(system_name, None)
+                if system is None:
+                    continue
+
+                anoikis_system = anoikis.get(system.Id, None)
+                system_ids.append(system.Id)
+                classes.append(CLASS_INDEX[REGION_LETTER_CLASSES[constellation_name[0]]])
+                statics.append(0 if anoikis_system is None else class_mask(anoikis_system.statics.split("/")))
+
+        system_ids = numpy.asarray(system_ids, dtype=numpy.int64)
+        classes = numpy.asarray(classes, dtype=numpy.int8)
+        statics = numpy.asarray(statics, dtype=numpy.uint16)
+
+        offsets = numpy.zeros(len(WORMHOLE_CLASSES) + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(classes, minlength=len(WORMHOLE_CLASSES)), out=offsets[1:])
+        members = numpy.argsort(classes, kind="stable").astype(numpy.int32)
+
+        return cls(System_Ids=system_ids, Classes=classes, Statics=statics, Offsets=offsets, Members=members)
+
+    @cached_property
+    def IndexById(self) -> Dict[int, int]:
+        return {system_id: index for index, system_id in enumerate(self.System_Ids.tolist())}
+
+    @cached_property
+    def ClassBits(self) -> numpy.ndarray:
+        """The bit of each system's own class"""
+        return numpy.left_shift(numpy.uint16(1), self.Classes.astype(numpy.uint16))
+
+    @property
+    def TotalSystems(self) -> int:
+        return len(self.System_Ids)
+
+    def IndexOf(self, system_id: int) -> int:
+        return self.IndexById[system_id]
+
+    def SystemsOfClass(self, class_name: str) -> List[int]:
+        index = CLASS_INDEX[class_name]
+        return self.System_Ids[self.Members[self.Offsets[index] : self.Offsets[index + 1]]].tolist()
+
+    def WithStatic(self, class_names: Iterable[str]) -> numpy.ndarray:
+        """Bitmap of the systems with a static to any of the classes"""
+        return (self.Statics & class_mask(class_names)) != 0
+
+    def ReachableIndexes(self, system_id: int, holes: int) -> numpy.ndarray:
+        """
+        Bitmap of the systems that can be reached from a J-space system through at most holes static wormholes, not
+        counting the system itself.
+        """
+        reached = numpy.zeros(self.TotalSystems, dtype=bool)
+        origin = self.IndexOf(system_id)
+        reached[origin] = True
+        kspace = 0
+
+        for _ in range(holes):
+            # the classes the reached systems are in, and the classes their statics lead to
+            present = int(numpy.bitwise_or.reduce(self.ClassBits[reached], initial=0)) | kspace
+            leads_to = int(numpy.bitwise_or.reduce(self.Statics[reached], initial=0))
+
+            reached_next = reached | ((self.ClassBits & leads_to) != 0) | ((self.Statics & present) != 0)
+            kspace_next = kspace | (leads_to & KSPACE_MASK)
+            if kspace_next == kspace and numpy.array_equal(reached_next, reached):
+                break
+            reached = reached_next
+            kspace = kspace_next
+
+        reached[origin] = False
+        return reached
+
+    def Reachable(self, system_id: int, holes: int, statics: Iterable[str] = None) -> List[int]:
+        """
+        The System.Ids that can be reached from a J-space system through at most holes static wormholes, optionally only
+        those with a static to one of the statics classes - ie: the C5 static systems within 2 holes of J100744 are
+        Reachable(<J100744 Id>, 2, ["C5"])
+        """
+        reached = self.ReachableIndexes(system_id, holes)
+        if statics is not None:
+            reached &= self.WithStatic(statics)
+        return self.System_Ids[reached].tolist()
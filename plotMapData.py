@@ -1,15 +1,22 @@
-import json
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import networkx as nx
 import plotly.graph_objects as go
 from alive_progress import alive_bar
 
 from buildMapData import *
-from calculate.planetary_industry import PlanetaryIndustryResult, PlanetaryIndustryWeightFactor
-from calculate.search_map import WeightCalculator
-from models.common import Universe, WeightMethod
+from calculate.audit_log import AuditLog
+from calculate.parallel_search import RunAllParallel, RunBatchParallel
+from calculate.planetary_industry import (
+    DescribeResults,
+    PlanetaryIndustryComponents,
+    PlanetaryIndustryResult,
+    PlanetaryIndustryWeightFactor,
+)
+from calculate.search_map import RunBatch, WeightCalculator
+from calculate.top_origins import OriginSummary
+from models.common import AuditLevel, SearchMethod, Universe, WeightMethod
 from models.map import *
 
 X_POSITION_RELATIVE = 1
@@ -19,19 +26,29 @@ INCLUDE_PLANET_NAMES = False
 
 COMMODITY_TO_TRACK = "Integrity Response Drones"
 
+# If any are listed, running this file weighs the map for all of them in one pass (see BuildAtlas) and pickles each to its
+# own graph data file, rather than displaying COMMODITY_TO_TRACK. ie: AdvancedCommodities + SpecializedCommodities
+BATCH_COMMODITIES: List[str] = []
+
 MAX_JUMPS = 3
 
 WEIGHTING_METHOD = WeightMethod.AVERAGE
 
-USE_CACHE = True
+SEARCH_METHOD = SearchMethod.BREADTH_FIRST
+
+TOP_COUNT = None  # How many of the best origin systems to keep. None keeps every system that ties for the top weight
+
+PARALLEL_WORKERS = None  # How many processes weigh the map. None uses every core, 1 runs everything in this process
 
-SAVE_AUDIT_LOGS = True
+# OFF records nothing, TOP_ONLY just the top systems. Streamed to logs.jsonl while running
+AUDIT_LEVEL = AuditLevel.FULL
 
 DISPLAY_RESULTS = True
 
 PICKLE_GRAPH_DATA = True  # If True will cause the simulation to be run and any existing pickled data to be overwritten!
 # if False, it will attempt to load the data from the pickled data
-PICKLE_FILE_PATH = f"data/pickled_graph_{COMMODITY_TO_TRACK}".replace(" ", "_").lower()
+PICKLE_FILE_PATH_TEMPLATE = "data/pickled_graph_{commodity}"
+PICKLE_FILE_PATH = PICKLE_FILE_PATH_TEMPLATE.format(commodity=COMMODITY_TO_TRACK).replace(" ", "_").lower()
 
 
 class GraphValues:
@@ -61,33 +78,14 @@ class GraphValues:
         self.save_top_details = None
         self.save_top_weight = None
         self.logs = None
+        # calculate.planetary_industry.PlanetaryIndustryComponents of the run, for ReweighGraphValues
+        self.components = None
 
 
 def DisplayMap():
-    all_data = AllData(skip_build=True)
-
-    raw_resource_ids = next(
-        commodity for commodity in all_data.Commodities if commodity.Name == COMMODITY_TO_TRACK
-    ).GetRawResourceIds(cache=USE_CACHE)
-    planet_types_needed = [
-        ptype
-        for ptype in all_data.Planet_Types
-        if len(set(ptype.RawResources_Ids).intersection(set(raw_resource_ids))) > 0
-    ]
+    all_data = AllData(skip_build=True, lazy=True)
 
-    calculator = WeightCalculator(
-        WeightFactors=PlanetaryIndustryWeightFactor(
-            PlanetTypesDesired=[ptype.Id for ptype in planet_types_needed],
-            JumpWeight=50,
-            TypeDensityWeight=50,
-            TypeDiversityWeight=25,
-            SecurityWeight=50,
-            SecurityPreference=SecurityStatus.HIGH_SEC,
-        ),
-        WeightResults=PlanetaryIndustryResult,
-        MaxJumps=MAX_JUMPS,
-        MustFindTargets=set([ptype.Id for ptype in planet_types_needed]),
-    )
+    calculator, planet_types_needed = BuildCalculator(all_data, COMMODITY_TO_TRACK, logs_file_path="logs.jsonl")
 
     graph_values = GraphValuesFactory(calculator)
 
@@ -96,15 +94,19 @@ def DisplayMap():
 
     if PICKLE_GRAPH_DATA:
         with open(PICKLE_FILE_PATH, "wb") as pickleFile:
-            graph_values.logs = calculator.AllAuditLogs
+            graph_values.logs = calculator.Audit.FilePath
             print(f"Pickling {COMMODITY_TO_TRACK} graph data")
             dump(graph_values, pickleFile)
 
+    node_custom_data, top_system_hover_extra = BuildHoverData(
+        all_data, calculator.WeightFactors.PlanetTypesDesired, graph_values
+    )
+
     top_results_trace = BuildNodesTrace(
         graph_values.top_system_x,
         graph_values.top_system_y,
         graph_values.top_system_text,
-        graph_values.top_system_hover_extra,
+        top_system_hover_extra,
         "<b>%{text}</b><br><i>%{customdata[0]}, %{customdata[1]}<br>%{customdata[2]}<extra></extra>",
         go.scatter.Marker(symbol="star-diamond", size=25, color="crimson"),
     )
@@ -115,7 +117,7 @@ def DisplayMap():
         graph_values.node_x,
         graph_values.node_y,
         graph_values.node_text,
-        graph_values.node_custom_data,
+        node_custom_data,
         "".join(
             [
                 "<b>%{text}</b> | Weight: <i>%{customdata[0]:.2f}</i>",
@@ -150,7 +152,88 @@ def DisplayMap():
     fig.show()
 
     if DISPLAY_RESULTS:
-        DisplayResultsToStdOut(all_data, planet_types_needed, calculator)
+        DisplayResultsToStdOut(all_data, planet_types_needed, calculator, graph_values)
+
+
+def BuildAtlas(commodities: List[str]):
+    """
+    Weighs the map for every one of commodities and pickles each one's graph values, the same as DisplayMap does for
+    COMMODITY_TO_TRACK (with PICKLE_GRAPH_DATA set). The systems around each origin are only walked once for all of the
+    commodities (see calculate.search_map.RunBatch), rather than once per commodity.
+
+    :param commodities(List[str]): The names of the commodities to weigh the map for.
+    """
+    all_data = AllData(skip_build=True, lazy=True)
+
+    calculators = {
+        commodity: BuildCalculator(
+            all_data, commodity, logs_file_path=f"logs_{commodity.replace(' ', '_').lower()}.jsonl"
+        )[0]
+        for commodity in commodities
+    }
+    origin_systems = GetOriginSystems(all_data)
+
+    with alive_bar(len(origin_systems) * len(calculators), title_length=47) as bar:
+        if PARALLEL_WORKERS == 1:
+            batch_results = RunBatch(
+                calculators, origin_systems, method=WEIGHTING_METHOD, progress_bar=ProgressBar(bar=bar)
+            )
+        else:
+            batch_results = RunBatchParallel(
+                calculators,
+                origin_systems,
+                method=WEIGHTING_METHOD,
+                workers=PARALLEL_WORKERS,
+                progress_bar=ProgressBar(bar=bar),
+            )
+
+    for commodity, calculator in calculators.items():
+        graph_values = GraphValues()
+        file_name = commodity.replace(" ", "_").lower()
+        GenerateGraphValues(all_data, calculator, graph_values, all_results=batch_results[commodity])
+
+        with open(PICKLE_FILE_PATH_TEMPLATE.format(commodity=file_name), "wb") as pickleFile:
+            graph_values.logs = calculator.Audit.FilePath
+            print(f"Pickling {commodity} graph data")
+            dump(graph_values, pickleFile)
+
+
+def BuildCalculator(
+    all_data: AllData, commodity: str, logs_file_path: str = None
+) -> Tuple[WeightCalculator, List[PlanetType]]:
+    """
+    The WeightCalculator for finding the best systems to make a commodity in.
+
+    :param logs_file_path(str, default: None): Where the audit events are streamed as JSON lines, at AUDIT_LEVEL. Kept
+        in memory if None.
+
+    :return calculator(WeightCalculator): The configured calculator.
+    :return planet_types_needed(List[PlanetType]): The planet types the commodity's raw resources are found on.
+    """
+    planet_types_needed = all_data.MapClient.GetMany(
+        "PLANET_TYPES", all_data.ProductionTree.PlanetTypeIdsFor(commodity)
+    )
+
+    calculator = WeightCalculator(
+        WeightFactors=PlanetaryIndustryWeightFactor(
+            PlanetTypesDesired=[ptype.Id for ptype in planet_types_needed],
+            JumpWeight=50,
+            TypeDensityWeight=50,
+            TypeDiversityWeight=25,
+            SecurityWeight=50,
+            SecurityPreference=SecurityStatus.HIGH_SEC,
+        ),
+        WeightResults=PlanetaryIndustryResult,
+        MaxJumps=MAX_JUMPS,
+        MustFindTargets=set([ptype.Id for ptype in planet_types_needed]),
+        Search=SEARCH_METHOD,
+        Graph=all_data.Graph,
+        TypeCounts=all_data.PlanetTypeCounts,
+        Audit=AuditLog(Level=AUDIT_LEVEL, FilePath=logs_file_path),
+        TopCount=TOP_COUNT,
+    )
+
+    return calculator, planet_types_needed
 
 
 def BuildEdgeTrace(x_edge, y_edge, line: go.scatter.Line = go.scatter.Line(width=0.5, color="#000")) -> go.Scatter:
@@ -178,7 +261,7 @@ def BuildNodesTrace(
     node_text: List[str],
     custom_data: List[tuple],
     hover_template: str,
-    weight: Optional[List(int)] = None,
+    weight: Optional[List[int]] = None,
     marker: Optional[go.scatter.Marker] = None,
 ) -> go.Scatter:
     """
@@ -229,44 +312,79 @@ def BuildNodesTrace(
     return top_results_trace
 
 
-def GenerateGraphValues(all_data: AllData, calculator: WeightCalculator, graph_values: GraphValues):
+def GetOriginSystems(all_data: AllData) -> List[System]:
+    """
+    Every system the map is weighed around - those outside of wormhole space with stargates. Picked from the columns, so
+    when the map is lazy only these systems are created.
+    """
+    client = all_data.MapClient
+    return [
+        all_data.Systems[position]
+        for position, (system_position, stargate_ids) in enumerate(
+            zip(client.Column("SYSTEMS", "Position"), client.Column("SYSTEMS", "Stargate_Ids"))
+        )
+        if system_position.Universe != Universe.WORMHOLE and len(stargate_ids) > 0
+    ]
+
+
+def GenerateGraphValues(
+    all_data: AllData,
+    calculator: WeightCalculator,
+    graph_values: GraphValues,
+    all_results: Dict[int, Tuple[int, Dict[int, Any]]] = None,
+):
+    """
+    Weighs the map with the calculator and fills in graph_values from the results.
+
+    :param all_results(Dict[int, Tuple[weight, results]], default: None): The calculator's results if it has already been
+        run over GetOriginSystems() (see BuildAtlas), otherwise it is run here.
+    """
     systemMap = nx.Graph()
 
-    with alive_bar(all_data.TotalEdenSystems, title_length=47) as bar:
-        for system in all_data.Systems:
-            if system.Position.Universe == Universe.WORMHOLE:
-                continue
-            if len(system.Stargate_Ids) == 0:
-                continue
+    origin_systems = GetOriginSystems(all_data)
+
+    if all_results is None:
+        with alive_bar(len(origin_systems), title_length=47) as bar:
+            if PARALLEL_WORKERS == 1:
+                all_results = calculator.RunAll(
+                    origin_systems, method=WEIGHTING_METHOD, progress_bar=ProgressBar(bar=bar)
+                )
+            else:
+                all_results = RunAllParallel(
+                    calculator,
+                    origin_systems,
+                    method=WEIGHTING_METHOD,
+                    workers=PARALLEL_WORKERS,
+                    progress_bar=ProgressBar(bar=bar),
+                )
 
+    with alive_bar(len(origin_systems), title_length=47) as bar:
+        for system in origin_systems:
             bar.title(
                 f'Analyzing "{system.Constellation_Name}" in the "{system.GetConstellation().Region_Name}" Region'
             )
             bar()
 
-            system_weight, weight_details = calculator.Run(system, method=WEIGHTING_METHOD)
+            system_weight, weight_details = all_results[system.Id]
 
             systemMap.add_node(system.Name)
             graph_values.node_names.append(f"{system.Name}#{system.Id}")
             graph_values.node_x.append(system.Position.X / X_POSITION_RELATIVE)
             graph_values.node_y.append(system.Position.Y / Y_POSITION_RELATIVE)
-            if len(weight_details) == 0:
-                weight_string = f"Not possible get all materials within {MAX_JUMPS}"
-            else:
-                weight_string = "<br>".join([detail.Html(simple=True) for detail in weight_details.values()])
+            # just the numbers of the results. The hover text is made from them by BuildHoverData, when it is displayed.
             graph_values.node_custom_data.append(
                 (
                     system_weight,
                     system.Constellation_Name,
                     system.Region_Name,
-                    weight_string,
+                    tuple(detail.AsTuple() for detail in weight_details.values()),
                 )
             )
 
             graph_values.node_weight.append(system_weight)
             graph_values.node_text.append(f"{system.Name}")
 
-            for destination in system.GetLinkedSystems():
+            for destination in all_data.MapClient.GetMany("SYSTEMS", all_data.Graph.LinkedSystem_Ids(system.Id)):
                 systemMap.add_edge(system.Name, destination.Name)
                 graph_values.edge_x.append(system.Position.X / X_POSITION_RELATIVE)
                 graph_values.edge_x.append(destination.Position.X / X_POSITION_RELATIVE)
@@ -275,26 +393,121 @@ def GenerateGraphValues(all_data: AllData, calculator: WeightCalculator, graph_v
                 graph_values.edge_y.append(destination.Position.Y / Y_POSITION_RELATIVE)
                 graph_values.edge_y.append(None)
 
-    if SAVE_AUDIT_LOGS:
-        with open(f"logs.json", "w") as file:
-            json.dump(calculator.AllAuditLogs, file)
+    calculator.Audit.Close()
+
+    graph_values.components = PlanetaryIndustryComponents.FromResults(
+        all_data.MapClient, calculator.WeightFactors, all_results
+    )
+
+    SetTopSystems(
+        all_data,
+        graph_values,
+        calculator.TopWeight,
+        {
+            origin_system_id: (
+                weight_details
+                if isinstance(weight_details, OriginSummary)
+                else OriginSummary.FromResults(origin_system_id, all_results[origin_system_id][0], weight_details)
+            )
+            for origin_system_id, weight_details in calculator.TopDetails.items()
+        },
+    )
+
+    return systemMap
+
+
+def ReweighGraphValues(all_data: AllData, weight_factors: PlanetaryIndustryWeightFactor, graph_values: GraphValues):
+    """
+    Weighs graph values made by GenerateGraphValues again with other weight factors, from the components kept of the
+    run rather than searching the map again. The node weights, their results and the top systems are all updated.
+
+    :param weight_factors(PlanetaryIndustryWeightFactor): The new weights. PlanetTypesDesired and MaxJumps must be the
+        same as the graph values were made with.
+    """
+    components: PlanetaryIndustryComponents = graph_values.components
+    totals, individual_weights = components.SystemWeights(weight_factors)
+    weights = components.Rescore(weight_factors, WEIGHTING_METHOD)
+
+    system_ids = components.System_Ids.tolist()
+    jumps = components.Jumps.tolist()
+    totals = totals.tolist()
+    individual_weights = [tuple(row) for row in individual_weights.tolist()]
+    offsets = components.Offsets.tolist()
+
+    # the nodes are in the same order as the origins were run
+    summaries = {}
+    for index, origin_system_id in enumerate(components.Origin_Ids.tolist()):
+        start, end = offsets[index], offsets[index + 1]
+        rows = sorted(
+            zip(system_ids[start:end], jumps[start:end], totals[start:end], individual_weights[start:end]),
+            key=lambda row: row[2],
+            reverse=True,
+        )
+        summaries[origin_system_id] = OriginSummary(origin_system_id, weights[origin_system_id], tuple(rows))
+        graph_values.node_weight[index] = weights[origin_system_id]
+        graph_values.node_custom_data[index] = (
+            weights[origin_system_id],
+            *graph_values.node_custom_data[index][1:3],
+            summaries[origin_system_id].Systems,
+        )
 
-    graph_values.save_top_details = calculator.TopDetails
-    graph_values.save_top_weight = calculator.TopWeight
-    for origin_system_id, weight_details in calculator.TopDetails.items():
+    # as WeightCalculator._recordTopValues - every tie for the top weight, or the TOP_COUNT best with the first run kept
+    ranked = sorted((summary for summary in summaries.values() if summary.Weight >= 0), key=lambda x: -x.Weight)
+    if TOP_COUNT is None:
+        top_weight = max([0] + [summary.Weight for summary in ranked])
+        top_details = {summary.Origin_Id: summary for summary in ranked if summary.Weight == top_weight}
+    else:
+        top_details = {summary.Origin_Id: summary for summary in ranked[:TOP_COUNT]}
+        top_weight = max([0] + [summary.Weight for summary in ranked[:1]])
+
+    SetTopSystems(all_data, graph_values, top_weight, top_details)
+
+
+def SetTopSystems(
+    all_data: AllData, graph_values: GraphValues, top_weight: float, top_details: Dict[int, OriginSummary]
+):
+    """Fills in the top systems of graph_values"""
+    graph_values.save_top_details = top_details
+    graph_values.save_top_weight = top_weight
+    graph_values.top_system_x = []
+    graph_values.top_system_y = []
+    graph_values.top_system_text = []
+    graph_values.top_system_hover_extra = []
+    for origin_system_id, summary in top_details.items():
         system = all_data.GetSystem(origin_system_id)
         graph_values.top_system_x.append(system.Position.X / X_POSITION_RELATIVE)
         graph_values.top_system_y.append(system.Position.Y / X_POSITION_RELATIVE)
         graph_values.top_system_text.append(f"{system.Name}#{system.Id}")
-        graph_values.top_system_hover_extra.append(
-            (
-                system.Constellation_Name,
-                system.Region_Name,
-                "<br>".join([detail.Html() for detail in weight_details.values()]),
-            )
-        )
+        graph_values.top_system_hover_extra.append((system.Constellation_Name, system.Region_Name, summary.Systems))
 
-    return systemMap
+
+def BuildHoverData(
+    all_data: AllData, planet_type_ids_desired: List[int], graph_values: GraphValues
+) -> Tuple[List[tuple], List[tuple]]:
+    """
+    The custom data of the systems and top systems traces, with the numbers of each origin's results (as kept in
+    graph_values) turned into their hover text in one batch.
+
+    :return node_custom_data(List[tuple]): (weight, constellation, region, hover text) for each system.
+    :return top_system_hover_extra(List[tuple]): (constellation, region, hover text) for each top system.
+    """
+    node_text = DescribeResults(
+        all_data.MapClient,
+        planet_type_ids_desired,
+        (custom_data[3] for custom_data in graph_values.node_custom_data),
+        simple=True,
+    )
+    node_custom_data = [
+        (*custom_data[:3], text if len(custom_data[3]) > 0 else f"Not possible get all materials within {MAX_JUMPS}")
+        for custom_data, text in zip(graph_values.node_custom_data, node_text)
+    ]
+
+    top_text = DescribeResults(
+        all_data.MapClient, planet_type_ids_desired, (extra[2] for extra in graph_values.top_system_hover_extra)
+    )
+    top_system_hover_extra = [(*extra[:2], text) for extra, text in zip(graph_values.top_system_hover_extra, top_text)]
+
+    return node_custom_data, top_system_hover_extra
 
 
 def GraphValuesFactory(calculator: WeightCalculator) -> GraphValues:
@@ -315,7 +528,7 @@ def GraphValuesFactory(calculator: WeightCalculator) -> GraphValues:
     return graph_values
 
 
-def DisplayResultsToStdOut(all_data, planet_types_needed, calculator):
+def DisplayResultsToStdOut(all_data, planet_types_needed, calculator, graph_values):
     """
     Display the Top results to stdOut.
     """
@@ -325,13 +538,21 @@ def DisplayResultsToStdOut(all_data, planet_types_needed, calculator):
 
     if PICKLE_GRAPH_DATA:
         print(f"=======Top Systems=======")
-        print(f"     {', '.join([all_data.GetSystem(key).Name for key in calculator.TopDetails.keys()])}")
+        print(f"     {', '.join([all_data.GetSystem(key).Name for key in graph_values.save_top_details.keys()])}")
 
-        for key, value in calculator.TopDetails.items():
+        top_text = DescribeResults(
+            all_data.MapClient,
+            calculator.WeightFactors.PlanetTypesDesired,
+            (summary.Systems for summary in graph_values.save_top_details.values()),
+            html=False,
+        )
+        for key, text in zip(graph_values.save_top_details.keys(), top_text):
             print(f">>>>> {all_data.GetSystem(key).Name}")
-            for entry in value.values():
-                print(entry)
+            print(text)
 
 
 if __name__ == "__main__":
-    DisplayMap()
+    if len(BATCH_COMMODITIES) > 0:
+        BuildAtlas(BATCH_COMMODITIES)
+    else:
+        DisplayMap()
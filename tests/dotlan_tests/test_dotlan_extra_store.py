@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pytest
+
+from logic.dotlan_extra_store import DotlanExtraStore
+
+
+class Vanishing:
+    """Pickled into a store, then removed from the module so that its record can no longer be read"""
+
+
+@pytest.fixture
+def store_path(tmp_path) -> str:
+    return str(tmp_path / "dotlan_extra_store")
+
+
+def write_store(store_path: str, entries: dict):
+    store = DotlanExtraStore(store_path)
+    for system_id, data in entries.items():
+        store.Add(system_id, data, scraped_at=1.0)
+    store.Close()
+
+
+def test_store_reopens_with_every_entry(store_path):
+    write_store(store_path, {1: "one", 2: "two"})
+    write_store(store_path, {1: "one again"})
+
+    store = DotlanExtraStore(store_path)
+
+    assert len(store) == 2
+    assert store.Get(1) == "one again"
+    assert store.Get("2") == "two"
+
+
+def test_truncated_last_record_is_dropped(store_path):
+    write_store(store_path, {1: "one", 2: "two"})
+    complete_size = os.path.getsize(store_path)
+    write_store(store_path, {3: "three" * 100})
+    with open(store_path, "r+b") as file:
+        file.truncate(os.path.getsize(store_path) - 20)
+
+    store = DotlanExtraStore(store_path)
+
+    assert len(store) == 2
+    assert 3 not in store
+    assert os.path.getsize(store_path) == complete_size
+
+    # and the store carries on from the last complete record
+    store.Add(3, "three")
+    store.Close()
+    assert DotlanExtraStore(store_path).Get(3) == "three"
+
+
+def test_truncated_last_header_is_dropped(store_path):
+    write_store(store_path, {1: "one"})
+    complete_size = os.path.getsize(store_path)
+    with open(store_path, "ab") as file:
+        file.write(b"\x10\x00")
+
+    store = DotlanExtraStore(store_path)
+
+    assert store.Get(1) == "one"
+    assert os.path.getsize(store_path) == complete_size
+
+
+def test_bad_middle_record_is_skipped_and_kept(store_path, monkeypatch, capsys):
+    write_store(store_path, {1: "one", 2: Vanishing(), 3: "three"})
+    size = os.path.getsize(store_path)
+    monkeypatch.delattr(sys.modules[__name__], "Vanishing")
+
+    store = DotlanExtraStore(store_path)
+
+    assert store.Get(1) == "one"
+    assert store.Get(3) == "three"
+    assert 2 not in store
+    assert os.path.getsize(store_path) == size
+    assert "skipping the record" in capsys.readouterr().out
+
+
+def test_bad_last_record_is_kept_unless_torn(store_path, monkeypatch):
+    write_store(store_path, {1: "one", 2: Vanishing()})
+    size = os.path.getsize(store_path)
+    monkeypatch.delattr(sys.modules[__name__], "Vanishing")
+
+    store = DotlanExtraStore(store_path)
+
+    assert store.Get(1) == "one"
+    assert os.path.getsize(store_path) == size
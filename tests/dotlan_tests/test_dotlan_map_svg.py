@@ -0,0 +1,93 @@
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+
+from logic.get_dotlan_maps import (
+    build_region_central_coordinates,
+    determine_region_relative_position,
+    offset_around_region,
+    parse_map,
+    read_map_svg,
+)
+from models.common import Position, Universe
+from models.third_party.dotlan import DotlanRegionOffset, DotlanSystem
+
+NEW_EDEN_MAP = "eden_svg.xml"
+ARIDIA_MAP = "test.xml"
+
+
+def read_map(file_name: str) -> BytesIO:
+    with open(file_name, "rb") as f:
+        return BytesIO(f.read())
+
+
+def soup_systems(map_svg: BytesIO, client, expected_region: str, is_region_map=False, region_offset=None) -> dict:
+    """The systems as parse_system found them with BeautifulSoup, before the map was read with expat"""
+    bs4 = pytest.importorskip("bs4")
+    pytest.importorskip("lxml")
+
+    root = bs4.BeautifulSoup(map_svg, features="xml")
+    systems = {}
+    for node in root.find_all("use"):
+        sys_id = node.get("id")[3:]
+        data_node = root.find("symbol", id=f"def{sys_id}")
+        region = data_node.find("text", **{"class": "ss" if is_region_map else "er"})
+        alliance = data_node.find("text", **{"class": "st"})
+        x, y = offset_around_region(node, region_offset)
+
+        if is_region_map or (region is None or region.text == expected_region):
+            system = DotlanSystem(
+                System_Id=sys_id,
+                Name=region.text if is_region_map else client.GetSystem(sys_id).Name,
+                Position=Position(X=x, Y=y, Z=0, Universe=Universe.EDEN),
+                faction=alliance.text if alliance is not None else "",
+                has_ice=data_node.find("text", id=f"ice{sys_id}") is not None,
+                has_refinery=data_node.find("polygon", **{"class": "v1"}) is not None,
+                has_cloning=data_node.find("polygon", **{"class": "v2"}) is not None,
+                has_industry=data_node.find("polygon", **{"class": "v3"}) is not None,
+                has_research=data_node.find("polygon", **{"class": "v4"}) is not None,
+                dotlan_link=data_node.find("a").get("xlink:href", ""),
+            )
+            systems[system.Name if is_region_map else system.System_Id] = system
+
+    return systems
+
+
+@pytest.fixture(scope="module")
+def region_data():
+    return build_region_central_coordinates(read_map(NEW_EDEN_MAP))
+
+
+@pytest.fixture
+def client():
+    return SimpleNamespace(GetSystem=lambda sys_id: SimpleNamespace(Name=f"System {sys_id}"))
+
+
+def test_region_map(region_data):
+    assert len(region_data) == 68
+    assert region_data["The Forge"] == DotlanSystem(
+        System_Id="10000002",
+        Name="The Forge",
+        Position=Position(X=394.0, Y=200.0, Z=0, Universe=Universe.EDEN),
+        faction="Caldari",
+        dotlan_link="http://evemaps.dotlan.net/map/The_Forge",
+    )
+    assert determine_region_relative_position("The_Forge", region_data) == (394000.0, 200000.0)
+
+
+def test_region_map_matches_beautiful_soup(region_data):
+    assert region_data == soup_systems(read_map(NEW_EDEN_MAP), None, "", is_region_map=True)
+
+
+def test_system_map_matches_beautiful_soup(region_data, client):
+    systems = parse_map(read_map(ARIDIA_MAP), client, "Aridia", region_data, False)["systems"]
+
+    uses = read_map_svg(read_map(ARIDIA_MAP)).Uses
+    center_x = max(float(use["x"]) for use in uses) / 2
+    center_y = max(float(use["y"]) for use in uses) / 2
+    region_offset = DotlanRegionOffset(center_x, center_y, *determine_region_relative_position("Aridia", region_data))
+
+    # 6 of the 86 systems drawn on the map are in neighbouring regions
+    assert len(systems) == 80
+    assert systems == soup_systems(read_map(ARIDIA_MAP), client, "Aridia", region_offset=region_offset)
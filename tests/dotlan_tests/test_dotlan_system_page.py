@@ -0,0 +1,125 @@
+import os
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from logic.parse_dotlan_system_data import _get_subpage_data, parse_extra_dotlan_data, read_page, time_page_reads
+from models.third_party.dotlan import DotlanAdditionalSystemData, DotlanAgent, DotlanStation
+
+PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), "pages")
+SYSTEM_PAGE = os.path.join(PAGES_DIRECTORY, "Outuni.html")
+AGENTS_PAGE = os.path.join(PAGES_DIRECTORY, "Outuni_agents.html")
+OUTUNI_ID = 30000135
+
+STATION_NAMES = [
+    "Outuni IX - Moon 3 - Imperial Armaments Factory",
+    "Outuni X - Moon 14 - Imperial Armaments Factory",
+]
+LOGO = "https://image.eveonline.com/Corporation/1000065_32.png"
+SERVICES_ROWS = [
+    [STATION_NAMES[0], LOGO, "Imperial Armaments", "Refinery (50%), Repair, Factory", "Factory"],
+    [STATION_NAMES[1], LOGO, "Imperial Armaments", "Refinery (50%), Repair, Factory", "Factory"],
+]
+SYSTEM_ROWS = [
+    ["Region", "The Forge", "Constellation", "Ihilakken"],
+    ["Security Class", "C", "Security", "0.5"],
+    ["Planets", "12", "Moons", "82"],
+    ["Belts/Icebelts", "20 +1", "Local Pirates", "Guristas"],
+]
+AGENT_ROWS = [
+    [STATION_NAMES[0]],
+    ["Shafrak Seswek", "Imperial Armaments", "- Generic Storyline Mission Agent", "-"],
+    ["Pavana Innoor", "Imperial Armaments", "Distribution / Basic Agent", "1"],
+    ["Kazeli Dohrucan", "Imperial Armaments", "-", "-"],
+    [STATION_NAMES[1]],
+    ["Khelirerasa Yifa", "Imperial Armaments", "Security / Basic Agent", "2"],
+]
+# (unique text, cell tag, image_indicator, drop_header) of each table parse_extra_dotlan_data reads, and its rows
+TABLES = [
+    (SYSTEM_PAGE, "Services", "th", "tlogo", True, SERVICES_ROWS),
+    (SYSTEM_PAGE, "Belts/Icebelts", "td", None, False, SYSTEM_ROWS),
+    (AGENTS_PAGE, "Division / Type / Research", "th", None, True, AGENT_ROWS),
+]
+
+
+def read_file(file_path: str) -> bytes:
+    with open(file_path, "rb") as file:
+        return file.read()
+
+
+def soup_rows(file_path: str, unique_text: str, element_tag: str, image_indicator: str, drop_header: bool) -> list:
+    """The rows as _get_subpage_data found them with BeautifulSoup, before the pages were read by DotlanTableParser"""
+    bs4 = pytest.importorskip("bs4")
+
+    page = bs4.BeautifulSoup(read_file(file_path), features="html.parser")
+    table = next(
+        table
+        for table in page.find_all("table", **{"class": "tablelist"})
+        if any(element.text == unique_text for element in table.find_all(element_tag))
+    )
+
+    def value(element):
+        if image_indicator is not None and image_indicator in str(element.attrs.values()):
+            for child in element.find_all("img"):
+                return child.attrs["src"]
+        return element.text.strip()
+
+    rows = [[value(element) for element in row.find_all(re.compile(r"(td|th)"))] for row in table.find_all("tr")]
+    rows = [row for row in rows if len(row) > 0]
+    return rows[1:] if drop_header else rows
+
+
+@pytest.mark.parametrize("file_path, unique_text, element_tag, image_indicator, drop_header, expected", TABLES)
+def test_tables(file_path, unique_text, element_tag, image_indicator, drop_header, expected):
+    page = read_page(read_file(file_path))
+    rows = _get_subpage_data("", "", unique_text, element_tag, image_indicator, _page=page, drop_header=drop_header)
+
+    assert rows == expected
+
+
+@pytest.mark.parametrize("file_path, unique_text, element_tag, image_indicator, drop_header, expected", TABLES)
+def test_tables_match_beautiful_soup(file_path, unique_text, element_tag, image_indicator, drop_header, expected):
+    page = read_page(read_file(file_path))
+    rows = _get_subpage_data("", "", unique_text, element_tag, image_indicator, _page=page, drop_header=drop_header)
+
+    assert rows == soup_rows(file_path, unique_text, element_tag, image_indicator, drop_header)
+
+
+def test_missing_table():
+    page = read_page(read_file(SYSTEM_PAGE))
+
+    # only in a script on the page, and in a table that is not a tablelist
+    assert _get_subpage_data("", "", "Division / Type / Research", _page=page) == []
+    assert page.FindTable("Services", "td") is None
+
+
+def test_parse_extra_dotlan_data():
+    pages = {
+        "https://dotlan.test/system/Outuni/": read_file(SYSTEM_PAGE),
+        "https://dotlan.test/system/Outuni/agents": read_file(AGENTS_PAGE),
+    }
+    fetcher = SimpleNamespace(Get=lambda url: SimpleNamespace(Content=pages[url]))
+
+    system_data = parse_extra_dotlan_data("Outuni", str(OUTUNI_ID), fetcher, "https://dotlan.test/system/")
+
+    expected = DotlanAdditionalSystemData("12", "82", "20 +1", "C", "Guristas")
+    expected.Stations = [DotlanStation(*row, System_Id=OUTUNI_ID) for row in SERVICES_ROWS]
+    expected.Agents = [
+        DotlanAgent(name, station, OUTUNI_ID, "Imperial Armaments", level, notes)
+        for station, name, level, notes in [
+            (STATION_NAMES[0], "Shafrak Seswek", "-", "- Generic Storyline Mission Agent"),
+            (STATION_NAMES[0], "Pavana Innoor", "1", "Distribution / Basic Agent"),
+            # a division of "-" is no notes
+            (STATION_NAMES[0], "Kazeli Dohrucan", "-", None),
+            (STATION_NAMES[1], "Khelirerasa Yifa", "2", "Security / Basic Agent"),
+        ]
+    ]
+    assert system_data == expected
+
+
+def test_time_page_reads():
+    timings = time_page_reads([SYSTEM_PAGE, AGENTS_PAGE], repeat=2)
+
+    assert list(timings) == [SYSTEM_PAGE, AGENTS_PAGE]
+    assert all(seconds > 0 for seconds in timings.values())
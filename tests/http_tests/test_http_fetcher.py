@@ -0,0 +1,153 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic
+from typing import Dict, List, Tuple
+
+import pytest
+
+from logic.http_fetcher import Fetcher
+from logic.parse_dotlan_system_data import parse_extra_dotlan_data
+
+
+class StubServer:
+    """
+    Serves a scripted list of (status, headers, body) responses for each path, the last one again once they run out,
+    and records every request as (path, headers, monotonic() when it arrived).
+    """
+
+    def __init__(self):
+        self.Responses: Dict[str, List[Tuple[int, Dict[str, str], bytes]]] = {}
+        self.Requests: List[Tuple[str, Dict[str, str], float]] = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.Requests.append((self.path, dict(self.headers), monotonic()))
+                    responses = stub.Responses.get(self.path, [(404, {}, b"")])
+                    status, headers, body = responses.pop(0) if len(responses) > 1 else responses[0]
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.Url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def Times(self, path: str) -> List[float]:
+        return [arrived for requested_path, _, arrived in self.Requests if requested_path == path]
+
+
+@pytest.fixture
+def server():
+    with StubServer() as stub:
+        yield stub
+
+
+def fetcher(tmp_path, **kwargs) -> Fetcher:
+    kwargs = {"RequestsPerSecond": 1000, "Burst": 100, "Backoff": 0.01, "Timeout": 5, **kwargs}
+    return Fetcher(CacheDirectory=str(tmp_path / "http_cache"), **kwargs)
+
+
+def test_unchanged_content_comes_back_from_the_cache(server, tmp_path):
+    server.Responses["/map.svg"] = [(200, {"ETag": '"v1"'}, b"<svg/>"), (304, {"ETag": '"v1"'}, b"")]
+    client = fetcher(tmp_path)
+
+    first = client.Get(f"{server.Url}/map.svg")
+    second = client.Get(f"{server.Url}/map.svg")
+
+    assert (first.Content, first.Changed) == (b"<svg/>", True)
+    assert (second.Content, second.Changed) == (b"<svg/>", False)
+    assert "If-None-Match" not in server.Requests[0][1]
+    assert server.Requests[1][1]["If-None-Match"] == '"v1"'
+
+
+def test_changed_content_is_cached_again(server, tmp_path):
+    server.Responses["/map.svg"] = [(200, {"ETag": '"v1"'}, b"old"), (200, {"ETag": '"v2"'}, b"new")]
+    client = fetcher(tmp_path)
+
+    client.Get(f"{server.Url}/map.svg")
+    second = client.Get(f"{server.Url}/map.svg")
+
+    assert (second.Content, second.Changed) == (b"new", True)
+    assert fetcher(tmp_path)._readCache(f"{server.Url}/map.svg")["etag"] == '"v2"'
+
+
+def test_too_many_requests_waits_for_retry_after(server, tmp_path):
+    server.Responses["/busy"] = [(429, {"Retry-After": "0"}, b""), (200, {}, b"done")]
+    # with its Backoff the retry would take far longer than the test allows
+    client = fetcher(tmp_path, Backoff=60)
+
+    started = monotonic()
+    result = client.Get(f"{server.Url}/busy")
+
+    assert result.Content == b"done"
+    assert len(server.Times("/busy")) == 2
+    assert monotonic() - started < 5
+
+
+def test_server_errors_back_off_exponentially(server, tmp_path):
+    server.Responses["/flaky"] = [(503, {}, b""), (502, {}, b""), (200, {}, b"done")]
+    client = fetcher(tmp_path, Backoff=0.1)
+
+    assert client.Get(f"{server.Url}/flaky").Content == b"done"
+
+    first, second, third = server.Times("/flaky")
+    assert second - first >= 0.1
+    assert third - second >= 0.2
+
+
+def test_gives_up_after_max_attempts(server, tmp_path):
+    server.Responses["/down"] = [(500, {}, b"")]
+    client = fetcher(tmp_path, MaxAttempts=3)
+
+    with pytest.raises(Exception, match="after 3 attempts"):
+        client.Get(f"{server.Url}/down")
+
+    assert len(server.Times("/down")) == 3
+
+
+def test_other_errors_are_not_retried(server, tmp_path):
+    client = fetcher(tmp_path, MaxAttempts=3)
+
+    with pytest.raises(Exception, match="404"):
+        client.Get(f"{server.Url}/missing")
+
+    assert len(server.Times("/missing")) == 1
+
+
+def test_requests_are_spaced_out_to_the_rate(server, tmp_path):
+    server.Responses.update({f"/{index}": [(200, {}, b"")] for index in range(8)})
+    client = fetcher(tmp_path, RequestsPerSecond=20, Burst=2, Workers=4)
+
+    client.GetMany(f"{server.Url}/{index}" for index in range(8))
+
+    times = sorted(arrived for _, _, arrived in server.Requests)
+    # the burst goes straight out, then one request every 1 / 20 seconds
+    assert times[1] - times[0] < 0.04
+    assert times[-1] - times[0] >= (8 - 2) / 20 * 0.9
+
+
+def test_system_pages_come_from_the_base_url(server, tmp_path):
+    server.Responses["/system/Jita/"] = [(200, {}, b"<html></html>")]
+    server.Responses["/system/Jita/agents"] = [(200, {}, b"<html></html>")]
+
+    data = parse_extra_dotlan_data("Jita", 30000142, fetcher(tmp_path), base_url=f"{server.Url}/system/")
+
+    assert sorted(path for path, _, _ in server.Requests) == ["/system/Jita/", "/system/Jita/agents"]
+    assert data.Agents == [] and data.Stations == []
@@ -0,0 +1,113 @@
+from dataclasses import fields
+from types import SimpleNamespace
+
+import numpy
+import pytest
+
+from calculate.full_map_values import CalculatedMapData, MapStats
+from models.planet_type_counts import PlanetTypeCounts
+from tests.utils_for_tests.map_fixtures import (
+    build_map_client,
+    INDUSTRY_LINKS,
+    INDUSTRY_PLANETS,
+    INDUSTRY_SECURITY,
+    INDUSTRY_SYSTEM_IDS,
+)
+
+
+def fixture_all_data(planets: dict, lazy: bool = False) -> SimpleNamespace:
+    """What CalculatedMapData (and the per system loops it replaced) read from AllData"""
+    client = build_map_client(
+        INDUSTRY_SYSTEM_IDS, INDUSTRY_LINKS, lazy=lazy, planets=planets, security=INDUSTRY_SECURITY
+    )
+    client.PLANET_TYPE_COUNTS = PlanetTypeCounts.FromMapClient(client)
+    return SimpleNamespace(
+        MapClient=client,
+        PlanetTypeCounts=client.PLANET_TYPE_COUNTS,
+        Systems=client.ALL_SYSTEMS,
+        Planets=client.ALL_PLANETS,
+        Planet_Types=client.ALL_PLANET_TYPES,
+    )
+
+
+@pytest.fixture(params=[True, False], ids=["lazy", "eager"])
+def all_data(request):
+    # H has no planets
+    return fixture_all_data({**INDUSTRY_PLANETS, "H": []}, lazy=request.param)
+
+
+def assert_stats_equal(stats: MapStats, other: MapStats):
+    for stats_field in fields(MapStats):
+        assert numpy.array_equal(getattr(stats, stats_field.name), getattr(other, stats_field.name)), stats_field.name
+
+
+def test_values_match_the_per_system_loops(all_data):
+    """The loops CalculatedMapData used to run over the map objects, leaving out systems without planets for the shares"""
+    calculated = CalculatedMapData(all_data=all_data, stats_file_path=None)
+    systems = [system for system in all_data.Systems if len(system.Planet_Ids) > 0]
+
+    planet_ids_by_type_ids = {
+        planet_type.Id: [planet.Id for planet in all_data.Planets if planet.Type_Id == planet_type.Id]
+        for planet_type in all_data.Planet_Types
+    }
+    type_share = {
+        planet_type.Id: [
+            len([planet for planet in system.GetPlanets() if planet.Type_Id == planet_type.Id]) / len(system.Planet_Ids)
+            for system in systems
+        ]
+        for planet_type in all_data.Planet_Types
+    }
+
+    assert calculated.TotalPlanets == len(all_data.Planets)
+    assert calculated.TotalSystems == len(INDUSTRY_SYSTEM_IDS)
+    assert calculated.PlanetIdsByTypeIds == planet_ids_by_type_ids
+    assert calculated.PlanetTypeAmounts == {key: len(value) for key, value in planet_ids_by_type_ids.items()}
+    assert calculated.PlanetTypesPercentage == pytest.approx(
+        {key: len(value) / len(all_data.Planets) for key, value in planet_ids_by_type_ids.items()}
+    )
+    assert calculated.AveragePlanetsPerSystem == pytest.approx(
+        numpy.average([len(system.Planet_Ids) for system in all_data.Systems])
+    )
+    assert calculated.MeanPlanetsPerSystem == pytest.approx(
+        numpy.mean([len(system.Planet_Ids) for system in all_data.Systems])
+    )
+    assert calculated.AveragePlanetTypeBySystem == pytest.approx(
+        {key: numpy.average(value) for key, value in type_share.items()}
+    )
+    assert calculated.MeanPlanetTypeBySystem == pytest.approx(
+        {key: numpy.mean(value) for key, value in type_share.items()}
+    )
+    assert calculated.MedianPlanetTypeBySystem == pytest.approx(
+        {key: numpy.median(value) for key, value in type_share.items()}
+    )
+    # every system is in the one constellation and region of the fixture map
+    assert calculated.PlanetTypeAmountsByConstellation == {20000001: calculated.PlanetTypeAmounts}
+
+
+def test_saved_stats_round_trip(all_data, tmp_path):
+    file_path = str(tmp_path / "map_stats.npz")
+    stats = MapStats.FromPlanetTypeCounts(all_data.PlanetTypeCounts, all_data.MapClient)
+    stats.Save(file_path)
+
+    loaded = MapStats.Load(file_path)
+    assert loaded.Checksum == stats.Checksum
+    assert loaded.Matches(all_data.PlanetTypeCounts)
+    assert_stats_equal(loaded, stats)
+
+
+def test_saved_stats_are_used_while_the_planets_match(all_data, tmp_path):
+    file_path = str(tmp_path / "map_stats.npz")
+    stats = CalculatedMapData(all_data=all_data, stats_file_path=file_path).Stats
+
+    # the saved stats are read back rather than worked out again
+    stats.TotalByType = stats.TotalByType + 1
+    stats.Save(file_path)
+    assert_stats_equal(CalculatedMapData(all_data=all_data, stats_file_path=file_path).Stats, stats)
+
+    # but not once a planet has moved, which is worked out again and saved over them
+    moved = fixture_all_data({**INDUSTRY_PLANETS, "H": [], "A": [11], "B": [12, 12, 14, 14, 14]})
+    assert not stats.Matches(moved.PlanetTypeCounts)
+    recalculated = CalculatedMapData(all_data=moved, stats_file_path=file_path).Stats
+    assert recalculated.Checksum != stats.Checksum
+    assert_stats_equal(recalculated, MapStats.FromPlanetTypeCounts(moved.PlanetTypeCounts, moved.MapClient))
+    assert_stats_equal(MapStats.Load(file_path), recalculated)
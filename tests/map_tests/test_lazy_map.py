@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+import pytest
+
+import models.map as mapData
+from logic.get_dotlan_maps import attach_dotlan_data
+from models.common import Position, Universe
+from models.map_snapshot import MapSnapshot
+
+# three systems in a line, linked both ways: Alpha - Beta - Gamma
+SYSTEM_IDS = {"Alpha": 30000001, "Beta": 30000002, "Gamma": 30000003}
+LINKS = [("Alpha", "Beta"), ("Beta", "Alpha"), ("Beta", "Gamma"), ("Gamma", "Beta")]
+STARGATE_IDS = {link: 50000001 + index for index, link in enumerate(LINKS)}
+
+
+def fixture_client() -> SimpleNamespace:
+    systems = [
+        SimpleNamespace(
+            Name=name,
+            Id=system_id,
+            Position=Position(X=float(system_id), Y=0.0, Z=0.0, Universe=Universe.EDEN),
+            Security_Status=0.5,
+            Constellation_Id=20000001,
+            Region_Id=10000001,
+            Planet_Ids=[],
+            Stargate_Ids=[stargate_id for (origin, _), stargate_id in STARGATE_IDS.items() if origin == name],
+        )
+        for name, system_id in SYSTEM_IDS.items()
+    ]
+    stargates = [
+        SimpleNamespace(
+            Name=f"Stargate ({destination})",
+            Id=stargate_id,
+            OriginSystem_Id=SYSTEM_IDS[origin],
+            DestinationSystem_Id=SYSTEM_IDS[destination],
+        )
+        for (origin, destination), stargate_id in STARGATE_IDS.items()
+    ]
+    return SimpleNamespace(
+        ALL_COMMODITIES=[],
+        ALL_PLANET_TYPES=[],
+        ALL_PLANETS=[],
+        ALL_STARGATES=stargates,
+        ALL_SYSTEMS=systems,
+        ALL_CONSTELLATIONS=[],
+        ALL_REGIONS=[],
+    )
+
+
+def fixture_region_data() -> dict:
+    # dotlan keys its systems by the System_Id as a string and its connections by the int, and lists each link once
+    return {
+        "systems": {str(system_id): f"dotlan {name}" for name, system_id in SYSTEM_IDS.items()},
+        "connections": {
+            SYSTEM_IDS[origin]: SimpleNamespace(
+                origin=f"{origin} end", destination=SimpleNamespace(sys_id=SYSTEM_IDS[destination], end=destination)
+            )
+            for origin, destination in [("Alpha", "Beta"), ("Beta", "Gamma")]
+        },
+    }
+
+
+@pytest.fixture(params=[True, False], ids=["lazy", "eager"])
+def map_client(request) -> mapData.MapClient:
+    client = mapData.MapClient()
+    MapSnapshot.FromMapClient(fixture_client()).Populate(client, lazy=request.param)
+    return client
+
+
+def test_attach_creates_nothing_when_lazy():
+    client = mapData.MapClient()
+    MapSnapshot.FromMapClient(fixture_client()).Populate(client, lazy=True)
+
+    attach_dotlan_data(SimpleNamespace(MapClient=client), fixture_region_data())
+
+    assert client.ALL_SYSTEMS.TotalCreated == 0
+    assert client.ALL_STARGATES.TotalCreated == 0
+
+
+def test_attach_sets_systems_and_both_stargates(map_client):
+    region_data = fixture_region_data()
+    attach_dotlan_data(SimpleNamespace(MapClient=map_client), region_data)
+
+    for name, system_id in SYSTEM_IDS.items():
+        assert map_client.Get("SYSTEMS", system_id).Dotlan == f"dotlan {name}"
+
+    connection = region_data["connections"][SYSTEM_IDS["Beta"]]
+    there = map_client.Get("STARGATES", STARGATE_IDS[("Beta", "Gamma")])
+    back = map_client.Get("STARGATES", STARGATE_IDS[("Gamma", "Beta")])
+    assert (there.DotlanOrigin, there.DotlanDestination) == (connection.origin, connection.destination)
+    assert (back.DotlanOrigin, back.DotlanDestination) == (connection.destination, connection.origin)
+
+
+def test_set_on_a_created_object_sticks(map_client):
+    system = map_client.Get("SYSTEMS", SYSTEM_IDS["Beta"])
+
+    map_client.Set("SYSTEMS", SYSTEM_IDS["Beta"], "Dotlan", "set after")
+
+    assert system.Dotlan == "set after"
+    assert map_client.Get("SYSTEMS", "Beta") is system
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+
+import models.map as mapData
+from models.common import Position, Universe
+from models.map_snapshot import MapSnapshot
+
+# Beta's stargates lead to Delta, Gamma then Alpha, but lookups come back in ALL_SYSTEMS order: Alpha, Gamma, Delta
+SYSTEM_IDS = {"Alpha": 30000004, "Beta": 30000001, "Gamma": 30000003, "Delta": 30000002}
+LINKS = [
+    ("Beta", "Delta"),
+    ("Beta", "Gamma"),
+    ("Beta", "Alpha"),
+    ("Alpha", "Beta"),
+    ("Gamma", "Beta"),
+    ("Delta", "Beta"),
+]
+STARGATE_IDS = {link: 50000001 + index for index, link in enumerate(LINKS)}
+
+
+def fixture_client() -> SimpleNamespace:
+    systems = [
+        SimpleNamespace(
+            Name=name,
+            Id=system_id,
+            Position=Position(X=0.0, Y=0.0, Z=0.0, Universe=Universe.EDEN),
+            Security_Status=0.5,
+            Constellation_Id=20000001,
+            Region_Id=10000001,
+            Planet_Ids=[],
+            Stargate_Ids=[stargate_id for (origin, _), stargate_id in STARGATE_IDS.items() if origin == name],
+        )
+        for name, system_id in SYSTEM_IDS.items()
+    ]
+    stargates = [
+        SimpleNamespace(
+            Name=f"Stargate ({destination})",
+            Id=stargate_id,
+            OriginSystem_Id=SYSTEM_IDS[origin],
+            DestinationSystem_Id=SYSTEM_IDS[destination],
+        )
+        for (origin, destination), stargate_id in STARGATE_IDS.items()
+    ]
+    return SimpleNamespace(
+        ALL_COMMODITIES=[],
+        ALL_PLANET_TYPES=[],
+        ALL_PLANETS=[],
+        ALL_STARGATES=stargates,
+        ALL_SYSTEMS=systems,
+        ALL_CONSTELLATIONS=[],
+        ALL_REGIONS=[],
+    )
+
+
+@pytest.fixture(params=[True, False], ids=["lazy", "eager"])
+def map_client(request) -> mapData.MapClient:
+    client = mapData.MapClient()
+    MapSnapshot.FromMapClient(fixture_client()).Populate(client, lazy=request.param)
+    return client
+
+
+def test_linked_systems_come_back_in_all_systems_order(map_client):
+    beta = map_client.Get("SYSTEMS", "Beta")
+
+    assert beta.LinkedSystem_Ids == [SYSTEM_IDS["Alpha"], SYSTEM_IDS["Gamma"], SYSTEM_IDS["Delta"]]
+    assert [system.Name for system in beta.GetLinkedSystems()] == ["Alpha", "Gamma", "Delta"]
+
+
+def test_get_many_is_in_all_order_once_each(map_client):
+    ids = [SYSTEM_IDS["Delta"], 1, SYSTEM_IDS["Alpha"], SYSTEM_IDS["Delta"]]
+
+    assert [system.Name for system in map_client.GetMany("SYSTEMS", ids)] == ["Alpha", "Delta"]
+    assert map_client.InOrder("SYSTEMS", ids) == [SYSTEM_IDS["Alpha"], SYSTEM_IDS["Delta"]]
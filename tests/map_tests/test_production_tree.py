@@ -0,0 +1,79 @@
+from typing import List
+
+import pytest
+
+import models.map as mapData
+from buildMapData import CreateMaps
+from logic.planetaryResources import RAW_RESOURCE_TO_TYPE, RawResources
+from logic.sde_yaml import load_yaml_entries
+from models.production_tree import ProductionTree
+
+
+@pytest.fixture(scope="module")
+def client() -> mapData.MapClient:
+    """Every commodity and planet type from the repo's SDE files, built as buildMapData.BuildMapData does"""
+    client = mapData.MapClient()
+    CreateMaps(load_yaml_entries("data/planetTypes.yaml", cache_path=None), mapData.PlanetType, client)
+    CreateMaps(load_yaml_entries("data/planetSchematics.yaml", cache_path=None), mapData.Commodity, client)
+    for value in RawResources:
+        mapData.Commodity(properties=value, client=client)
+    return client
+
+
+@pytest.fixture(scope="module")
+def tree(client) -> ProductionTree:
+    return ProductionTree.FromMapClient(client)
+
+
+def recursive_raw_resource_ids(commodity: mapData.Commodity) -> List[int]:
+    """The walk Commodity.GetRawResourceIds made before the ProductionTree, apart from a raw resource returning itself"""
+    if commodity.Tier == 0:
+        return [commodity.Id]
+
+    raw_resource_ids = []
+    for ingredient in commodity.GetIngredients():
+        if ingredient.Tier > 0:
+            raw_resource_ids.extend(recursive_raw_resource_ids(ingredient))
+        else:
+            return [ingredient.Id]
+    return raw_resource_ids
+
+
+def recursive_intermediate_ids(commodity: mapData.Commodity) -> List[int]:
+    intermediate_ids = []
+    for ingredient in commodity.GetIngredients():
+        if ingredient.Tier > 0:
+            intermediate_ids.append(ingredient.Id)
+            intermediate_ids.extend(recursive_intermediate_ids(ingredient))
+    return intermediate_ids
+
+
+def test_every_tier_is_present(client):
+    assert {commodity.Tier for commodity in client.ALL_COMMODITIES} == {0, 1, 2, 3, 4}
+
+
+def test_tree_matches_the_recursive_walk(client, tree):
+    for commodity in client.ALL_COMMODITIES:
+        raw_resource_ids = recursive_raw_resource_ids(commodity)
+
+        assert set(tree.RawResourceIdsFor(commodity.Id)) == set(raw_resource_ids), commodity.Name
+        assert len(tree.RawResourceIdsFor(commodity.Name)) == len(set(raw_resource_ids)), commodity.Name
+        assert set(tree.IntermediateIdsFor(commodity.Id)) == set(recursive_intermediate_ids(commodity)), commodity.Name
+        assert set(tree.PlanetTypeIdsFor(commodity.Id)) == {
+            type_id for raw_resource_id in raw_resource_ids for type_id in RAW_RESOURCE_TO_TYPE.get(raw_resource_id, [])
+        }, commodity.Name
+
+
+@pytest.mark.parametrize("use_tree", [False, True])
+def test_commodity_raw_resources_match_the_recursive_walk(client, tree, use_tree):
+    client.PRODUCTION_TREE = tree if use_tree else None
+    try:
+        for commodity in client.ALL_COMMODITIES:
+            raw_resource_ids = recursive_raw_resource_ids(commodity)
+
+            assert sorted(commodity.GetRawResourceIds()) == sorted(set(raw_resource_ids)), commodity.Name
+            assert sorted(raw_resource.Id for raw_resource in commodity.GetRawResources()) == sorted(
+                set(raw_resource_ids)
+            ), commodity.Name
+    finally:
+        client.PRODUCTION_TREE = None
@@ -0,0 +1,64 @@
+import numpy
+import pytest
+
+from models.stargate_graph import StargateGraph
+from tests.utils_for_tests.map_fixtures import build_map_client
+
+# listed out of ALL_SYSTEMS order, with Beta - Alpha twice and a stargate out of Gamma to a system that does not exist
+SYSTEM_IDS = {"Alpha": 30000004, "Beta": 30000001, "Gamma": 30000003, "Delta": 30000002}
+LINKS = [
+    ("Beta", "Delta"),
+    ("Beta", "Alpha"),
+    ("Beta", "Gamma"),
+    ("Beta", "Alpha"),
+    ("Alpha", "Beta"),
+    ("Gamma", "Beta"),
+    ("Gamma", "Nowhere"),
+    ("Delta", "Beta"),
+    ("Delta", "Gamma"),
+    ("Gamma", "Delta"),
+]
+
+
+@pytest.fixture(params=[True, False], ids=["lazy", "eager"])
+def map_client(request):
+    return build_map_client(SYSTEM_IDS, LINKS, lazy=request.param)
+
+
+def test_links_match_get_linked_systems(map_client):
+    graph = StargateGraph.FromMapClient(map_client)
+
+    for system in map_client.ALL_SYSTEMS:
+        assert graph.LinkedSystem_Ids(system.Id) == system.LinkedSystem_Ids
+        assert graph.LinkedSystem_Ids(system.Id) == [linked.Id for linked in system.GetLinkedSystems()]
+
+
+def test_csr_arrays(map_client):
+    graph = StargateGraph.FromMapClient(map_client)
+
+    assert graph.System_Ids.tolist() == list(SYSTEM_IDS.values())
+    # Alpha: Beta | Beta: Alpha, Gamma, Delta | Gamma: Beta, Delta | Delta: Beta, Gamma
+    assert graph.Offsets.tolist() == [0, 1, 4, 6, 8]
+    assert graph.Neighbors.tolist() == [1, 0, 2, 3, 1, 3, 1, 2]
+    assert graph.TotalLinks == 8
+    assert numpy.array_equal(graph.Degrees, [1, 3, 2, 2])
+    assert graph.Edges().tolist() == [[0, 1], [1, 2], [1, 3], [2, 3]]
+
+
+def test_saved_graph_is_loaded_while_it_matches(map_client, tmp_path):
+    file_path = str(tmp_path / "stargate_graph.npz")
+    StargateGraph.FromMapClient(map_client).Save(file_path)
+
+    loaded = StargateGraph.Load(file_path)
+    assert loaded.Matches(map_client)
+    for system_id in SYSTEM_IDS.values():
+        assert loaded.LinkedSystem_Ids(system_id) == map_client.Get("SYSTEMS", system_id).LinkedSystem_Ids
+
+    changed = build_map_client(SYSTEM_IDS, LINKS[:-1])
+    assert not loaded.Matches(changed)
+
+
+def test_graph_without_a_checksum_never_matches(map_client):
+    graph = StargateGraph.FromMapClient(map_client)
+
+    assert not StargateGraph(graph.System_Ids, graph.Offsets, graph.Neighbors).Matches(map_client)
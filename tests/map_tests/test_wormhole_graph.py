@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pytest
+
+from models.third_party.anoikis import AnokisSystem
+from models.wormhole_graph import REGION_LETTER_CLASSES, WormholeGraph
+
+# (constellation, system name, statics). The first letter of the constellation is the class, see REGION_LETTER_CLASSES
+WORMHOLES = [
+    ("A-C00001", "J100001", "c5"),
+    ("B-C00002", "J200001", "c1/hs"),
+    ("C-C00003", "J300001", "c5"),
+    ("E-C00005", "J500001", "c5"),
+    ("E-C00005", "J500002", "ns"),
+    ("F-C00006", "J600001", "c6"),
+]
+SYSTEM_IDS = {name: 31000001 + index for index, (_, name, _) in enumerate(WORMHOLES)}
+
+
+@pytest.fixture
+def graph(tmp_path) -> WormholeGraph:
+    file_path = tmp_path / "wormholes.csv"
+    file_path.write_text("".join(f"{constellation}, {name}\n" for constellation, name, _ in WORMHOLES) + "\n")
+    client = SimpleNamespace(
+        NAME_INDEX={"SYSTEMS": {name: SimpleNamespace(Id=system_id) for name, system_id in SYSTEM_IDS.items()}}
+    )
+    anoikis = {
+        SYSTEM_IDS[name]: AnokisSystem(
+            name, REGION_LETTER_CLASSES[constellation[0]].lower(), statics, None, System_Id=SYSTEM_IDS[name]
+        )
+        for constellation, name, statics in WORMHOLES
+    }
+    return WormholeGraph.FromData(client, anoikis, file_path=str(file_path))
+
+
+def ids(*names: str):
+    return [SYSTEM_IDS[name] for name in names]
+
+
+def test_classes_are_grouped(graph):
+    assert graph.TotalSystems == len(WORMHOLES)
+    assert graph.SystemsOfClass("C5") == ids("J500001", "J500002")
+    assert graph.SystemsOfClass("C4") == []
+
+
+def test_reachable_through_statics_both_ways(graph):
+    # out through the C1's static to every C5, and back down the C2's static to C1
+    assert graph.Reachable(SYSTEM_IDS["J100001"], 1) == ids("J200001", "J500001", "J500002")
+    # then on to the C3, whose static leads to C5
+    assert graph.Reachable(SYSTEM_IDS["J100001"], 2) == ids("J200001", "J300001", "J500001", "J500002")
+
+
+def test_reachable_with_a_static(graph):
+    assert graph.Reachable(SYSTEM_IDS["J100001"], 1, ["C5"]) == ids("J500001")
+    assert graph.Reachable(SYSTEM_IDS["J100001"], 2, ["C5"]) == ids("J300001", "J500001")
+    assert graph.Reachable(SYSTEM_IDS["J100001"], 2, ["c5", "NS"]) == ids("J300001", "J500001", "J500002")
+
+
+def test_unlinked_class_is_never_reached(graph):
+    assert graph.Reachable(SYSTEM_IDS["J600001"], 3) == []
+    assert SYSTEM_IDS["J600001"] not in graph.Reachable(SYSTEM_IDS["J100001"], 5)
@@ -0,0 +1,66 @@
+import os
+from itertools import islice
+
+import pytest
+import yaml
+
+import logic.sde_yaml
+from logic.sde_yaml import iter_yaml_entries, load_yaml_entries, SafeLoader
+
+YAML_FILES = [
+    "data/constellations.en-us.yaml",
+    "data/planetSchematics.yaml",
+    "data/planetTypes.yaml",
+    "data/regions.en-us.yaml",
+    "data/stargates.en-us.yaml",
+]
+
+
+def whole_document_entries(file_name: str) -> list:
+    with open(file_name, "r", encoding="utf-8", errors="ignore") as file:
+        document = yaml.load(file, Loader=SafeLoader)
+    return list(document.values()) if isinstance(document, dict) else list(document)
+
+
+def cache_files(cache_path) -> list:
+    return sorted(os.listdir(cache_path)) if os.path.exists(cache_path) else []
+
+
+@pytest.mark.parametrize("file_name", YAML_FILES)
+def test_entries_match_loading_the_whole_document(file_name, tmp_path):
+    expected = whole_document_entries(file_name)
+
+    assert list(iter_yaml_entries(file_name)) == expected
+    # parsed and cached, then read back from the cache
+    assert list(load_yaml_entries(file_name, cache_path=str(tmp_path))) == expected
+    assert len(cache_files(tmp_path)) == 1
+    assert list(load_yaml_entries(file_name, cache_path=str(tmp_path))) == expected
+
+
+def test_partly_read_entries_are_not_cached(tmp_path):
+    file_name = "data/planetTypes.yaml"
+    entries = load_yaml_entries(file_name, cache_path=str(tmp_path))
+    first = list(islice(entries, 2))
+    entries.close()
+
+    assert len(first) == 2
+    assert cache_files(tmp_path) == []
+    assert list(load_yaml_entries(file_name, cache_path=str(tmp_path))) == whole_document_entries(file_name)
+
+
+def test_interrupted_cache_write_is_not_reused(tmp_path, monkeypatch):
+    file_name = "data/planetTypes.yaml"
+
+    def interrupted_dump(entries, file, protocol):
+        file.write(b"\x80\x05 not all of it")
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(logic.sde_yaml, "dump", interrupted_dump)
+    with pytest.raises(KeyboardInterrupt):
+        list(load_yaml_entries(file_name, cache_path=str(tmp_path)))
+    monkeypatch.undo()
+
+    assert not any(name.endswith(".pickle") for name in cache_files(tmp_path))
+    assert list(load_yaml_entries(file_name, cache_path=str(tmp_path))) == whole_document_entries(file_name)
+    # the next complete read replaces what was left over
+    assert [name.endswith(".pickle") for name in cache_files(tmp_path)] == [True]
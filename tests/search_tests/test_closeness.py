@@ -0,0 +1,84 @@
+import pytest
+
+from calculateCloseness import MISSING_PLANET_TYPE_WEIGHT, NearestPlanetTypes
+from models.planet_type_counts import PlanetTypeCounts
+from models.stargate_graph import StargateGraph
+from tests.utils_for_tests.map_fixtures import build_map_client
+
+# rows in this order. Near is 2 jumps from Site2 (through X) and from Site0 (through Y), and Mid is 1 jump from both
+SYSTEM_IDS = {
+    name: 30000001 + row
+    for row, name in enumerate(["Site0", "X", "Site2", "Y", "Near", "Far", "Lone", "Mid", "Island"])
+}
+LINKS = [
+    (origin, destination)
+    for a, b in [("X", "Site2"), ("Y", "Site0"), ("Near", "X"), ("Near", "Y"), ("Far", "Near"), ("Lone", "Far")]
+    + [("Mid", "Site2"), ("Mid", "Site0")]
+    for origin, destination in [(a, b), (b, a)]
+]
+PLANETS = {"Site0": [11, 12, 12], "Site2": [11], "Lone": [13], "Island": [14]}
+PLANET_TYPE_IDS = [11, 12, 13, 14]
+ROWS = {name: row for row, name in enumerate(SYSTEM_IDS)}
+
+
+@pytest.fixture(scope="module", params=[True, False], ids=["lazy", "eager"])
+def map_client(request):
+    return build_map_client(SYSTEM_IDS, LINKS, lazy=request.param, planets=PLANETS)
+
+
+def nearest(map_client, max_jumps: int) -> NearestPlanetTypes:
+    return NearestPlanetTypes.Calculate(
+        StargateGraph.FromMapClient(map_client), PlanetTypeCounts.FromMapClient(map_client), PLANET_TYPE_IDS, max_jumps
+    )
+
+
+def test_closest_sites(map_client):
+    found = nearest(map_client, 3)
+
+    # Site0 X Site2 Y Near Far Lone Mid Island, by planet type
+    assert found.Jumps.T.tolist() == [
+        [0, 1, 0, 1, 2, -1, -1, 1, -1],
+        [0, -1, 2, 1, 2, -1, -1, 1, -1],
+        [-1, -1, -1, -1, 2, 1, 0, -1, -1],
+        [-1, -1, -1, -1, -1, -1, -1, -1, 0],
+    ]
+    assert found.Sites.T.tolist() == [
+        [0, 2, 2, 0, 0, -1, -1, 0, -1],
+        [0, -1, 0, 0, 0, -1, -1, 0, -1],
+        [-1, -1, -1, -1, 6, 6, 6, -1, -1],
+        [-1, -1, -1, -1, -1, -1, -1, -1, 8],
+    ]
+    assert found.Planets[ROWS["Near"]].tolist() == [1, 2, 1, 0]
+
+
+def test_ties_go_to_the_lowest_row(map_client):
+    found = nearest(map_client, 3)
+
+    # Near is reached through X (row 1, from Site2) before Y (row 3, from Site0)
+    assert found.Sites[ROWS["Mid"], 0] == ROWS["Site0"]
+    assert found.Sites[ROWS["Near"], 0] == ROWS["Site0"]
+
+
+def test_only_systems_fewer_than_max_jumps_away_are_found(map_client):
+    far = ROWS["Far"]
+
+    assert nearest(map_client, 3).Jumps[far, 0] == -1
+    assert nearest(map_client, 4).Jumps[far, 0] == 3
+    assert nearest(map_client, 4).Sites[far, 0] == ROWS["Site0"]
+    assert nearest(map_client, 1).Jumps.max() == 0
+
+
+def test_shared_site_jump_weight_is_counted_once(map_client):
+    found = nearest(map_client, 3)
+    near = ROWS["Near"]
+
+    # Site0: one jump weight 1000, 2 types 200, 3 planets 30. Lone: 1000, 100, 10. Type 14 missing: -1
+    assert found.TotalWeights()[near] == 1230 + 1110 - 1
+
+    totals = found.TotalWeights().tolist()
+    for row in range(len(SYSTEM_IDS)):
+        factors, missing = found.WeightFactorsFor(row, map_client)
+        assert totals[row] == sum(factor.Weight for factor in factors) + len(missing) * MISSING_PLANET_TYPE_WEIGHT
+    factors, missing = found.WeightFactorsFor(near, map_client)
+    assert [(factor.SystemName, factor.JumpsFromSource) for factor in factors] == [("Site0", 2), ("Lone", 2)]
+    assert missing == [14]
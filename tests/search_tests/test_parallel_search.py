@@ -0,0 +1,141 @@
+import pickle
+from random import Random
+
+import pytest
+
+from calculate.audit_log import AuditLog
+from calculate.parallel_search import CompactSystem, RunAllParallel, RunBatchParallel
+from calculate.planetary_industry import PlanetaryIndustryResult, PlanetaryIndustryWeightFactor
+from calculate.search_map import RunBatch, WeightCalculator
+from models.common import AuditLevel, WeightMethod
+from models.planet_type_counts import PlanetTypeCounts
+from models.stargate_graph import StargateGraph
+from tests.utils_for_tests.map_fixtures import build_industry_map_client
+
+WEIGHTS = dict(JumpWeight=50, TypeDensityWeight=50, TypeDiversityWeight=25, SecurityWeight=50)
+# every origin that finds everything weighs 0, so they all tie
+TIED_WEIGHTS = dict(JumpWeight=0, TypeDensityWeight=0, TypeDiversityWeight=0, SecurityWeight=0)
+
+
+@pytest.fixture(
+    scope="module",
+    params=[(True, True), (True, False), (False, False)],
+    ids=["lazy-type-counts", "lazy", "eager"],
+)
+def map_client(request):
+    lazy, type_counts = request.param
+    client = build_industry_map_client(lazy=lazy)
+    if type_counts:
+        client.PLANET_TYPE_COUNTS = PlanetTypeCounts.FromMapClient(client)
+    return client
+
+
+@pytest.fixture(scope="module")
+def graph(map_client):
+    return StargateGraph.FromMapClient(map_client)
+
+
+@pytest.fixture(scope="module")
+def origin_systems(map_client):
+    # not in ALL_SYSTEMS order, so the merge order shows
+    origins = list(map_client.ALL_SYSTEMS)
+    Random(7).shuffle(origins)
+    return origins
+
+
+def build_calculator(graph, desired=(11, 12, 13), weights: dict = WEIGHTS, **kwargs) -> WeightCalculator:
+    return WeightCalculator(
+        PlanetaryIndustryWeightFactor(PlanetTypesDesired=list(desired), **weights),
+        PlanetaryIndustryResult,
+        MustFindTargets=set(desired),
+        MaxJumps=2,
+        Graph=graph,
+        Audit=AuditLog(Level=AuditLevel.FULL),
+        **kwargs,
+    )
+
+
+def as_tuples(all_results):
+    return [
+        (origin_id, weight, [result.AsTuple() for result in results.values()])
+        for origin_id, (weight, results) in all_results.items()
+    ]
+
+
+def assert_runs_match(parallel, parallel_results, in_process, in_process_results):
+    assert as_tuples(parallel_results) == as_tuples(in_process_results)
+    assert parallel.TopWeight == in_process.TopWeight
+    assert list(parallel.TopDetails) == list(in_process.TopDetails)
+    for origin_id in in_process_results:
+        assert parallel.GetLogs(origin_id) == in_process.GetLogs(origin_id)
+
+
+@pytest.mark.parametrize("weights", [WEIGHTS, TIED_WEIGHTS], ids=["weighed", "tied"])
+@pytest.mark.parametrize(
+    "top", [{}, {"TopCount": 3}, {"TopCount": 3, "CompactTop": True}], ids=["all", "top", "compact"]
+)
+def test_run_all_parallel_matches_run_all(graph, origin_systems, weights, top):
+    in_process = build_calculator(graph, weights=weights, **top)
+    in_process_results = in_process.RunAll(origin_systems)
+
+    parallel = build_calculator(graph, weights=weights, **top)
+    parallel_results = RunAllParallel(parallel, origin_systems, workers=2)
+
+    assert_runs_match(parallel, parallel_results, in_process, in_process_results)
+    for origin_id, (_, results) in parallel_results.items():
+        assert all(isinstance(result, PlanetaryIndustryResult) for result in results.values())
+        assert all(result.OriginSystem.Id == origin_id for result in results.values())
+
+
+def test_ties_are_kept_in_origin_order(graph, origin_systems):
+    parallel = build_calculator(graph, weights=TIED_WEIGHTS, TopCount=3)
+    all_results = RunAllParallel(parallel, origin_systems, workers=2)
+
+    complete = [system.Id for system in origin_systems if all_results[system.Id][0] == 0]
+    assert len(complete) > 3
+    assert list(parallel.TopDetails) == complete[:3]
+
+    everything = build_calculator(graph, weights=TIED_WEIGHTS)
+    everything.MergeRuns(origin_systems, all_results)
+    assert list(everything.TopDetails) == complete
+
+
+@pytest.mark.parametrize("method", [WeightMethod.AVERAGE, WeightMethod.TOTAL])
+def test_run_batch_parallel_matches_run_batch(graph, origin_systems, method):
+    def calculators():
+        return {
+            "all": build_calculator(graph),
+            "alike": build_calculator(graph),
+            "two": build_calculator(graph, desired=(11, 12), TopCount=2),
+            "far": build_calculator(graph, desired=(12, 14), weights=TIED_WEIGHTS),
+        }
+
+    in_process = calculators()
+    in_process_results = RunBatch(in_process, origin_systems, method=method)
+
+    parallel = calculators()
+    parallel_results = RunBatchParallel(parallel, origin_systems, method=method, workers=2)
+
+    assert list(parallel_results) == list(in_process_results)
+    for key in in_process:
+        assert_runs_match(parallel[key], parallel_results[key], in_process[key], in_process_results[key])
+
+
+def test_compact_systems_round_trip(map_client):
+    compact_systems = CompactSystem.AllFromMapClient(map_client)
+
+    assert list(compact_systems) == [system.Id for system in map_client.ALL_SYSTEMS]
+    for system in map_client.ALL_SYSTEMS:
+        compact_system = compact_systems[system.Id]
+        assert compact_system == CompactSystem.FromSystem(system)
+        assert (compact_system.Name, compact_system.PlanetTypeCounts, compact_system.Security_Status) == (
+            system.Name,
+            system.PlanetTypeCounts,
+            system.Security_Status,
+        )
+    assert pickle.loads(pickle.dumps(compact_systems)) == compact_systems
+
+
+def test_needs_a_graph(origin_systems):
+    with pytest.raises(ValueError):
+        RunAllParallel(build_calculator(None), origin_systems, workers=2)
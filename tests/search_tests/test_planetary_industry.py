@@ -0,0 +1,91 @@
+import pytest
+
+from calculate.audit_log import AuditLog
+from calculate.planetary_industry import (
+    PlanetaryIndustryComponents,
+    PlanetaryIndustryResult,
+    PlanetaryIndustryWeightFactor,
+)
+from calculate.search_map import WeightCalculator
+from models.common import AuditLevel, SecurityStatus, WeightMethod
+from tests.utils_for_tests.map_fixtures import build_industry_map_client
+
+DESIRED = [11, 12, 13]
+FIRST_WEIGHTS = dict(
+    JumpWeight=50,
+    TypeDensityWeight=50,
+    TypeDiversityWeight=25,
+    SecurityWeight=50,
+    SecurityPreference=SecurityStatus.HIGH_SEC,
+)
+OTHER_WEIGHTS = [
+    dict(JumpWeight=500, TypeDiversityWeight=100, TypeDensityWeight=10, UseAverageDensity=False, SecurityWeight=20),
+    dict(JumpWeight=-30, TypeDensityWeight=70, SecurityWeight=15, SecurityPreference=SecurityStatus.LOW_SEC),
+    dict(JumpWeight=10, TypeDiversityWeight=0, SecurityWeight=40, SecurityPreference=SecurityStatus.NULL_SEC),
+]
+
+
+@pytest.fixture(scope="module", params=[True, False], ids=["lazy", "eager"])
+def map_client(request):
+    return build_industry_map_client(lazy=request.param)
+
+
+def run_all(map_client, weights: dict, method: WeightMethod = WeightMethod.AVERAGE, max_jumps: int = 2):
+    calculator = WeightCalculator(
+        PlanetaryIndustryWeightFactor(PlanetTypesDesired=list(DESIRED), **weights),
+        PlanetaryIndustryResult,
+        MustFindTargets=set(DESIRED),
+        MaxJumps=max_jumps,
+        Audit=AuditLog(Level=AuditLevel.OFF),
+    )
+    return calculator.WeightFactors, calculator.RunAll(map_client.ALL_SYSTEMS, method=method)
+
+
+@pytest.mark.parametrize("weights", OTHER_WEIGHTS)
+@pytest.mark.parametrize("method", [WeightMethod.AVERAGE, WeightMethod.TOTAL])
+def test_rescore_matches_a_new_run(map_client, weights, method):
+    first_factors, first_results = run_all(map_client, FIRST_WEIGHTS, method)
+    components = PlanetaryIndustryComponents.FromResults(map_client, first_factors, first_results)
+
+    other_factors, other_results = run_all(map_client, weights, method)
+
+    assert components.Rescore(other_factors, method) == {
+        origin_id: weight for origin_id, (weight, _) in other_results.items()
+    }
+    # some origins cannot find every type in 2 jumps
+    assert -1 in components.Rescore(other_factors, method).values()
+    assert not components.Complete.all()
+
+
+@pytest.mark.parametrize("weights", OTHER_WEIGHTS)
+def test_system_weights_match_the_results_of_a_new_run(map_client, weights):
+    first_factors, first_results = run_all(map_client, FIRST_WEIGHTS)
+    components = PlanetaryIndustryComponents.FromResults(map_client, first_factors, first_results)
+
+    other_factors, other_results = run_all(map_client, weights)
+    totals, individual_weights = components.SystemWeights(other_factors)
+
+    expected = [
+        (system_id, result.JumpsFromOrigin, result.Weight, result.IndividualWeights)
+        for _, results in other_results.values()
+        for system_id, result in results.items()
+    ]
+    assert len(expected) == len(components.System_Ids)
+    assert sorted(
+        zip(
+            components.System_Ids.tolist(),
+            components.Jumps.tolist(),
+            totals.tolist(),
+            [tuple(row) for row in individual_weights.tolist()],
+        )
+    ) == sorted(expected)
+
+
+def test_other_targets_need_a_new_run(map_client):
+    first_factors, first_results = run_all(map_client, FIRST_WEIGHTS)
+    components = PlanetaryIndustryComponents.FromResults(map_client, first_factors, first_results)
+
+    with pytest.raises(ValueError):
+        components.Rescore(PlanetaryIndustryWeightFactor(PlanetTypesDesired=[11, 12], MaxJumps=2))
+    with pytest.raises(ValueError):
+        components.Rescore(PlanetaryIndustryWeightFactor(PlanetTypesDesired=list(DESIRED), MaxJumps=3))
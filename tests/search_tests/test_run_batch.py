@@ -0,0 +1,91 @@
+import pytest
+
+import calculate.search_map as search_map
+from calculate.audit_log import AuditLog
+from calculate.planetary_industry import PlanetaryIndustryResult, PlanetaryIndustryWeightFactor
+from calculate.search_map import RunBatch, WeightCalculator
+from models.common import AuditLevel, SearchMethod, WeightMethod
+from models.stargate_graph import StargateGraph
+from tests.utils_for_tests.map_fixtures import build_industry_map_client
+
+# by commodity. "alike" searches the same as "all", and "deep" reaches further than the others.
+TARGETS = {
+    "all": ((11, 12, 13), 2),
+    "alike": ((11, 12, 13), 2),
+    "two": ((11, 12), 2),
+    "rare": ((12, 14), 2),
+    "deep": ((11, 12, 13, 14), 3),
+}
+
+
+@pytest.fixture(scope="module", params=[True, False], ids=["lazy", "eager"])
+def map_client(request):
+    return build_industry_map_client(lazy=request.param)
+
+
+def build_calculators(graph, search: SearchMethod):
+    return {
+        key: WeightCalculator(
+            PlanetaryIndustryWeightFactor(PlanetTypesDesired=list(desired), JumpWeight=50, SecurityWeight=20),
+            PlanetaryIndustryResult,
+            MustFindTargets=set(desired),
+            MaxJumps=max_jumps,
+            Search=search,
+            Graph=graph,
+            Audit=AuditLog(Level=AuditLevel.FULL),
+            TopCount=2 if key == "two" else None,
+        )
+        for key, (desired, max_jumps) in TARGETS.items()
+    }
+
+
+def as_tuples(all_results):
+    return [
+        (origin_id, weight, [result.AsTuple() for result in results.values()])
+        for origin_id, (weight, results) in all_results.items()
+    ]
+
+
+@pytest.mark.parametrize("search", [SearchMethod.BREADTH_FIRST, SearchMethod.DEPTH_FIRST])
+@pytest.mark.parametrize("use_graph", [True, False], ids=["graph", "systems"])
+@pytest.mark.parametrize("method", [WeightMethod.AVERAGE, WeightMethod.TOTAL])
+def test_batch_matches_single_runs(map_client, search, use_graph, method):
+    graph = StargateGraph.FromMapClient(map_client) if use_graph else None
+    origin_systems = list(reversed(map_client.ALL_SYSTEMS))
+
+    batch = build_calculators(graph, search)
+    batch_results = RunBatch(batch, origin_systems, method=method)
+
+    single = build_calculators(graph, search)
+    assert list(batch_results) == list(single)
+    for key, calculator in single.items():
+        single_results = calculator.RunAll(origin_systems, method=method)
+
+        assert as_tuples(batch_results[key]) == as_tuples(single_results)
+        assert batch[key].TopWeight == calculator.TopWeight
+        assert list(batch[key].TopDetails) == list(calculator.TopDetails)
+        for origin_system in origin_systems:
+            assert batch[key].GetLogs(origin_system.Id) == calculator.GetLogs(origin_system.Id)
+
+
+def test_neighborhoods_are_walked_one_origin_at_a_time(map_client, monkeypatch):
+    calls = []
+    around = search_map.Neighborhood.Around.__func__
+    run = WeightCalculator.Run
+
+    def record_around(cls, origin_system, *args):
+        calls.append(("walk", origin_system.Name))
+        return around(cls, origin_system, *args)
+
+    def record_run(self, origin_system, *args, **kwargs):
+        calls.append(("run", origin_system.Name))
+        return run(self, origin_system, *args, **kwargs)
+
+    monkeypatch.setattr(search_map.Neighborhood, "Around", classmethod(record_around))
+    monkeypatch.setattr(WeightCalculator, "Run", record_run)
+
+    origin_systems = map_client.ALL_SYSTEMS[:3]
+    RunBatch(build_calculators(None, SearchMethod.BREADTH_FIRST), origin_systems)
+
+    # "alike" is not run, it is given the results of "all"
+    assert calls == [call for system in origin_systems for call in [("walk", system.Name)] + [("run", system.Name)] * 4]
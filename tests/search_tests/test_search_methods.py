@@ -0,0 +1,212 @@
+from dataclasses import dataclass, field
+from random import Random
+from typing import Dict, List, Set
+
+import numpy
+import pytest
+
+from calculate.audit_log import AuditLog
+from calculate.search_map import _keysIn, WeightCalculator
+from models.common import AuditLevel, iWeightFactor, iWeightResult, SearchMethod, WeightMethod
+
+
+@dataclass
+class FixtureSystem:
+    Id: int
+    Name: str
+    Value: int
+    Types: Set[str]
+    Links: List["FixtureSystem"] = field(default_factory=list, repr=False)
+
+    def GetLinkedSystems(self, cache: bool = False) -> List["FixtureSystem"]:
+        return self.Links
+
+
+@dataclass
+class FixtureWeightFactor(iWeightFactor):
+    def DetermineSystemWeight(self, system, jumps_from_source):
+        weight = system.Value * 10 - jumps_from_source
+        return weight, (system.Value, jumps_from_source), set(system.Types)
+
+
+@dataclass
+class FixtureWeightResult(iWeightResult):
+    def Populate(self, current_system, origin_system, jumps_from_source, weight):
+        self.System_Id = current_system.Id
+        self.Jumps = jumps_from_source
+        self.Weight = weight[0]
+        self.SortValue = weight[0]
+        return self
+
+
+def build_map(types: Dict[int, Set[str]], links: List[tuple]) -> Dict[int, FixtureSystem]:
+    """Systems with Id/Value from the keys of types, linked both ways by the (Id, Id) pairs of links"""
+    systems = {
+        system_id: FixtureSystem(system_id, f"S{system_id}", system_id, found) for system_id, found in types.items()
+    }
+    for a, b in links:
+        systems[a].Links.append(systems[b])
+        systems[b].Links.append(systems[a])
+    return systems
+
+
+def run(systems: Dict[int, FixtureSystem], origin_id: int, targets: Set[str], search: SearchMethod, max_jumps: int = 3):
+    calculator = WeightCalculator(
+        FixtureWeightFactor(),
+        FixtureWeightResult,
+        MustFindTargets=targets,
+        MaxJumps=max_jumps,
+        Search=search,
+        Audit=AuditLog(Level=AuditLevel.OFF),
+    )
+    weight, results = calculator.Run(systems[origin_id], method=WeightMethod.TOTAL)
+    return weight, {system_id: (result.Jumps, result.Weight) for system_id, result in results.items()}
+
+
+# Maps without loops, so the answer does not depend on the order stargates are listed in (see WeightCalculator.Search)
+MAPS = {
+    "chain": (
+        {1: set(), 2: {"a"}, 3: set(), 4: {"b"}, 5: {"a", "b"}},
+        [(1, 2), (2, 3), (3, 4), (4, 5)],
+    ),
+    "tree": (
+        {1: set(), 2: {"a"}, 3: set(), 4: {"b"}, 5: {"b"}, 6: {"c"}, 7: set(), 8: {"a", "c"}, 9: {"c"}},
+        [(1, 2), (1, 3), (2, 4), (2, 5), (3, 6), (3, 7), (6, 8), (4, 9)],
+    ),
+    "star": (
+        {1: set(), 2: {"a"}, 3: {"a"}, 4: {"a", "b"}, 5: {"b"}, 6: {"b"}},
+        [(1, 2), (1, 3), (1, 4), (2, 5), (3, 6)],
+    ),
+}
+
+CASES = [
+    ("chain", 1, {"a"}),
+    ("chain", 1, {"a", "b"}),
+    ("chain", 3, {"a", "b"}),
+    ("chain", 1, {"c"}),
+    ("tree", 1, {"a"}),
+    ("tree", 1, {"b", "c"}),
+    ("tree", 1, {"a", "c"}),
+    ("tree", 2, {"a", "b", "c"}),
+    ("tree", 7, {"c"}),
+    ("star", 1, {"a"}),
+    ("star", 1, {"a", "b"}),
+    ("star", 5, {"a", "b"}),
+    ("star", 5, {"b"}),
+]
+
+
+@pytest.mark.parametrize("map_name, origin_id, targets", CASES)
+def test_depth_and_breadth_first_agree(map_name, origin_id, targets):
+    systems = build_map(*MAPS[map_name])
+
+    depth_first = run(systems, origin_id, targets, SearchMethod.DEPTH_FIRST)
+    breadth_first = run(systems, origin_id, targets, SearchMethod.BREADTH_FIRST)
+
+    assert breadth_first == depth_first
+
+
+def test_unreachable_targets_weigh_minus_one():
+    systems = build_map(*MAPS["chain"])
+
+    for search in SearchMethod:
+        assert run(systems, 1, {"c"}, search) == (-1, {})
+        # the only b is 3 jumps out
+        assert run(systems, 1, {"b"}, search, max_jumps=2) == (-1, {})
+
+
+def test_paths_stop_once_complete():
+    systems = build_map(*MAPS["chain"])
+
+    for search in SearchMethod:
+        weight, results = run(systems, 1, {"a"}, search)
+        # 2 has the a, so 3 and beyond are never part of the path
+        assert results == {1: (0, 10), 2: (1, 19)}
+        assert weight == pytest.approx(2.9)
+
+
+def test_default_search_is_breadth_first():
+    assert WeightCalculator(FixtureWeightFactor(), FixtureWeightResult).Search == SearchMethod.BREADTH_FIRST
+
+
+def shortest_path_results(systems: Dict[int, FixtureSystem], origin_id: int, targets: Set[str], max_jumps: int = 3):
+    """
+    What BREADTH_FIRST should find, by walking every shortest path from the origin one at a time: a system is kept if it
+    is on a path that finds exactly the targets, with the path stopping as soon as it has.
+    """
+    jumps = {origin_id: 0}
+    level = [origin_id]
+    while level:
+        next_level = []
+        for system_id in level:
+            for linked in systems[system_id].Links:
+                if linked.Id not in jumps:
+                    jumps[linked.Id] = jumps[system_id] + 1
+                    next_level.append(linked.Id)
+        level = next_level
+
+    kept = set()
+
+    def walk(path: List[int], found: Set[str]):
+        found = found | systems[path[-1]].Types
+        if found == targets:
+            kept.update(path)
+        elif len(path) <= max_jumps:
+            for linked in systems[path[-1]].Links:
+                if jumps[linked.Id] == len(path):
+                    walk(path + [linked.Id], found)
+
+    walk([origin_id], set())
+    if not kept:
+        return -1, {}
+    results = {system_id: (jumps[system_id], system_id * 10 - jumps[system_id]) for system_id in kept}
+    return pytest.approx(numpy.floor(sum(weight for _, weight in results.values()) * 10) / 100), results
+
+
+def test_breadth_first_on_a_loop():
+    # 1 - 2 - 4 and 1 - 3 - 4: only the way through 2 finds the b
+    systems = build_map({1: set(), 2: {"b"}, 3: set(), 4: {"a"}}, [(1, 2), (1, 3), (2, 4), (3, 4)])
+
+    weight, results = run(systems, 1, {"a", "b"}, SearchMethod.BREADTH_FIRST)
+    assert results == {1: (0, 10), 2: (1, 19), 4: (2, 38)}
+    assert weight == pytest.approx(6.7)
+
+    # the depth first walk reaches 4 again through 3, where that path does not find the b, so it drops 4 - and 2 along
+    # with it, as a link out of 4 that did not complete anything
+    assert run(systems, 1, {"a", "b"}, SearchMethod.DEPTH_FIRST)[1] == {1: (0, 10)}
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_breadth_first_keeps_every_completing_shortest_path_on_looped_maps(seed):
+    random = Random(seed)
+    size = random.randint(4, 12)
+    types = {system_id: set(random.sample("abcd", random.randint(0, 2))) for system_id in range(1, size + 1)}
+    # a random tree, with loops added on top
+    links = {(random.randint(1, system_id - 1), system_id) for system_id in range(2, size + 1)}
+    links |= {tuple(random.sample(range(1, size + 1), 2)) for _ in range(random.randint(1, size))}
+    systems = build_map(types, sorted(links))
+    targets = set(random.sample("abc", random.randint(1, 3)))
+    origin_id = random.randint(1, size)
+
+    expected = shortest_path_results(systems, origin_id, targets)
+    assert run(systems, origin_id, targets, SearchMethod.BREADTH_FIRST) == expected
+
+    # the order the stargates are listed in makes no difference
+    for system in systems.values():
+        random.shuffle(system.Links)
+    assert run(systems, origin_id, targets, SearchMethod.BREADTH_FIRST) == expected
+
+
+def test_path_key_sets_match_python_sets():
+    calculator = WeightCalculator(FixtureWeightFactor(), FixtureWeightResult, MustFindTargets={"a", "b", "c"})
+    calculator._setTargets()
+    all_keys = range(calculator._otherBit * 2)
+    random = Random(3)
+
+    for _ in range(200):
+        paths = set(random.sample(all_keys, random.randint(0, 6)))
+        as_integer = sum(1 << key for key in paths)
+        key = random.choice(all_keys)
+
+        assert set(_keysIn(calculator._orInto(as_integer, key))) == {path | key for path in paths}
+        assert set(_keysIn(calculator._orFrom(as_integer, key))) == {path for path in all_keys if path | key in paths}
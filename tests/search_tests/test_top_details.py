@@ -0,0 +1,51 @@
+from calculate.audit_log import AuditLog
+from calculate.search_map import WeightCalculator
+from models.common import AuditLevel, SearchMethod, WeightMethod
+from tests.search_tests.test_search_methods import build_map, FixtureWeightFactor, FixtureWeightResult, MAPS
+
+
+def calculator(**kwargs) -> WeightCalculator:
+    return WeightCalculator(
+        FixtureWeightFactor(),
+        FixtureWeightResult,
+        MustFindTargets={"c"},
+        Search=SearchMethod.BREADTH_FIRST,
+        Audit=AuditLog(Level=AuditLevel.OFF),
+        **kwargs,
+    )
+
+
+def test_top_count_details_are_best_first():
+    systems = build_map(*MAPS["tree"])
+    top = calculator(TopCount=2)
+    every = calculator()
+
+    all_results = {}
+    for origin_system in systems.values():
+        all_results[origin_system.Id] = top.Run(origin_system, method=WeightMethod.TOTAL)
+        every.Run(origin_system, method=WeightMethod.TOTAL)
+
+    ranked = sorted(
+        (origin_id for origin_id, (weight, _) in all_results.items() if weight >= 0),
+        key=lambda origin_id: all_results[origin_id][0],
+        reverse=True,
+    )
+    assert list(top.TopDetails) == ranked[:2]
+    assert top.TopDetails[ranked[0]] is all_results[ranked[0]][1]
+    assert top.TopWeight == all_results[ranked[0]][0]
+    # without TopCount, only the origins that tie for the top weight
+    assert list(every.TopDetails) == [ranked[0]]
+
+
+def test_top_count_details_follow_merged_runs():
+    systems = build_map(*MAPS["tree"])
+    origin_systems = list(systems.values())
+    runner = calculator(TopCount=3)
+    all_results = runner.RunAll(origin_systems, method=WeightMethod.TOTAL)
+
+    merged = calculator(TopCount=3)
+    merged.MergeRuns(origin_systems, all_results)
+
+    assert list(merged.TopDetails) == list(runner.TopDetails)
+    merged.ClearAll()
+    assert merged.TopDetails == {}
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+
+import models.map as mapData
+from models.common import Position, Universe
+from models.map_snapshot import MapSnapshot
+
+
+def build_map_client(
+    system_ids: Dict[str, int],
+    links: List[Tuple[str, str]],
+    lazy: bool = False,
+    first_stargate_id: int = 50000001,
+    planets: Dict[str, List[int]] = None,
+    security: Dict[str, float] = None,
+) -> mapData.MapClient:
+    """
+    A MapClient, loaded the way AllData loads the snapshot, with only systems, stargates and planets. The systems are in
+    ALL_SYSTEMS in the order of system_ids, and there is a stargate for each (origin name, destination name) of links, in
+    order. A destination that is not in system_ids makes a stargate to a system that does not exist.
+
+    :param planets(Dict[str, List[int]], default: None): The PlanetType.Id of each planet in a system, by system name.
+    :param security(Dict[str, float], default: None): The Security_Status of a system, by name. 0.5 if not given.
+    """
+    planets = {} if planets is None else planets
+    security = {} if security is None else security
+
+    planet_types = [
+        SimpleNamespace(Name=f"Type {type_id}", Id=type_id)
+        for type_id in sorted({type_id for type_ids in planets.values() for type_id in type_ids})
+    ]
+    planet_rows = [(name, type_id) for name, type_ids in planets.items() for type_id in type_ids]
+    all_planets = [
+        SimpleNamespace(Name=f"{name} {index + 1}", Id=40000001 + index, System_Id=system_ids[name], Type_Id=type_id)
+        for index, (name, type_id) in enumerate(planet_rows)
+    ]
+    stargates = [
+        SimpleNamespace(
+            Name=f"Stargate ({destination})",
+            Id=first_stargate_id + index,
+            OriginSystem_Id=system_ids[origin],
+            DestinationSystem_Id=system_ids.get(destination, 0),
+        )
+        for index, (origin, destination) in enumerate(links)
+    ]
+    systems = [
+        SimpleNamespace(
+            Name=name,
+            Id=system_id,
+            Position=Position(X=0.0, Y=0.0, Z=0.0, Universe=Universe.EDEN),
+            Security_Status=security.get(name, 0.5),
+            Constellation_Id=20000001,
+            Region_Id=10000001,
+            Planet_Ids=[planet.Id for planet in all_planets if planet.System_Id == system_id],
+            Stargate_Ids=[stargate.Id for stargate in stargates if stargate.OriginSystem_Id == system_id],
+        )
+        for name, system_id in system_ids.items()
+    ]
+    source = SimpleNamespace(
+        ALL_COMMODITIES=[],
+        ALL_PLANET_TYPES=planet_types,
+        ALL_PLANETS=all_planets,
+        ALL_STARGATES=stargates,
+        ALL_SYSTEMS=systems,
+        ALL_CONSTELLATIONS=[],
+        ALL_REGIONS=[],
+    )
+
+    client = mapData.MapClient()
+    MapSnapshot.FromMapClient(source).Populate(client, lazy=lazy)
+    return client
+
+
+# A small map with loops, for searches that weigh planets. Planet types 11, 12 and 13 are the ones searched for.
+INDUSTRY_SYSTEM_IDS = {name: 30000001 + index for index, name in enumerate("ABCDEFGHIJ")}
+INDUSTRY_LINKS = [
+    (origin, destination)
+    for a, b in ["AB", "BC", "CD", "DA", "CE", "EF", "FG", "GE", "DH", "HI", "IJ", "JH", "BI"]
+    for origin, destination in [(a, b), (b, a)]
+]
+INDUSTRY_PLANETS = {
+    "A": [11, 14],
+    "B": [12, 12, 14, 14],
+    "C": [13],
+    "D": [11, 12],
+    "E": [11, 13, 13],
+    "F": [14],
+    "G": [12, 13, 14],
+    "H": [14],
+    "I": [11, 11, 11, 13],
+    "J": [12, 14],
+}
+INDUSTRY_SECURITY = {"A": 0.9, "B": 0.7, "C": 0.45, "D": 0.3, "E": 0.1, "F": -0.2, "G": -0.6, "I": 1.0, "J": 0.62}
+
+
+def build_industry_map_client(lazy: bool = False) -> mapData.MapClient:
+    return build_map_client(
+        INDUSTRY_SYSTEM_IDS, INDUSTRY_LINKS, lazy=lazy, planets=INDUSTRY_PLANETS, security=INDUSTRY_SECURITY
+    )